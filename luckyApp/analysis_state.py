@@ -0,0 +1,220 @@
+import numpy as np
+from .history_store import DrawMatrix
+
+ZONE_CODES = 49  # 区间分布编码：一区个数*7 + 二区个数
+
+
+def draw_features(balls):
+    """
+    每期的间隔、奇数个数和区间分布编码
+    balls 为 (K, 7) 数组，返回 ((K, 5) 相邻间隔, (K,) 奇数个数, (K,) 区间编码)
+    """
+    red = np.sort(balls[:, :6].astype(np.int64), axis=1)
+    intervals = np.diff(red, axis=1)
+    odd_counts = (red % 2 == 1).sum(axis=1)
+    zone1 = (red <= 11).sum(axis=1)
+    zone2 = ((red >= 12) & (red <= 22)).sum(axis=1)
+    return intervals, odd_counts, zone1 * 7 + zone2
+
+
+class AnalysisState:
+    """
+    可增量更新的统计状态
+    维护全部历史的出现次数和最后出现位置，以及最近窗口内的冷热、间隔、奇偶、区间计数；
+    新增一期开奖数据只需 O(1) 更新，不必重新扫描历史
+    """
+    def __init__(self, recent_periods=30, history_limit=100):
+        self.recent_periods = recent_periods  # 冷热分析窗口
+        self.history_limit = history_limit  # 遗漏、间隔、奇偶、区间分析窗口
+        self.size = 0
+        self._draw_nums = np.zeros(0, dtype=np.int64)
+        self._balls = np.zeros((0, 7), dtype=np.int8)
+        # 全部历史的出现次数及最后出现的行号（-1 表示从未出现）
+        self.red_freq = np.zeros(34, dtype=np.int64)
+        self.blue_freq = np.zeros(17, dtype=np.int64)
+        self.red_last_row = np.full(34, -1, dtype=np.int64)
+        self.blue_last_row = np.full(17, -1, dtype=np.int64)
+        # 冷热窗口内的出现次数
+        self.red_recent = np.zeros(34, dtype=np.int64)
+        self.blue_recent = np.zeros(17, dtype=np.int64)
+        # 分析窗口内的间隔、奇偶、区间分布直方图
+        self.interval_hist = np.zeros(33, dtype=np.int64)
+        self.odd_hist = np.zeros(7, dtype=np.int64)
+        self.odd_last_row = np.full(7, -1, dtype=np.int64)
+        self.zone_hist = np.zeros(ZONE_CODES, dtype=np.int64)
+        self.zone_last_row = np.full(ZONE_CODES, -1, dtype=np.int64)
+
+    @classmethod
+    def from_draws(cls, draws, recent_periods=30, history_limit=100):
+        """由完整的历史数据一次性构建统计状态"""
+        state = cls(recent_periods, history_limit)
+        size = len(draws)
+        state.size = size
+        state._draw_nums = draws.draw_nums.copy()
+        state._balls = draws.balls.copy()
+        if size == 0:
+            return state
+
+        rows = np.arange(size)
+        state.red_freq[1:] = draws.red_onehot.sum(axis=0)
+        state.blue_freq[1:] = draws.blue_onehot.sum(axis=0)
+        np.maximum.at(state.red_last_row, draws.red.astype(np.intp), rows[:, None])
+        np.maximum.at(state.blue_last_row, draws.blue.astype(np.intp), rows)
+
+        recent = draws.tail(recent_periods)
+        state.red_recent[1:] = recent.red_onehot.sum(axis=0)
+        state.blue_recent[1:] = recent.blue_onehot.sum(axis=0)
+
+        intervals, odd_counts, zone_codes = draw_features(draws.balls)
+        window_start = max(size - history_limit, 0)
+        state.interval_hist += np.bincount(intervals[window_start:].ravel(), minlength=33)
+        state.odd_hist += np.bincount(odd_counts[window_start:], minlength=7)
+        state.zone_hist += np.bincount(zone_codes[window_start:], minlength=ZONE_CODES)
+        np.maximum.at(state.odd_last_row, odd_counts, rows)
+        np.maximum.at(state.zone_last_row, zone_codes, rows)
+        return state
+
+    @property
+    def draws(self):
+        """当前全部历史数据（按期号升序）"""
+        return DrawMatrix(self._draw_nums[:self.size], self._balls[:self.size])
+
+    @property
+    def latest_draw_num(self):
+        return int(self._draw_nums[self.size - 1]) if self.size else None
+
+    def _reserve(self, capacity):
+        """按倍增方式扩容，保证追加数据的均摊开销为 O(1)"""
+        if capacity <= len(self._draw_nums):
+            return
+        new_capacity = max(capacity, len(self._draw_nums) * 2, 64)
+        draw_nums = np.zeros(new_capacity, dtype=np.int64)
+        balls = np.zeros((new_capacity, 7), dtype=np.int8)
+        draw_nums[:self.size] = self._draw_nums[:self.size]
+        balls[:self.size] = self._balls[:self.size]
+        self._draw_nums = draw_nums
+        self._balls = balls
+
+    def push(self, draw_num, red_balls, blue_ball):
+        """并入最新一期开奖数据"""
+        row = self.size
+        self._reserve(row + 1)
+        self._draw_nums[row] = int(draw_num)
+        self._balls[row, :6] = red_balls
+        self._balls[row, 6] = blue_ball
+        self.size = row + 1
+
+        red = self._balls[row, :6].astype(np.intp)
+        blue = int(self._balls[row, 6])
+        self.red_freq[red] += 1
+        self.blue_freq[blue] += 1
+        self.red_last_row[red] = row
+        self.blue_last_row[blue] = row
+
+        # 冷热窗口：新的一期进入，最早的一期移出
+        self.red_recent[red] += 1
+        self.blue_recent[blue] += 1
+        if row >= self.recent_periods:
+            expired = self._balls[row - self.recent_periods]
+            self.red_recent[expired[:6].astype(np.intp)] -= 1
+            self.blue_recent[int(expired[6])] -= 1
+
+        # 分析窗口
+        (intervals,), (odd_count,), (zone_code,) = draw_features(self._balls[row:row + 1])
+        np.add.at(self.interval_hist, intervals, 1)
+        self.odd_hist[odd_count] += 1
+        self.odd_last_row[odd_count] = row
+        self.zone_hist[zone_code] += 1
+        self.zone_last_row[zone_code] = row
+        if row >= self.history_limit:
+            expired = self._balls[row - self.history_limit:row - self.history_limit + 1]
+            (intervals,), (odd_count,), (zone_code,) = draw_features(expired)
+            np.subtract.at(self.interval_hist, intervals, 1)
+            self.odd_hist[odd_count] -= 1
+            self.zone_hist[zone_code] -= 1
+
+    def analysis(self):
+        """生成全部维度的分析结果"""
+        return {
+            'hot_cold': self.hot_cold(),
+            'missing_values': self.missing_values(),
+            'intervals': self.intervals(),
+            'odd_even': self.odd_even(),
+            'zones': self.zones()
+        }
+
+    def hot_cold(self):
+        """冷热号：最近窗口内出现>=3次为热号，1-2次为温号，未出现为冷号"""
+        red_counts = self.red_recent[1:]
+        numbers = np.arange(1, 34)
+        return {
+            'red_hot': numbers[red_counts >= 3].tolist(),
+            'red_warm': numbers[(red_counts > 0) & (red_counts < 3)].tolist(),
+            'red_cold': numbers[red_counts == 0].tolist(),
+            'red_count': {num: int(self.red_recent[num]) for num in range(1, 34)},
+            'blue_count': {num: int(self.blue_recent[num]) for num in range(1, 17) if self.blue_recent[num]}
+        }
+
+    def missing_values(self):
+        """遗漏值：最新期号减去号码在分析窗口内最后出现的期号，窗口内未出现记为最新期号"""
+        latest_draw = self.latest_draw_num or 0
+        window_start = max(self.size - self.history_limit, 0)
+
+        def missing_from(last_rows, numbers):
+            missing = {}
+            for num in numbers:
+                row = last_rows[num]
+                missing[num] = latest_draw - int(self._draw_nums[row]) if row >= window_start else latest_draw
+            return missing
+
+        return {
+            'red_missing': missing_from(self.red_last_row, range(1, 34)),
+            'blue_missing': missing_from(self.blue_last_row, range(1, 17))
+        }
+
+    def intervals(self):
+        """号码间隔：间隔频率及每期平均间隔（最新一期在前）"""
+        window = self._balls[max(self.size - self.history_limit, 0):self.size]
+        red = window[:, :6].astype(np.int64)
+        avg_intervals = ((red.max(axis=1) - red.min(axis=1)) / 5)[::-1]
+        return {
+            'interval_freq': {
+                interval: int(count) for interval, count in enumerate(self.interval_hist) if count
+            },
+            'avg_intervals': avg_intervals.tolist()
+        }
+
+    def _ordered_keys(self, hist, last_rows):
+        """窗口内出现过的取值，按最近一次出现的先后排列（最新在前）"""
+        keys = np.flatnonzero(hist)
+        return keys[np.argsort(-last_rows[keys], kind='stable')]
+
+    def odd_even(self):
+        """奇偶比例"""
+        ratio_freq = {
+            (int(odd_count), 6 - int(odd_count)): int(self.odd_hist[odd_count])
+            for odd_count in self._ordered_keys(self.odd_hist, self.odd_last_row)
+        }
+        return {
+            'ratio_freq': ratio_freq,
+            'most_common_ratios': sorted(
+                ratio_freq.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )[:3]
+        }
+
+    def zones(self):
+        """区间分布：1-11、12-22、23-33 三个区间的号码个数"""
+        zone_freq = {}
+        for code in self._ordered_keys(self.zone_hist, self.zone_last_row):
+            zone1, zone2 = divmod(int(code), 7)
+            zone_freq[(zone1, zone2, 6 - zone1 - zone2)] = int(self.zone_hist[code])
+        return {
+            'zone_freq': zone_freq,
+            'most_common_zones': sorted(
+                zone_freq.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )[:3]
+        }
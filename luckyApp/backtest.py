@@ -0,0 +1,152 @@
+import logging
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .analysis_state import AnalysisState
+from .dimensions import default_weights
+from .predictor import AnalysisSnapshot, LotteryPredictor, MultiDimensionalAnalyzer
+from .sampler import TicketSampler
+from .score_table import COMBINATION_COUNT, all_combinations
+from .bitmask import hit_counts, red_mask, red_masks
+from .prizes import PRIZE_AMOUNTS, PRIZE_SLOTS, prize_distribution, prize_levels
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 50000  # 每期评分的候选组合数；对全部组合评分每期约3秒
+
+
+def backtest_options(tickets, min_score, seed=None, pool_size=DEFAULT_POOL_SIZE):
+    """
+    回测参数，同时写入每条逐期结果，用于中断后继续时只跳过参数相同的期号
+    权重固定为各维度的默认权重：持久化的自适应权重是用之后的开奖数据调整出来的，
+    回测中使用会引入未来信息
+    """
+    return {
+        'tickets': tickets,
+        'weights': default_weights(),
+        'min_score': min_score,
+        'seed': seed,
+        'pool_size': pool_size
+    }
+
+
+def _step_rng(seed, index):
+    """每一期使用由seed和期次派生的独立随机数流，结果与任务切分方式无关"""
+    if seed is None:
+        return np.random.default_rng(), None
+    return np.random.default_rng([seed, index]), seed * 1000003 + index
+
+
+def _score_candidates(analyzer, candidates, chunk_size=200000):
+    """分块为候选组合计算加权总分"""
+    totals = np.empty(len(candidates), dtype=np.float64)
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        totals[start:start + len(chunk)] = analyzer.batch_score(chunk)['total_score']
+    return totals
+
+
+def _predict_tickets(predictor, rng, tickets, pool_size):
+    """按智能预测的规则抽取号码，pool_size>0 时只在随机抽取的候选池中评分"""
+    combinations = all_combinations()
+    if pool_size:
+        candidates = combinations[rng.choice(COMBINATION_COUNT, size=pool_size, replace=False)]
+    else:
+        candidates = combinations
+
+    totals = _score_candidates(predictor.analyzer, candidates)
+    sampler = TicketSampler(totals, predictor.min_score_threshold, min_support=min(predictor.min_support, len(totals)))
+    picks = sampler.sample(tickets, rng)
+
+    probabilities = predictor._blue_ball_probabilities(predictor.analyzer.snapshot.analysis)
+    blue_balls = rng.choice(16, size=len(picks), p=probabilities) + 1
+    return candidates[picks].astype(np.int64), blue_balls
+
+
+def _prize_counts(red_balls, blue_balls, actual):
+    """按中奖规则统计各等级的注数"""
+    red_hits = hit_counts(red_masks(red_balls), red_mask(actual[:6]))
+    levels = prize_levels(red_hits, blue_balls == actual[6])
+    return prize_distribution(levels).tolist()
+
+
+def backtest_steps(draws, step_indices, options):
+    """
+    逐期回测：第i期只使用之前的数据生成号码，并与第i期的开奖号码比对
+    统计状态从第一期之前的数据构建一次，之后逐期增量并入，不访问数据库；
+    各期使用 options 中固定的权重，不回放自适应调整
+    """
+    analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+    analyzer.weights.update(options['weights'])
+    predictor = LotteryPredictor(analyzer)
+    predictor.min_score_threshold = options['min_score']
+
+    state = AnalysisState.from_draws(
+        draws.head(step_indices[0]), analyzer.recent_periods, analyzer.history_limit
+    )
+    results = []
+    for index in step_indices:
+        while state.size < index:
+            row = draws.balls[state.size]
+            state.push(draws.draw_nums[state.size], row[:6], row[6])
+
+        analyzer.snapshot = AnalysisSnapshot(str(state.latest_draw_num), state)
+        rng, random_seed = _step_rng(options['seed'], index)
+        red_balls, blue_balls = _predict_tickets(predictor, rng, options['tickets'], options['pool_size'])
+
+        # 随机选号作为对照（独立的随机数生成器，不影响全局 random）
+        random_rng = random.Random(random_seed)
+        random_tickets = [predictor.generate_random_numbers(random_rng) for _ in range(options['tickets'])]
+        random_red = np.array([red for red, _ in random_tickets], dtype=np.int64)
+        random_blue = np.array([blue for _, blue in random_tickets], dtype=np.int64)
+
+        actual = draws.balls[index]
+        results.append({
+            'draw_num': str(draws.draw_nums[index]),
+            'params': options,
+            'predicted': _prize_counts(red_balls, blue_balls, actual),
+            'random': _prize_counts(random_red, random_blue, actual)
+        })
+    return results
+
+
+def run_backtest(draws, step_indices, options, workers=1, chunk_steps=50, on_result=None):
+    """
+    把待回测的期次按连续区间切分，多进程并行回测
+    每完成一个区间即调用 on_result(results)，便于边算边保存
+    """
+    chunks = [step_indices[i:i + chunk_steps] for i in range(0, len(step_indices), chunk_steps)]
+    if not chunks:
+        return
+
+    # 在主进程中预先生成全部组合，子进程直接共享
+    all_combinations()
+
+    if workers <= 1:
+        for chunk in chunks:
+            on_result(backtest_steps(draws, chunk, options))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(backtest_steps, draws, chunk, options) for chunk in chunks]
+        for future in as_completed(futures):
+            on_result(future.result())
+
+
+def summarize(results):
+    """汇总各等级的命中注数"""
+    summary = {
+        'draws': len(results),
+        'predicted': [0] * PRIZE_SLOTS,
+        'random': [0] * PRIZE_SLOTS
+    }
+    for result in results:
+        for key in ('predicted', 'random'):
+            for level, count in enumerate(result[key]):
+                summary[key][level] += count
+    # 按各等级单注奖金估算的总奖金
+    for key in ('predicted', 'random'):
+        summary[f'{key}_payout'] = int(np.dot(summary[key], PRIZE_AMOUNTS))
+    return summary
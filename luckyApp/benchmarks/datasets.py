@@ -0,0 +1,94 @@
+import random
+from datetime import date, timedelta
+
+from luckyApp.models import LotteryHistory, PredictionRecord
+
+DRAWS_PER_YEAR = 150  # 合成数据每年的期数
+BATCH_SIZE = 5000
+DRAW_INTERVALS = (2, 2, 3)  # 每周二、四、日开奖
+
+
+def synthetic_draw_num(index):
+    """第index期（从0开始）的合成期号，格式同真实期号：年份+三位序号"""
+    return f"{2003 + index // DRAWS_PER_YEAR}{index % DRAWS_PER_YEAR + 1:03d}"
+
+
+def create_draws(count, seed=0):
+    """清空并写入count期随机开奖记录，返回最新期号"""
+    LotteryHistory.objects.all().delete()
+    rng = random.Random(seed)
+    start_date = date(2003, 2, 23)
+    batch = []
+    for index in range(count):
+        red_balls = sorted(rng.sample(range(1, 34), 6))
+        batch.append(LotteryHistory(
+            draw_num=synthetic_draw_num(index),
+            red_ball_1=red_balls[0],
+            red_ball_2=red_balls[1],
+            red_ball_3=red_balls[2],
+            red_ball_4=red_balls[3],
+            red_ball_5=red_balls[4],
+            red_ball_6=red_balls[5],
+            blue_ball=rng.randint(1, 16),
+            draw_date=start_date + timedelta(days=index * 2)
+        ))
+        if len(batch) >= BATCH_SIZE:
+            LotteryHistory.objects.bulk_create(batch)
+            batch = []
+    LotteryHistory.objects.bulk_create(batch)
+    return synthetic_draw_num(count - 1)
+
+
+def synthetic_year_page(year=2016, count=154, seed=0):
+    """
+    按中彩网年度综合分布图的页面结构生成一年的开奖页面（行、单元格的 class 与真实页面一致），
+    开奖号码随机生成；每行依次为期号、33个红球单元格、16个蓝球单元格，最后一行为"模拟选号"
+    """
+    rng = random.Random(seed)
+    draw_date = date(year, 1, 1)
+    draw_date += timedelta(days=(6 - draw_date.weekday()) % 7)  # 第一个周日
+    rows = []
+    for index in range(count):
+        red_balls = set(rng.sample(range(1, 34), 6))
+        blue_ball = rng.randint(1, 16)
+        cells = [f'<td class="qh7"><a title="开奖日期：{draw_date.isoformat()}" href="#">{year}{index + 1:03d}</a></td>']
+        cells += [
+            f'<td class="redqiu">{number:02d}</td>' if number in red_balls else '<td class="hui">1</td>'
+            for number in range(1, 34)
+        ]
+        cells += [
+            f'<td class="blueqiu3">{number:02d}</td>' if number == blue_ball else '<td class="hui">1</td>'
+            for number in range(1, 17)
+        ]
+        rows.append('<tr class="hgt">\n' + '\n'.join(cells) + '\n</tr>')
+        draw_date += timedelta(days=DRAW_INTERVALS[index % len(DRAW_INTERVALS)])
+    rows.append('<tr class="hgt">\n<td class="qh7">模拟选号</td>\n' + '<td class="hui">&nbsp;</td>\n' * 49 + '</tr>')
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f'<title>双色球综合分布图 {year}</title>\n</head>\n<body>\n'
+        '<table id="tdata" cellpadding="0" cellspacing="0">\n' + '\n'.join(rows) + '\n</table>\n</body>\n</html>\n'
+    )
+
+
+def create_predictions(draw_num, count, seed=0):
+    """清空并为指定期号写入count条随机预测记录"""
+    PredictionRecord.objects.all().delete()
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(count):
+        red_balls = sorted(rng.sample(range(1, 34), 6))
+        batch.append(PredictionRecord(
+            draw_num=draw_num,
+            red_ball_1=red_balls[0],
+            red_ball_2=red_balls[1],
+            red_ball_3=red_balls[2],
+            red_ball_4=red_balls[3],
+            red_ball_5=red_balls[4],
+            red_ball_6=red_balls[5],
+            blue_ball=rng.randint(1, 16),
+            prediction_type=rng.choice(['random', 'analysis'])
+        ))
+        if len(batch) >= BATCH_SIZE:
+            PredictionRecord.objects.bulk_create(batch)
+            batch = []
+    PredictionRecord.objects.bulk_create(batch)
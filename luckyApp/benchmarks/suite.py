@@ -0,0 +1,111 @@
+import statistics
+import time
+
+from django.test import Client
+
+from luckyApp.benchmarks.datasets import synthetic_year_page
+from luckyApp.crawler import LotteryCrawler
+from luckyApp.page_parser import available_backends
+from luckyApp.predictor import LotteryPredictor, MultiDimensionalAnalyzer, invalidate_analysis_snapshot
+from luckyApp.score_table import ScoreTable
+
+PARSE_PAGES = {'ssq_2016_synthetic': 2016}  # 页面名: 年份
+
+
+def measure(func, repeat=5, warmup=1):
+    """重复执行func并记录耗时（秒）"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'repeat': repeat
+    }
+
+
+def parse_cases():
+    """
+    爬虫解析：用每个可用的解析后端对合成的年度页面执行与 crawl_history 相同的解析流程
+    页面在运行时按真实页面结构生成（号码随机生成，见 datasets.synthetic_year_page）
+    """
+    cases = {}
+    for page, year in PARSE_PAGES.items():
+        html = synthetic_year_page(year)
+        for backend in available_backends():
+            crawler = LotteryCrawler(parser=backend)
+            cases[f'crawler.parse_page[{backend}][{page}]'] = (
+                lambda crawler=crawler, html=html: crawler.parse_page(html), 5
+            )
+    return cases
+
+
+def analyzer_cases():
+    """
+    分析与预测：首次分析（无缓存）、命中缓存的分析、智能预测
+    智能预测按线上的情况先生成得分表（调用方需把 SCORE_TABLE_PATH 指向临时目录），
+    并单独计时得分表不可用时的随机候选池路径
+    """
+    analyzer = MultiDimensionalAnalyzer()
+    predictor = LotteryPredictor()
+    ScoreTable.build(analyzer)
+
+    def analyze_cold():
+        invalidate_analysis_snapshot()
+        MultiDimensionalAnalyzer().analyze_all_dimensions()
+
+    return {
+        'analyze_all_dimensions.cold': (analyze_cold, 5),
+        'analyze_all_dimensions.warm': (analyzer.analyze_all_dimensions, 20),
+        'predict_based_on_frequency': (lambda: predictor.predict_based_on_frequency(5), 10),
+        'predict_from_candidates': (lambda: predictor._predict_from_candidates(5), 10)
+    }
+
+
+def grading_cases(draw_num):
+    """命中判定：对该期全部预测记录执行一次"""
+    def check():
+        LotteryPredictor().check_prediction_accuracy(draw_num)
+
+    return {
+        'check_prediction_accuracy': (check, 1)
+    }
+
+
+def view_cases(history_pages, prediction_pages):
+    """列表视图：首页和末页"""
+    client = Client()
+    return {
+        'views.history_list.first_page': (lambda: client.get('/history/'), 5),
+        'views.history_list.last_page': (lambda: client.get(f'/history/?page={history_pages}'), 5),
+        'views.prediction_list.first_page': (lambda: client.get('/predictions/'), 5),
+        'views.prediction_list.last_page': (lambda: client.get(f'/predictions/?page={prediction_pages}'), 5),
+        'views.get_latest_predictions': (lambda: client.get('/api/latest-predictions/'), 5)
+    }
+
+
+def run_cases(cases, prefix=''):
+    """执行一组用例，返回 {用例名: 计时结果}"""
+    results = {}
+    for name, (func, repeat) in cases.items():
+        results[f'{prefix}{name}'] = measure(func, repeat=repeat, warmup=1 if repeat > 1 else 0)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线对比中位数耗时
+    返回 [(用例名, 基线, 当前, 比值, 是否退化)]，只比较两边都有的用例
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or base['median'] <= 0:
+            continue
+        ratio = current['median'] / base['median']
+        rows.append((name, base['median'], current['median'], ratio, ratio > 1 + tolerance))
+    return rows
@@ -0,0 +1,38 @@
+import numpy as np
+
+# 红球号码 n 对应第 n-1 位，6个红球合成一个33位掩码
+RED_BITS = np.uint64(1) << np.arange(34, dtype=np.uint64) >> np.uint64(1)
+
+# 0-255 每个字节中1的个数（NumPy 1.26 没有 bitwise_count）
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def red_mask(red_balls):
+    """一组红球的掩码"""
+    mask = 0
+    for ball in red_balls:
+        mask |= 1 << (int(ball) - 1)
+    return mask
+
+
+def red_masks(red_balls):
+    """(K, 6) 红球数组的掩码，返回 (K,) uint64 数组"""
+    red = np.asarray(red_balls, dtype=np.intp).reshape(-1, 6)
+    return np.bitwise_or.reduce(RED_BITS[red], axis=1)
+
+
+def mask_to_balls(mask):
+    """掩码还原为升序的红球列表"""
+    mask = int(mask)
+    return [ball for ball in range(1, 34) if mask >> (ball - 1) & 1]
+
+
+def popcount(masks):
+    """uint64 数组中每个元素的二进制1的个数"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    return _BYTE_POPCOUNT[masks.view(np.uint8)].reshape(masks.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def hit_counts(pred_masks, draw_mask):
+    """每注预测与开奖号码相同的红球个数"""
+    return popcount(np.asarray(pred_masks, dtype=np.uint64) & np.uint64(draw_mask))
@@ -0,0 +1,131 @@
+from math import comb
+
+import numpy as np
+from .bitmask import popcount, red_mask
+from .prizes import PRIZE_LEVELS, PRIZE_SLOTS
+
+MAX_RED_BALLS = 20  # 复式最多20个红球
+MAX_BANKER_BALLS = 5  # 胆码1-5个
+
+# 超几何分布用到的组合数表 _BINOM[n, k] = C(n, k)，k 不超过6
+_BINOM = np.array([[comb(n, k) for k in range(7)] for n in range(34)], dtype=np.int64)
+_RED_DRAWS = comb(33, 6)
+
+
+def _binom(n, k):
+    """数组形式的 C(n, k)，k<0 或 k>n 时为0（k 不超过6）"""
+    n = np.asarray(n, dtype=np.int64)
+    k = np.asarray(k, dtype=np.int64)
+    valid = (k >= 0) & (k <= n)
+    return np.where(valid, _BINOM[np.clip(n, 0, 33), np.clip(k, 0, 6)], 0)
+
+
+def normalize_ticket(red_balls, blue_balls, banker_balls=()):
+    """
+    校验并整理一张彩票的号码，返回 (类型, 胆码, 拖码, 蓝球)，号码均为升序列表
+    单式为6红1蓝；复式为6-20个红球或多个蓝球；胆拖为1-5个胆码加拖码，胆码与拖码合计至少7个
+    """
+    banker = sorted({int(ball) for ball in banker_balls})
+    drag = sorted({int(ball) for ball in red_balls} - set(banker))
+    blue = sorted({int(ball) for ball in blue_balls})
+    reds = banker + drag
+    if any(not 1 <= ball <= 33 for ball in reds):
+        raise ValueError('红球号码必须在1-33之间')
+    if not blue or any(not 1 <= ball <= 16 for ball in blue):
+        raise ValueError('至少选择1个蓝球，且蓝球号码必须在1-16之间')
+
+    if banker:
+        if len(banker) > MAX_BANKER_BALLS:
+            raise ValueError(f'胆码最多 {MAX_BANKER_BALLS} 个')
+        if not 7 <= len(reds) <= MAX_RED_BALLS:
+            raise ValueError(f'胆码与拖码合计需要 7-{MAX_RED_BALLS} 个红球')
+        return 'banker', banker, drag, blue
+    if not 6 <= len(reds) <= MAX_RED_BALLS:
+        raise ValueError(f'需要 6-{MAX_RED_BALLS} 个不同的红球')
+    if len(reds) == 6 and len(blue) == 1:
+        return 'single', [], drag, blue
+    return 'compound', [], drag, blue
+
+
+def ticket_count(banker_count, drag_count, blue_count):
+    """复式/胆拖展开后的注数：C(拖码数, 6-胆码数) × 蓝球数"""
+    return _binom(drag_count, 6 - np.asarray(banker_count)) * np.asarray(blue_count)
+
+
+def prize_counts(banker_hits, drag_hits, banker_count, drag_count, blue_count, blue_hit):
+    """
+    不展开号码，按组合数直接计算各等级的中奖注数，返回 (K, PRIZE_SLOTS) 数组（下标0为未中奖注数）
+    红球命中 r 个的注数 = C(拖码命中数, r-胆码命中数) × C(拖码未中数, 6-胆码数-(r-胆码命中数))；
+    蓝球命中时其中1注蓝球命中，其余蓝球数-1注未中
+    """
+    banker_hits, drag_hits, banker_count, drag_count, blue_count = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.int64) for value in (banker_hits, drag_hits, banker_count, drag_count, blue_count))
+    )
+    blue_hit = np.broadcast_to(np.asarray(blue_hit, dtype=np.int64), banker_hits.shape)
+    blue_tickets = (blue_count - blue_hit, blue_hit)
+
+    counts = np.zeros(banker_hits.shape + (PRIZE_SLOTS,), dtype=np.int64)
+    for red_hits in range(7):
+        from_drag = red_hits - banker_hits
+        red_tickets = _binom(drag_hits, from_drag) * _binom(drag_count - drag_hits, 6 - banker_count - from_drag)
+        for blue in (0, 1):
+            counts[..., PRIZE_LEVELS[red_hits, blue]] += red_tickets * blue_tickets[blue]
+    return counts
+
+
+def grade_tickets(red_masks, banker_masks, blue_masks, draw_mask, draw_blue):
+    """
+    批量判定彩票（单式、复式、胆拖）的命中情况，红球掩码包含胆码和拖码
+    开奖号码可以是单期的掩码和蓝球，也可以是与彩票一一对应的数组
+    返回红球命中数、胆码命中数、蓝球是否命中和各等级中奖注数
+    """
+    red_masks = np.asarray(red_masks, dtype=np.uint64)
+    banker_masks = np.asarray(banker_masks, dtype=np.uint64)
+    drag_masks = red_masks & ~banker_masks
+    draw_mask = np.asarray(draw_mask, dtype=np.uint64)
+
+    banker_hits = popcount(banker_masks & draw_mask)
+    drag_hits = popcount(drag_masks & draw_mask)
+    blue_masks = np.asarray(blue_masks, dtype=np.int64)
+    blue_hits = (blue_masks >> (np.asarray(draw_blue, dtype=np.int64) - 1)) & 1
+    counts = prize_counts(
+        banker_hits, drag_hits, popcount(banker_masks), popcount(drag_masks),
+        popcount(blue_masks.astype(np.uint64)), blue_hits
+    )
+    return {
+        'red_hits': banker_hits + drag_hits,
+        'banker_hits': banker_hits,
+        'blue_hits': blue_hits.astype(bool),
+        'prize_counts': counts
+    }
+
+
+def prize_odds(banker_count, drag_count, blue_count):
+    """
+    一张彩票各等级的精确中奖概率（至少中1注）和期望中奖注数
+    按超几何分布枚举开奖红球落在胆码、拖码中的个数，再用 prize_counts 计算每种情况的中奖注数
+    """
+    banker_hits, drag_hits = np.meshgrid(np.arange(banker_count + 1), np.arange(7), indexing='ij')
+    banker_hits, drag_hits = banker_hits.ravel(), drag_hits.ravel()
+    others = 33 - banker_count - drag_count
+    ways = _binom(banker_count, banker_hits) * _binom(drag_count, drag_hits) \
+        * _binom(others, 6 - banker_hits - drag_hits)
+    red_probability = ways / _RED_DRAWS
+
+    probability = np.zeros(PRIZE_SLOTS)
+    expected = np.zeros(PRIZE_SLOTS)
+    for blue_hit, blue_probability in ((0, 1 - blue_count / 16), (1, blue_count / 16)):
+        counts = prize_counts(banker_hits, drag_hits, banker_count, drag_count, blue_count, blue_hit)
+        weights = red_probability * blue_probability
+        probability += weights @ (counts > 0)
+        expected += weights @ counts
+    return {
+        'ticket_count': int(ticket_count(banker_count, drag_count, blue_count)),
+        'probability': probability[1:].tolist(),
+        'expected': expected[1:].tolist()
+    }
+
+
+def ticket_masks(banker, drag, blue):
+    """整理后的号码转换为 (红球掩码, 胆码掩码, 蓝球掩码)"""
+    return red_mask(banker + drag), red_mask(banker), sum(1 << (ball - 1) for ball in blue)
@@ -1,144 +1,321 @@
 import requests
 import bs4
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from datetime import date, datetime, time as clock, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.db import connection, transaction
 from .models import LotteryHistory
+from .page_parser import extract_draws, extract_row, get_backend
+from .predictor import invalidate_analysis_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 按期号批量写入时需要比较和更新的字段
+UPSERT_FIELDS = [
+    'red_ball_1', 'red_ball_2', 'red_ball_3', 'red_ball_4', 'red_ball_5', 'red_ball_6',
+    'blue_ball', 'draw_date'
+]
+
+DRAW_WEEKDAYS = (1, 3, 6)  # 每周二、四、日开奖
+DRAW_RESULT_TIME = clock(21, 30)  # 开奖结果可获取的时间
+
+
+def next_draw_date(after):
+    """after 之后的第一个开奖日"""
+    day = after + timedelta(days=1)
+    while day.weekday() not in DRAW_WEEKDAYS:
+        day += timedelta(days=1)
+    return day
+
+
+class RateLimiter:
+    """多个线程共享的请求节流：相邻两次请求的开始时间至少间隔 min_interval 秒"""
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
 class LotteryCrawler:
-    def __init__(self):
+    def __init__(self, timeout=10, retries=3, backoff=0.5, min_interval=0.5, pool_size=8, parser=None):
         self.base_url = 'http://tubiao.zhcw.com/tubiao/ssqNew/ssqJsp/ssqZongHeFengBuTuAsc.jsp'
         self.headers = {
             'Referer': 'http://tubiao.zhcw.com/tubiao/ssqNew/ssqInc/ssqZongHeFengBuTuAsckj_year=2016.html',
             'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36'
         }
+        self.timeout = timeout  # 单次请求的连接/读取超时（秒）
+        self.parser = get_backend(parser)  # 页面解析后端
+        self.rate_limiter = RateLimiter(min_interval)
+        # 连接池可供多个线程复用；连接失败和 429/5xx 响应按指数退避自动重试
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',)
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
         self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def year_url(self, year):
+        return f"{self.base_url}?kj_year={year}"
 
     def get_html(self, url):
+        self.rate_limiter.wait()
         try:
-            response = self.session.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers, timeout=self.timeout)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
             logger.error(f"获取页面失败: {str(e)}")
             return None
 
+    def parse_page(self, html):
+        """解析年度页面中的全部开奖数据"""
+        return [self._to_dict(draw) for draw in extract_draws(html, self.parser)]
+
     def parse_data(self, data):
+        """解析 BeautifulSoup 找到的开奖行"""
         results = []
         for row in data:
             if not isinstance(row, bs4.element.Tag):
                 continue
-            
-            center = row.find(class_="qh7").string.strip()
-            if center.startswith("模拟"):
+            draw = extract_row(row)
+            if draw is None:
                 break
-                
-            red_balls = [int(r.string) for r in row.find_all(class_="redqiu")]
-            blue_ball = int(row.find(class_="blueqiu3").string.strip())
-            
-            # 获取日期
-            date_link = row.find(class_="qh7").find('a')
-            if date_link and date_link.get('title'):
-                date_str = date_link.get('title').split('：')[-1]
-                try:
-                    draw_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                except ValueError:
-                    draw_date = datetime.now().date()
-            else:
-                draw_date = datetime.now().date()
-            
-            results.append({
-                'draw_num': center,
-                'red_balls': red_balls,
-                'blue_ball': blue_ball,
-                'draw_date': draw_date
-            })
-            
+            results.append(self._to_dict(draw))
         return results
 
-    def save_to_db(self, lottery_data):
+    @staticmethod
+    def _to_dict(draw):
+        draw_num, red_balls, blue_ball, draw_date = draw
+        return {
+            'draw_num': draw_num,
+            'red_balls': list(red_balls),
+            'blue_ball': blue_ball,
+            'draw_date': draw_date
+        }
+
+    def save_to_db(self, lottery_data, batch_size=500):
+        """
+        批量写入开奖数据（按期号插入或更新）
+        每批先查询已有记录，只把新增或有变化的期号用一条 bulk_create(update_conflicts=True) 写入，
+        全部批次在同一个事务中；返回 {'inserted', 'updated', 'unchanged'}
+        写入失败时全部回滚，记录日志后抛出异常
+        """
         if not isinstance(lottery_data, list):
             lottery_data = [lottery_data]
-            
+
+        # 同一期号重复出现时以最后一条为准
+        records = {}
         for data in lottery_data:
-            try:
-                LotteryHistory.objects.update_or_create(
-                    draw_num=data['draw_num'],
-                    defaults={
-                        'red_ball_1': data['red_balls'][0],
-                        'red_ball_2': data['red_balls'][1],
-                        'red_ball_3': data['red_balls'][2],
-                        'red_ball_4': data['red_balls'][3],
-                        'red_ball_5': data['red_balls'][4],
-                        'red_ball_6': data['red_balls'][5],
-                        'blue_ball': data['blue_ball'],
-                        'draw_date': data['draw_date']
+            red_balls = data['red_balls']
+            records[data['draw_num']] = LotteryHistory(
+                draw_num=data['draw_num'],
+                red_ball_1=red_balls[0],
+                red_ball_2=red_balls[1],
+                red_ball_3=red_balls[2],
+                red_ball_4=red_balls[3],
+                red_ball_5=red_balls[4],
+                red_ball_6=red_balls[5],
+                blue_ball=data['blue_ball'],
+                draw_date=data['draw_date']
+            )
+        records = list(records.values())
+
+        # MySQL 的 ON DUPLICATE KEY UPDATE 不能指定冲突字段
+        unique_fields = ['draw_num'] if connection.features.supports_update_conflicts_with_target else None
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        try:
+            with transaction.atomic():
+                for start in range(0, len(records), batch_size):
+                    chunk = records[start:start + batch_size]
+                    existing = {
+                        row[0]: row[1:]
+                        for row in LotteryHistory.objects.filter(
+                            draw_num__in=[record.draw_num for record in chunk]
+                        ).values_list('draw_num', *UPSERT_FIELDS)
                     }
-                )
-                logger.info(f"已保存期号 {data['draw_num']} 的数据")
-            except Exception as e:
-                logger.error(f"保存期号 {data['draw_num']} 的数据失败: {str(e)}")
+                    changed = []
+                    for record in chunk:
+                        stored = existing.get(record.draw_num)
+                        if stored is None:
+                            stats['inserted'] += 1
+                        elif stored != tuple(getattr(record, field) for field in UPSERT_FIELDS):
+                            stats['updated'] += 1
+                        else:
+                            stats['unchanged'] += 1
+                            continue
+                        changed.append(record)
+                    if changed:
+                        LotteryHistory.objects.bulk_create(
+                            changed,
+                            update_conflicts=True,
+                            unique_fields=unique_fields,
+                            update_fields=UPSERT_FIELDS + ['red_mask']
+                        )
+        except Exception as e:
+            logger.error(f"保存开奖数据失败: {str(e)}")
+            raise
 
-    def crawl_history(self, start_year=2003):
-        """爬取历史数据"""
-        current_year = datetime.now().year
-        for year in range(start_year, current_year + 1):
-            url = f"{self.base_url}?kj_year={year}"
-            logger.info(f"正在爬取 {year} 年的数据")
-            html = self.get_html(url)
-            if html:
-                bs = bs4.BeautifulSoup(html, 'html.parser')
-                if bs:
-                    data = bs.find_all(class_='hgt')
-                    lottery_data = self.parse_data(data)
-                    if lottery_data:
-                        self.save_to_db(lottery_data)
-                        logger.info(f"已完成{year}年数据爬取")
+        # bulk_create 不触发 post_save，已有记录被修改时需要手动清除分析快照缓存
+        if stats['updated']:
+            invalidate_analysis_snapshot()
+        logger.info(
+            f"已保存开奖数据: 新增 {stats['inserted']} 期, 更新 {stats['updated']} 期, 未变化 {stats['unchanged']} 期"
+        )
+        return stats
+
+    def stored_draws(self, start_year=2003):
+        """数据库中已有的期号及开奖日期 {期号: 开奖日期}"""
+        return dict(
+            LotteryHistory.objects.filter(draw_num__gte=str(start_year)).values_list('draw_num', 'draw_date')
+        )
+
+    def missing_years(self, start_year=2003, stored=None, now=None):
+        """
+        需要抓取的年份：没有数据、期号不连续（中间有缺期），或按开奖日程还有已开奖但未入库的期次
+        往年期号从1起连续即视为完整；开奖日程只用于当年和已入库的最新一年（年底最后几期可能未入库），
+        按每周二、四、日 21:30 后可获取计算，春节休市期间会多抓取几次，不影响结果
+        """
+        now = now or datetime.now()
+        stored = self.stored_draws(start_year) if stored is None else stored
+        by_year = defaultdict(list)
+        for draw_num, draw_date in stored.items():
+            by_year[int(draw_num[:4])].append((int(draw_num[4:]), draw_date))
+        latest_date = max(stored.values()) if stored else None
+        latest_year = int(max(stored)[:4]) if stored else None
+
+        years = []
+        for year in range(start_year, now.year + 1):
+            draws = by_year.get(year)
+            if draws:
+                numbers = sorted(number for number, _ in draws)
+                if numbers[0] != 1 or numbers[-1] != len(numbers):
+                    years.append(year)
+                    continue
+                if year not in (now.year, latest_year):
+                    continue
+                last_date = max(draw_date for _, draw_date in draws)
+            elif year == now.year and latest_date:
+                # 当年还没有数据：上一期之后的第一个开奖日到了才需要抓取
+                last_date = latest_date
+            else:
+                last_date = date(year - 1, 12, 31)
+            next_draw = next_draw_date(last_date)
+            if next_draw.year == year and datetime.combine(next_draw, DRAW_RESULT_TIME) <= now:
+                years.append(year)
+        return years
+
+    def crawl_history(self, start_year=2003, end_year=None, workers=4):
+        """
+        爬取历史数据
+        各年度页面由最多 workers 个线程并发下载（受节流限制），
+        每个页面下载完成后立即在当前线程解析并保存，下载或保存失败的年份列入 failed；
+        返回 {'years', 'failed', 'draws', 'inserted', 'updated', 'unchanged'}
+        """
+        end_year = end_year or datetime.now().year
+        logger.info(f"正在爬取 {start_year} 到 {end_year} 年的数据")
+        return self._crawl_years(range(start_year, end_year + 1), workers)
+
+    def sync(self, start_year=2003, workers=4):
+        """
+        增量同步：只抓取缺少数据的年份，只保存数据库中还没有的期号
+        返回值与 crawl_history 相同，数据完整时不发出任何请求
+        """
+        stored = self.stored_draws(start_year)
+        years = self.missing_years(start_year, stored)
+        if not years:
+            logger.info("开奖数据已是最新，无需抓取")
+            return {'years': 0, 'failed': [], 'draws': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+        logger.info(f"需要补充数据的年份: {years}")
+        return self._crawl_years(years, workers, skip=stored)
+
+    def _crawl_years(self, years, workers, skip=()):
+        """并发下载年度页面，解析后保存期号不在 skip 中的数据"""
+        stats = {'years': 0, 'failed': [], 'draws': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(self.get_html, self.year_url(year)): year for year in years}
+            for future in as_completed(futures):
+                year = futures[future]
+                html = future.result()
+                if not html:
+                    stats['failed'].append(year)
+                    continue
+                lottery_data = [data for data in self.parse_page(html) if data['draw_num'] not in skip]
+                if lottery_data:
+                    try:
+                        saved = self.save_to_db(lottery_data)
+                    except Exception:
+                        stats['failed'].append(year)
+                        continue
+                    for key in ('inserted', 'updated', 'unchanged'):
+                        stats[key] += saved[key]
+                    stats['draws'] += len(lottery_data)
+                stats['years'] += 1
+                logger.info(f"已完成{year}年数据爬取")
+        stats['failed'].sort()
+        if stats['failed']:
+            logger.warning(f"以下年份的页面获取或保存失败: {stats['failed']}")
+        return stats
 
     def crawl_latest(self):
-        """爬取最新一期数据"""
+        """
+        爬取最新开奖数据
+        按开奖日程判断是否可能有新数据，没有时不发出请求；
+        只保存尚未入库的期号，返回其中最新一期，没有新数据时返回None；保存失败时抛出异常
+        """
         current_year = datetime.now().year
-        url = f"{self.base_url}?kj_year={current_year}"
-        html = self.get_html(url)
-        if html:
-            bs = bs4.BeautifulSoup(html, 'html.parser')
-            if bs:
-                data = bs.find_all(class_='hgt')
-                if data:
-                    # 获取最后一行数据（最新一期）
-                    valid_data = [row for row in data if isinstance(row, bs4.element.Tag) and not row.find(class_="qh7").string.strip().startswith("模拟")]
-                    if valid_data:
-                        latest_data = self.parse_data([valid_data[-1]])
-                        if latest_data:
-                            self.save_to_db(latest_data[0])
-                            return latest_data[0]
-        return None
+        stored = self.stored_draws(current_year - 1)
+        years = self.missing_years(current_year - 1, stored)
+        if not years:
+            return None
+
+        new_data = []
+        for year in years:
+            html = self.get_html(self.year_url(year))
+            if html:
+                new_data.extend(data for data in self.parse_page(html) if data['draw_num'] not in stored)
+        if not new_data:
+            return None
+        new_data.sort(key=lambda data: data['draw_num'])
+        self.save_to_db(new_data)
+        return new_data[-1]
 
     def crawl_specific(self, draw_num):
         """爬取指定期号的数据"""
         # 获取年份
         year = '20' + draw_num[:2]
-        url = f"{self.base_url}?kj_year={year}"
-        html = self.get_html(url)
+        html = self.get_html(self.year_url(year))
         
         if html:
-            bs = bs4.BeautifulSoup(html, 'html.parser')
-            if bs:
-                data = bs.find_all(class_='hgt')
-                lottery_data = self.parse_data(data)
-                if lottery_data:
-                    # 找到指定期号的数据
-                    target_data = None
-                    for item in lottery_data:
-                        if item['draw_num'] == draw_num:
-                            target_data = item
-                            break
-                    
-                    if target_data:
-                        self.save_to_db([target_data])
-                        logger.info(f"成功补充期号 {draw_num} 的数据")
-                        return target_data
-                    
+            lottery_data = self.parse_page(html)
+            if lottery_data:
+                # 找到指定期号的数据
+                target_data = None
+                for item in lottery_data:
+                    if item['draw_num'] == draw_num:
+                        target_data = item
+                        break
+                
+                if target_data:
+                    self.save_to_db([target_data])
+                    logger.info(f"成功补充期号 {draw_num} 的数据")
+                    return target_data
+                
         logger.warning(f"未找到期号 {draw_num} 的数据")
         return None
\ No newline at end of file
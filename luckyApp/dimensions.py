@@ -0,0 +1,498 @@
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+from .frequency_index import FrequencyIndex
+
+# 已注册的统计分析和评分维度（按注册顺序排列）
+_analyses = {}
+_dimensions = {}
+
+
+class Analysis:
+    """一项统计分析：由统计状态计算结果，可依赖其他分析的结果"""
+    def __init__(self, name, compute, requires=()):
+        self.name = name
+        self.compute = compute  # compute(state, analysis) -> 分析结果
+        self.requires = tuple(requires)
+
+
+class Dimension:
+    """
+    一个评分维度
+    requires 为依赖的分析名称；score(analysis, red_balls) 为单注评分，
+    tables(analysis) 生成批量评分用的查找表，batch_score(red, tables) 为批量评分
+    """
+    def __init__(self, name, requires, score, batch_score, default_weight, tables=None, suggestion=None):
+        self.name = name
+        self.requires = tuple(requires)
+        self.score = score
+        self.batch_score = batch_score
+        self.tables = tables or (lambda analysis: None)
+        self.default_weight = default_weight
+        self.suggestion = suggestion  # 单注得分低于70时的建议
+
+
+def register_analysis(name, compute, requires=()):
+    """注册统计分析，同名时覆盖"""
+    _analyses[name] = Analysis(name, compute, requires)
+    return _analyses[name]
+
+
+def register_dimension(name, requires, score, batch_score, default_weight, tables=None, suggestion=None):
+    """注册评分维度，同名时覆盖"""
+    for analysis in requires:
+        if analysis not in _analyses:
+            raise ValueError(f'未注册的分析: {analysis}')
+    _dimensions[name] = Dimension(name, requires, score, batch_score, default_weight, tables, suggestion)
+    return _dimensions[name]
+
+
+def get_dimension(name):
+    return _dimensions[name]
+
+
+def dimension_names():
+    return list(_dimensions)
+
+
+def default_weights():
+    """各维度的默认权重，按注册的相对权重归一化，总和为1"""
+    return normalize_weights({})
+
+
+def normalize_weights(weights):
+    """
+    把权重整理为全部已注册维度的权重并归一化（总和为1）
+    缺少的维度（如保存权重之后新注册的维度）取注册时的默认权重，未注册的维度忽略；
+    综合得分因此始终是各维度得分的加权平均，新增维度不会改变它的量纲
+    """
+    weights = {
+        name: float(weights.get(name, dimension.default_weight))
+        for name, dimension in _dimensions.items()
+    }
+    total = sum(weights.values())
+    if total <= 0:
+        return weights
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def required_analyses(names):
+    """指定维度直接依赖的分析名称（去重，保持顺序）"""
+    required = []
+    for name in names:
+        for analysis in _dimensions[name].requires:
+            if analysis not in required:
+                required.append(analysis)
+    return required
+
+
+def active_dimensions(weights, names=None):
+    """权重大于0的维度（按注册顺序），names 指定时只在其中选取"""
+    names = dimension_names() if names is None else names
+    return [_dimensions[name] for name in names if weights.get(name, 0) > 0]
+
+
+class LazyAnalysis(Mapping):
+    """
+    按需计算的分析结果
+    只有被访问的分析（及其依赖）才会计算，结果随快照缓存；
+    统计状态更新前需调用 freeze() 计算出全部结果，之后不再读取统计状态
+    """
+    def __init__(self, state):
+        self._state = state
+        self._size = state.size
+        self._results = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name):
+        result = self._results.get(name)
+        if result is not None:
+            return result
+        analysis = _analyses[name]
+        with self._lock:
+            if name not in self._results:
+                if self._state is None or self._state.size != self._size:
+                    raise RuntimeError('统计状态已更新，分析快照已失效')
+                for dependency in analysis.requires:
+                    self[dependency]
+                self._results[name] = analysis.compute(self._state, self)
+            return self._results[name]
+
+    def __iter__(self):
+        return iter(_analyses)
+
+    def __len__(self):
+        return len(_analyses)
+
+    def evaluate(self, names):
+        """计算指定的分析"""
+        for name in names:
+            self[name]
+
+    def freeze(self):
+        """计算全部分析并与统计状态脱离"""
+        with self._lock:
+            if self._state is not None:
+                self.evaluate(list(_analyses))
+                self._state = None
+
+
+# ---- 冷热号 ----
+
+def score_hot_cold(analysis, red_balls):
+    """评分：冷热号分布"""
+    analysis = analysis['hot_cold']
+    red_hot = set(analysis['red_hot'])
+    red_warm = set(analysis['red_warm'])
+    red_cold = set(analysis['red_cold'])
+
+    # 计算所选号码中热温冷的数量
+    hot_count = sum(1 for ball in red_balls if ball in red_hot)
+    warm_count = sum(1 for ball in red_balls if ball in red_warm)
+    cold_count = sum(1 for ball in red_balls if ball in red_cold)
+
+    return _hot_cold_score(hot_count, warm_count, cold_count)
+
+
+def _hot_cold_score(hot_count, warm_count, cold_count):
+    # 理想比例：2-3个热号，2-3个温号，1个冷号
+    hot_score = 100 if 2 <= hot_count <= 3 else 60
+    warm_score = 100 if 2 <= warm_count <= 3 else 60
+    cold_score = 100 if cold_count == 1 else 60
+
+    return (hot_score * 0.4 + warm_score * 0.4 + cold_score * 0.2)
+
+
+def hot_cold_tables(analysis):
+    """冷热分类：2=热号，1=温号，0=冷号"""
+    hot_cold = analysis['hot_cold']
+    hot_cold_class = np.zeros(34, dtype=np.int8)
+    hot_cold_class[hot_cold['red_hot']] = 2
+    hot_cold_class[hot_cold['red_warm']] = 1
+    return hot_cold_class
+
+
+def batch_score_hot_cold(red, hot_cold_class):
+    """批量评分：冷热号分布"""
+    hot_cold_class = hot_cold_class[red]
+    hot_count = (hot_cold_class == 2).sum(axis=1)
+    warm_count = (hot_cold_class == 1).sum(axis=1)
+    cold_count = (hot_cold_class == 0).sum(axis=1)
+
+    hot_score = np.where((hot_count >= 2) & (hot_count <= 3), 100, 60)
+    warm_score = np.where((warm_count >= 2) & (warm_count <= 3), 100, 60)
+    cold_score = np.where(cold_count == 1, 100, 60)
+
+    return hot_score * 0.4 + warm_score * 0.4 + cold_score * 0.2
+
+
+# ---- 遗漏值 ----
+
+def score_missing_values(analysis, red_balls):
+    """评分：遗漏值分布"""
+    red_missing = analysis['missing_values']['red_missing']
+
+    # 计算选中号码的遗漏值
+    return _missing_values_score([red_missing[ball] for ball in red_balls])
+
+
+def _missing_values_score(missing_values):
+    # 评分规则：
+    # 1. 至少包含1个遗漏值较大的号码（遗漏值>10）
+    # 2. 不要选择太多遗漏值大的号码
+    # 3. 遗漏值的分布应该相对均匀
+    high_missing = sum(1 for v in missing_values if v > 10)
+    max_missing = max(missing_values)
+    min_missing = min(missing_values)
+
+    # 计算得分
+    score = 100
+    if high_missing == 0:
+        score -= 20  # 没有大遗漏值扣分
+    elif high_missing > 2:
+        score -= 10  # 大遗漏值太多扣分
+
+    if max_missing - min_missing > 20:
+        score -= 10  # 遗漏值差距太大扣分
+
+    return score
+
+
+def missing_values_tables(analysis):
+    """按号码查遗漏值"""
+    red_missing = np.zeros(34, dtype=np.int64)
+    for num, value in analysis['missing_values']['red_missing'].items():
+        red_missing[num] = value
+    return red_missing
+
+
+def batch_score_missing_values(red, red_missing):
+    """批量评分：遗漏值分布"""
+    missing_values = red_missing[red]
+    high_missing = (missing_values > 10).sum(axis=1)
+    spread = missing_values.max(axis=1) - missing_values.min(axis=1)
+
+    score = np.full(len(red), 100, dtype=np.int64)
+    score -= np.where(high_missing == 0, 20, np.where(high_missing > 2, 10, 0))
+    score -= np.where(spread > 20, 10, 0)
+    return score
+
+
+# ---- 号码间隔 ----
+
+def score_intervals(analysis, red_balls):
+    """评分：号码间隔"""
+    sorted_balls = sorted(red_balls)
+    intervals = [sorted_balls[i+1] - sorted_balls[i] for i in range(len(sorted_balls)-1)]
+
+    # 获取历史间隔数据
+    interval_freq = analysis['intervals']['interval_freq']
+
+    # 评分规则：
+    # 1. 间隔不应该太大（>8）或太小（=1）
+    # 2. 间隔应该符合历史频率分布
+    score = 100
+
+    # 检查间隔是否合理
+    for interval in intervals:
+        if interval > 8:
+            score -= 10
+        elif interval == 1:
+            score -= 5
+
+    # 检查间隔的频率分布
+    for interval in intervals:
+        freq = interval_freq.get(interval, 0)
+        if freq < 10:  # 历史上很少出现的间隔
+            score -= 5
+
+    return max(score, 0)
+
+
+def intervals_tables(analysis):
+    """按间隔查历史出现次数"""
+    interval_freq = np.zeros(33, dtype=np.int64)
+    for interval, count in analysis['intervals']['interval_freq'].items():
+        interval_freq[interval] = count
+    return interval_freq
+
+
+def batch_score_intervals(red, interval_freq):
+    """批量评分：号码间隔"""
+    intervals = np.diff(np.sort(red, axis=1), axis=1)
+
+    score = np.full(len(red), 100, dtype=np.int64)
+    score -= 10 * (intervals > 8).sum(axis=1)
+    score -= 5 * (intervals == 1).sum(axis=1)
+    score -= 5 * (interval_freq[intervals] < 10).sum(axis=1)
+    return np.maximum(score, 0)
+
+
+# ---- 奇偶比例 ----
+
+def _odd_even_score(common_ratios, odd_count):
+    if (odd_count, 6 - odd_count) in common_ratios:
+        return 100
+    elif odd_count in [2, 3, 4]:  # 较为合理的比例
+        return 80
+    elif odd_count in [1, 5]:     # 不太合理的比例
+        return 60
+    return 40                     # 极端比例
+
+
+def score_odd_even(analysis, red_balls):
+    """评分：奇偶比例在常见比例中得满分，并避免极端比例（6:0或0:6）"""
+    odd_count = sum(1 for x in red_balls if x % 2 == 1)
+    common_ratios = [ratio for ratio, _ in analysis['odd_even']['most_common_ratios']]
+    return _odd_even_score(common_ratios, odd_count)
+
+
+def odd_even_tables(analysis):
+    """按奇数个数查分"""
+    common_ratios = [ratio for ratio, _ in analysis['odd_even']['most_common_ratios']]
+    return np.array([_odd_even_score(common_ratios, odd_count) for odd_count in range(7)], dtype=np.int64)
+
+
+def batch_score_odd_even(red, odd_even_score):
+    """批量评分：奇偶比例"""
+    odd_count = (red % 2 == 1).sum(axis=1)
+    return odd_even_score[odd_count]
+
+
+# ---- 区间分布 ----
+
+def _zone_score(common_zones, zones):
+    if zones in common_zones:
+        return 100
+    elif min(zones) >= 1:  # 每个区间都有号码
+        return 80
+    elif max(zones) >= 4:  # 某个区间过于集中
+        return 60
+    return 40
+
+
+def score_zones(analysis, red_balls):
+    """评分：区间分布在常见分布中得满分，每个区间至少要有1个号码，避免号码过于集中"""
+    zone1 = sum(1 for x in red_balls if 1 <= x <= 11)
+    zone2 = sum(1 for x in red_balls if 12 <= x <= 22)
+    zone3 = sum(1 for x in red_balls if 23 <= x <= 33)
+    common_zones = [dist for dist, _ in analysis['zones']['most_common_zones']]
+    return _zone_score(common_zones, (zone1, zone2, zone3))
+
+
+def zones_tables(analysis):
+    """按 (一区, 二区, 三区) 个数查分"""
+    common_zones = [dist for dist, _ in analysis['zones']['most_common_zones']]
+    zone_score = np.zeros((7, 7, 7), dtype=np.int64)
+    for zone1 in range(7):
+        for zone2 in range(7 - zone1):
+            zone3 = 6 - zone1 - zone2
+            zone_score[zone1, zone2, zone3] = _zone_score(common_zones, (zone1, zone2, zone3))
+    return zone_score
+
+
+def batch_score_zones(red, zone_score):
+    """批量评分：区间分布"""
+    zone1 = (red <= 11).sum(axis=1)
+    zone2 = ((red >= 12) & (red <= 22)).sum(axis=1)
+    zone3 = (red >= 23).sum(axis=1)
+    return zone_score[zone1, zone2, zone3]
+
+
+# ---- 多窗口综合 ----
+
+ENSEMBLE_WINDOWS = (30, 100, 300, None)  # 多窗口综合使用的窗口期数，None 表示全部历史
+
+
+def multi_window_analysis(state, analysis):
+    """
+    在多个窗口上同时统计冷热号、遗漏值和区间分布
+    各窗口的次数都由同一份前缀和相减得到，遗漏值由全部历史的最后出现位置换算，不需要重复加载数据。
+    冷热号按窗口内出现次数排名三等分（前11个为热号，后11个为冷号）；
+    遗漏值为距最近一次出现的期数，窗口内未出现记为窗口期数。
+    与 hot_cold、missing 维度的定义不同：那两个维度只看最近30/100期，按"出现>=3次为热号、未出现为冷号"
+    和期号之差计算；放到几百期以上的窗口时几乎所有号码都会超过固定阈值（没有冷号，得分失去区分度），
+    期号之差也会在跨年处跳变（如 2016001 - 2015154），所以这里改用排名和期数距离
+    """
+    index = analysis['frequency_index']
+    last_rows = state.red_last_row[1:]
+    by_window = []
+    for window in ENSEMBLE_WINDOWS:
+        start, end = index.bounds(window)
+        ranked = (np.argsort(-index.red_counts(start, end), kind='stable') + 1).tolist()
+        missing = np.where(last_rows >= start, end - 1 - last_rows, end - start)
+
+        zone_counts = index.zone_counts(start, end)
+        most_common_zones = []
+        for code in np.argsort(-zone_counts, kind='stable')[:3]:
+            if zone_counts[code]:
+                zone1, zone2 = divmod(int(code), 7)
+                most_common_zones.append(((zone1, zone2, 6 - zone1 - zone2), int(zone_counts[code])))
+
+        by_window.append({
+            'window': window,
+            'periods': end - start,
+            'red_hot': ranked[:11],
+            'red_warm': ranked[11:22],
+            'red_cold': ranked[22:],
+            'red_missing': {num: int(missing[num - 1]) for num in range(1, 34)},
+            'most_common_zones': most_common_zones
+        })
+    return {'windows': list(ENSEMBLE_WINDOWS), 'by_window': by_window}
+
+
+def score_multi_window(analysis, red_balls):
+    """评分：各窗口的冷热号、遗漏值、区间分布得分取平均，再对各窗口取平均（取整）"""
+    by_window = analysis['multi_window']['by_window']
+    total = 0.0
+    for stats in by_window:
+        hot_cold = _hot_cold_score(
+            sum(1 for ball in red_balls if ball in stats['red_hot']),
+            sum(1 for ball in red_balls if ball in stats['red_warm']),
+            sum(1 for ball in red_balls if ball in stats['red_cold'])
+        )
+        missing = _missing_values_score([stats['red_missing'][ball] for ball in red_balls])
+        zones = (
+            sum(1 for x in red_balls if 1 <= x <= 11),
+            sum(1 for x in red_balls if 12 <= x <= 22),
+            sum(1 for x in red_balls if 23 <= x <= 33)
+        )
+        zone = _zone_score([dist for dist, _ in stats['most_common_zones']], zones)
+        total += (hot_cold + missing + zone) / 3
+    return round(total / len(by_window))
+
+
+def multi_window_tables(analysis):
+    """每个窗口一组 (冷热分类, 遗漏值, 区间分布得分) 查找表"""
+    tables = []
+    for stats in analysis['multi_window']['by_window']:
+        hot_cold_class = np.zeros(34, dtype=np.int8)
+        hot_cold_class[stats['red_hot']] = 2
+        hot_cold_class[stats['red_warm']] = 1
+
+        red_missing = np.zeros(34, dtype=np.int64)
+        for num, value in stats['red_missing'].items():
+            red_missing[num] = value
+
+        common_zones = [dist for dist, _ in stats['most_common_zones']]
+        zone_score = np.zeros((7, 7, 7), dtype=np.int64)
+        for zone1 in range(7):
+            for zone2 in range(7 - zone1):
+                zone3 = 6 - zone1 - zone2
+                zone_score[zone1, zone2, zone3] = _zone_score(common_zones, (zone1, zone2, zone3))
+        tables.append((hot_cold_class, red_missing, zone_score))
+    return tables
+
+
+def batch_score_multi_window(red, tables):
+    """批量评分：多窗口综合"""
+    # 区间个数与窗口无关，只计算一次
+    zone1 = (red <= 11).sum(axis=1)
+    zone2 = ((red >= 12) & (red <= 22)).sum(axis=1)
+    zone3 = 6 - zone1 - zone2
+
+    total = np.zeros(len(red), dtype=np.float64)
+    for hot_cold_class, red_missing, zone_score in tables:
+        total += (
+            batch_score_hot_cold(red, hot_cold_class)
+            + batch_score_missing_values(red, red_missing)
+            + zone_score[zone1, zone2, zone3]
+        ) / 3
+    return np.rint(total / len(tables)).astype(np.int64)
+
+
+# 内置的统计分析
+register_analysis('hot_cold', lambda state, analysis: state.hot_cold())
+register_analysis('missing_values', lambda state, analysis: state.missing_values())
+register_analysis('intervals', lambda state, analysis: state.intervals())
+register_analysis('odd_even', lambda state, analysis: state.odd_even())
+register_analysis('zones', lambda state, analysis: state.zones())
+register_analysis('frequency_index', lambda state, analysis: FrequencyIndex(state.draws))
+register_analysis('multi_window', multi_window_analysis, requires=['frequency_index'])
+
+# 内置的评分维度（注册顺序即加权求和的顺序）
+register_dimension(
+    'hot_cold', ['hot_cold'], score_hot_cold, batch_score_hot_cold, 0.20,
+    tables=hot_cold_tables, suggestion='建议调整冷热号的比例'
+)
+register_dimension(
+    'missing', ['missing_values'], score_missing_values, batch_score_missing_values, 0.15,
+    tables=missing_values_tables, suggestion='建议考虑遗漏值的分布'
+)
+register_dimension(
+    'interval', ['intervals'], score_intervals, batch_score_intervals, 0.15,
+    tables=intervals_tables, suggestion='建议优化号码间隔'
+)
+register_dimension(
+    'odd_even', ['odd_even'], score_odd_even, batch_score_odd_even, 0.10,
+    tables=odd_even_tables, suggestion='建议调整奇偶比例'
+)
+register_dimension(
+    'zone', ['zones'], score_zones, batch_score_zones, 0.10,
+    tables=zones_tables, suggestion='建议优化区间分布'
+)
+register_dimension(
+    'multi_window', ['multi_window'], score_multi_window, batch_score_multi_window, 0.10,
+    tables=multi_window_tables, suggestion='建议兼顾长短周期的冷热、遗漏和区间分布'
+)
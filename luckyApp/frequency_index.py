@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+from .analysis_state import ZONE_CODES, draw_features
+from .history_store import RED_COUNT, BLUE_COUNT
+
+
+class FrequencyIndex:
+    """
+    按期次位置累计的号码出现次数（前缀和）
+    第 k 行为前 k 期的累计次数，任意区间 [i, j) 的统计只需两行相减，与区间长度无关
+    """
+    def __init__(self, draws):
+        self.draws = draws
+        size = len(draws)
+        _, _, zone_codes = draw_features(draws.balls)
+        zone_onehot = np.zeros((size, ZONE_CODES), dtype=np.int32)
+        zone_onehot[np.arange(size), zone_codes] = 1
+
+        self.red_cum = self._cumulative(draws.red_onehot)
+        self.blue_cum = self._cumulative(draws.blue_onehot)
+        self.zone_cum = self._cumulative(zone_onehot)
+
+    @staticmethod
+    def _cumulative(onehot):
+        cumulative = np.zeros((len(onehot) + 1, onehot.shape[1]), dtype=np.int32)
+        np.cumsum(onehot, axis=0, dtype=np.int32, out=cumulative[1:])
+        return cumulative
+
+    def __len__(self):
+        return len(self.draws)
+
+    def bounds(self, window=None, end=None):
+        """最近window期（截止到第end期之前，默认全部数据）对应的区间 [start, end)"""
+        end = len(self) if end is None else min(max(end, 0), len(self))
+        start = 0 if window is None else max(end - window, 0)
+        return start, end
+
+    def red_counts(self, start, end):
+        """区间 [start, end) 内红球1-33的出现次数"""
+        return self.red_cum[end] - self.red_cum[start]
+
+    def blue_counts(self, start, end):
+        """区间 [start, end) 内蓝球1-16的出现次数"""
+        return self.blue_cum[end] - self.blue_cum[start]
+
+    def zone_counts(self, start, end):
+        """区间 [start, end) 内各区间分布编码（一区个数*7 + 二区个数）的出现次数"""
+        return self.zone_cum[end] - self.zone_cum[start]
+
+    def window_stats(self, window=None, end=None, hot_threshold=None):
+        """
+        最近window期的频率、冷热号和区间统计
+        热号阈值默认按30期出现3次等比例换算（至少2次），出现过但未达到阈值的为温号，未出现的为冷号
+        """
+        start, end = self.bounds(window, end)
+        red_counts = self.red_counts(start, end)
+        blue_counts = self.blue_counts(start, end)
+        zone_counts = self.zone_counts(start, end)
+        if hot_threshold is None:
+            hot_threshold = max(2, math.ceil((end - start) * 3 / 30))
+
+        numbers = np.arange(1, RED_COUNT + 1)
+        zone_freq = {}
+        for code in np.flatnonzero(zone_counts):
+            zone1, zone2 = divmod(int(code), 7)
+            zone_freq[(zone1, zone2, 6 - zone1 - zone2)] = int(zone_counts[code])
+
+        return {
+            'periods': end - start,
+            'start_draw': str(self.draws.draw_nums[start]) if end > start else None,
+            'end_draw': str(self.draws.draw_nums[end - 1]) if end > start else None,
+            'red_count': {int(num): int(count) for num, count in zip(numbers, red_counts)},
+            'blue_count': {num: int(blue_counts[num - 1]) for num in range(1, BLUE_COUNT + 1)},
+            'red_hot': numbers[red_counts >= hot_threshold].tolist(),
+            'red_warm': numbers[(red_counts > 0) & (red_counts < hot_threshold)].tolist(),
+            'red_cold': numbers[red_counts == 0].tolist(),
+            'zone_ball_count': [
+                int(red_counts[:11].sum()), int(red_counts[11:22].sum()), int(red_counts[22:].sum())
+            ],
+            'zone_freq': zone_freq
+        }
@@ -0,0 +1,93 @@
+import logging
+
+import numpy as np
+from django.db import transaction
+from .compound import grade_tickets
+from .models import LotteryHistory, PredictionRecord
+
+logger = logging.getLogger(__name__)
+
+
+def write_grades(ids, red_hits, blue_hits, is_hit, banker_hits=None, batch_size=1000):
+    """
+    批量写回命中结果
+    判定结果只有几十种组合，按 (命中数, 胆码命中数, 蓝球是否命中, 是否中奖) 分组，
+    每组用一条 UPDATE ... WHERE id IN 写回
+    """
+    ids = np.asarray(ids)
+    if banker_hits is None:
+        banker_hits = np.zeros(len(ids), dtype=np.int64)
+    outcomes = np.column_stack((red_hits, banker_hits, blue_hits, is_hit)).astype(np.int64)
+    groups, inverse = np.unique(outcomes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    for index, (hit_count, banker_hit_count, blue_hit, hit) in enumerate(groups.tolist()):
+        group_ids = ids[inverse == index].tolist()
+        values = {
+            'hit_count': hit_count,
+            'banker_hit_count': banker_hit_count,
+            'blue_hit': bool(blue_hit),
+            'is_hit': bool(hit)
+        }
+        for start in range(0, len(group_ids), batch_size):
+            PredictionRecord.objects.filter(id__in=group_ids[start:start + batch_size]).update(**values)
+
+
+def regrade_predictions(since=None, until=None, start_id=0, chunk_size=50000, on_chunk=None):
+    """
+    按开奖记录重新判定预测记录的命中情况（不调整权重）
+    开奖号码一次性载入内存，预测记录按id分批读取并与开奖号码按期号对应；
+    只写回结果有变化的记录，每批一个事务，完成后调用 on_chunk(最后的id, 统计)，便于断点续跑
+    返回 {'checked', 'updated', 'skipped'}
+    """
+    draws = LotteryHistory.objects.order_by('draw_num')
+    if since:
+        draws = draws.filter(draw_num__gte=since)
+    if until:
+        draws = draws.filter(draw_num__lte=until)
+    draw_rows = list(draws.values_list('draw_num', 'red_mask', 'blue_ball'))
+    totals = {'checked': 0, 'updated': 0, 'skipped': 0}
+    if not draw_rows:
+        return totals
+
+    draw_index = {draw_num: index for index, (draw_num, _, _) in enumerate(draw_rows)}
+    draw_masks = np.array([row[1] for row in draw_rows], dtype=np.uint64)
+    draw_blues = np.array([row[2] for row in draw_rows], dtype=np.int64)
+
+    predictions = PredictionRecord.objects.filter(
+        draw_num__gte=draw_rows[0][0], draw_num__lte=draw_rows[-1][0]
+    )
+    last_id = start_id
+    while True:
+        chunk = list(
+            predictions.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'draw_num', 'red_mask', 'banker_mask', 'blue_mask',
+                'hit_count', 'banker_hit_count', 'blue_hit', 'is_hit'
+            )[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        # 按期号对应到开奖记录，期号不在开奖记录中的（未开奖或缺失）跳过
+        positions = np.array([draw_index.get(row[1], -1) for row in chunk], dtype=np.int64)
+        drawn = positions >= 0
+        data = np.array([row[:1] + row[2:] for row in chunk], dtype=np.int64)[drawn]
+        positions = positions[drawn]
+
+        grades = grade_tickets(data[:, 1], data[:, 2], data[:, 3], draw_masks[positions], draw_blues[positions])
+        red_hits, banker_hits, blue_hits = grades['red_hits'], grades['banker_hits'], grades['blue_hits']
+        is_hit = grades['prize_counts'][:, 1:].any(axis=1)
+        changed = (red_hits != data[:, 4]) | (banker_hits != data[:, 5]) \
+            | (blue_hits != data[:, 6].astype(bool)) | (is_hit != data[:, 7].astype(bool))
+
+        with transaction.atomic():
+            write_grades(
+                data[changed, 0], red_hits[changed], blue_hits[changed], is_hit[changed], banker_hits[changed]
+            )
+
+        totals['checked'] += int(drawn.sum())
+        totals['updated'] += int(changed.sum())
+        totals['skipped'] += int((~drawn).sum())
+        if on_chunk:
+            on_chunk(last_id, totals)
+    return totals
@@ -0,0 +1,90 @@
+import numpy as np
+from functools import cached_property
+from .models import LotteryHistory
+from .bitmask import red_masks
+
+RED_COUNT = 33  # 红球号码个数
+BLUE_COUNT = 16  # 蓝球号码个数
+
+BALL_FIELDS = (
+    'red_ball_1', 'red_ball_2', 'red_ball_3',
+    'red_ball_4', 'red_ball_5', 'red_ball_6', 'blue_ball'
+)
+
+
+class DrawMatrix:
+    """
+    开奖号码的列式存储
+    按期号升序排列（最早一期在前），balls 为 (N, 7) 的小整数数组：前6列为红球，最后一列为蓝球
+    """
+    def __init__(self, draw_nums, balls):
+        self.draw_nums = np.asarray(draw_nums, dtype=np.int64)
+        self.balls = np.asarray(balls, dtype=np.int8).reshape(-1, 7)
+
+    @classmethod
+    def load(cls, limit=None):
+        """从数据库加载最近limit期（默认全部）的开奖号码"""
+        queryset = LotteryHistory.objects.order_by('-draw_num').values_list('draw_num', *BALL_FIELDS)
+        if limit is not None:
+            queryset = queryset[:limit]
+        rows = list(queryset)[::-1]
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """由 (期号, 红球1..6, 蓝球) 元组列表构建，行需按期号升序"""
+        draw_nums = [int(row[0]) for row in rows]
+        balls = [row[1:8] for row in rows]
+        return cls(draw_nums, np.array(balls, dtype=np.int8).reshape(-1, 7))
+
+    def __len__(self):
+        return len(self.draw_nums)
+
+    @property
+    def red(self):
+        """(N, 6) 红球"""
+        return self.balls[:, :6]
+
+    @property
+    def blue(self):
+        """(N,) 蓝球"""
+        return self.balls[:, 6]
+
+    @property
+    def latest_draw_num(self):
+        return int(self.draw_nums[-1]) if len(self) else None
+
+    @cached_property
+    def sorted_red(self):
+        """每期红球从小到大排序"""
+        return np.sort(self.red, axis=1)
+
+    @cached_property
+    def red_onehot(self):
+        """(N, 33) 红球出现矩阵，第 i 列对应号码 i+1"""
+        onehot = np.zeros((len(self), RED_COUNT), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(self)), 6)
+        onehot[rows, self.red.ravel().astype(np.intp) - 1] = 1
+        return onehot
+
+    @cached_property
+    def blue_onehot(self):
+        """(N, 16) 蓝球出现矩阵，第 i 列对应号码 i+1"""
+        onehot = np.zeros((len(self), BLUE_COUNT), dtype=np.uint8)
+        onehot[np.arange(len(self)), self.blue.astype(np.intp) - 1] = 1
+        return onehot
+
+    @cached_property
+    def red_masks(self):
+        """(N,) uint64 红球掩码，号码 n 对应第 n-1 位"""
+        return red_masks(self.red)
+
+    def head(self, n):
+        """最早的n期数据"""
+        return DrawMatrix(self.draw_nums[:n], self.balls[:n])
+
+    def tail(self, n):
+        """最近n期的数据"""
+        if n is None or n >= len(self):
+            return self
+        return DrawMatrix(self.draw_nums[len(self) - n:], self.balls[len(self) - n:])
@@ -0,0 +1,129 @@
+from django.core.management.base import BaseCommand
+from luckyApp.backtest import DEFAULT_POOL_SIZE, backtest_options, run_backtest, summarize
+from luckyApp.prizes import PRIZE_NAMES, PRIZE_SLOTS
+from luckyApp.history_store import DrawMatrix
+from luckyApp.predictor import LotteryPredictor
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '逐期回测：按历史数据重放智能预测（固定使用默认权重），并与随机选号对比中奖情况'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tickets',
+            type=int,
+            default=5,
+            help='每期生成的注数'
+        )
+        parser.add_argument(
+            '--start-draw',
+            default=None,
+            help='起始期号（含）'
+        )
+        parser.add_argument(
+            '--end-draw',
+            default=None,
+            help='结束期号（含）'
+        )
+        parser.add_argument(
+            '--min-history',
+            type=int,
+            default=100,
+            help='至少积累多少期历史数据后才开始回测'
+        )
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            default=DEFAULT_POOL_SIZE,
+            help='每期随机抽取的候选组合数，0表示对全部组合评分（每期约3秒，全部历史单进程约2.5小时）'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='并行进程数'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='随机种子，用于复现结果'
+        )
+        parser.add_argument(
+            '--output',
+            default='backtest_results.jsonl',
+            help='逐期结果文件，参数相同且已存在的期号会跳过，可中断后继续'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            draws = DrawMatrix.load()
+            predictor = LotteryPredictor()
+            params = backtest_options(
+                options['tickets'], predictor.min_score_threshold,
+                seed=options['seed'], pool_size=options['pool_size']
+            )
+            # 与结果文件中的参数按 JSON 形式比较
+            params = json.loads(json.dumps(params))
+            done = self.load_done(options['output'], params)
+
+            start_draw = int(options['start_draw']) if options['start_draw'] else None
+            end_draw = int(options['end_draw']) if options['end_draw'] else None
+            step_indices = [
+                index for index in range(options['min_history'], len(draws))
+                if (start_draw is None or draws.draw_nums[index] >= start_draw)
+                and (end_draw is None or draws.draw_nums[index] <= end_draw)
+                and str(draws.draw_nums[index]) not in done
+            ]
+            self.stdout.write(f'共 {len(step_indices)} 期待回测，已完成 {len(done)} 期（使用默认权重）')
+
+            start = time.perf_counter()
+            with open(options['output'], 'a') as f:
+                def save_results(results):
+                    for result in results:
+                        f.write(json.dumps(result) + '\n')
+                    f.flush()
+                    done.update(result['draw_num'] for result in results)
+                    self.stdout.write(f'已完成 {len(done)} 期，耗时 {time.perf_counter() - start:.1f} 秒')
+
+                run_backtest(
+                    draws, step_indices, params,
+                    workers=options['workers'], on_result=save_results
+                )
+
+            self.report(summarize(self.load_results(options['output'], params)), options['tickets'])
+        except Exception as e:
+            logger.error(f"回测失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"回测失败: {str(e)}")
+            )
+
+    def load_results(self, path, params):
+        """读取结果文件中参数与本次相同的逐期结果"""
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            results = [json.loads(line) for line in f if line.strip()]
+        return [result for result in results if result.get('params') == params]
+
+    def load_done(self, path, params):
+        return {result['draw_num'] for result in self.load_results(path, params)}
+
+    def report(self, summary, tickets):
+        total = summary['draws'] * tickets
+        self.stdout.write(self.style.SUCCESS(f"\n回测完成：共 {summary['draws']} 期，每期 {tickets} 注"))
+        self.stdout.write(f"{'奖项':<8}{'智能预测':>10}{'随机选号':>10}")
+        for level in range(1, PRIZE_SLOTS):
+            self.stdout.write(
+                f"{PRIZE_NAMES[level]:<8}{summary['predicted'][level]:>12}{summary['random'][level]:>12}"
+            )
+        if total:
+            predicted_rate = (total - summary['predicted'][0]) / total * 100
+            random_rate = (total - summary['random'][0]) / total * 100
+            self.stdout.write(f"{'中奖率':<8}{predicted_rate:>11.2f}%{random_rate:>11.2f}%")
+        self.stdout.write(f"{'估算奖金':<8}{summary['predicted_payout']:>12}{summary['random_payout']:>12}")
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from luckyApp.predictor import MultiDimensionalAnalyzer
+from luckyApp.score_table import ScoreTable, build_lock, get_score_table, default_table_path
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '为全部红球组合计算得分并生成内存映射得分表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=None,
+            help='得分表文件路径（默认使用 settings.SCORE_TABLE_PATH）'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='即使得分表已是最新也重新生成'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or default_table_path()
+        try:
+            analyzer = MultiDimensionalAnalyzer()
+            snapshot = analyzer.get_snapshot(refresh=True)
+
+            with build_lock(path) as acquired:
+                if not acquired:
+                    self.stdout.write(self.style.WARNING('其他进程正在生成得分表，本次跳过'))
+                    return
+                if not options['force'] and get_score_table(snapshot.version, path) is not None:
+                    self.stdout.write(f'得分表已是最新（期号 {snapshot.version}）')
+                    return
+
+                self.stdout.write(f'开始生成期号 {snapshot.version} 的组合得分表...')
+                start = time.perf_counter()
+                ScoreTable.build(analyzer, path)
+            self.stdout.write(
+                self.style.SUCCESS(f'得分表已生成: {path}，耗时 {time.perf_counter() - start:.1f} 秒')
+            )
+        except Exception as e:
+            logger.error(f"生成得分表失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"生成得分表失败: {str(e)}")
+            )
@@ -21,11 +21,22 @@ class Command(BaseCommand):
             default=None,
             help='结束年份'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='并发下载年度页面的线程数'
+        )
         parser.add_argument(
             '--latest',
             action='store_true',
             help='只爬取最新一期数据'
         )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='增量同步：只抓取缺失的年份，只保存尚未入库的期号'
+        )
 
     def handle(self, *args, **options):
         try:
@@ -40,16 +51,33 @@ class Command(BaseCommand):
                     )
                 else:
                     self.stdout.write(
-                        self.style.WARNING("未获取到最新数据")
+                        self.style.WARNING("暂无新的开奖数据")
+                    )
+            elif options['sync']:
+                self.stdout.write(f"开始增量同步 {options['start_year']} 年以来的数据...")
+                stats = crawler.sync(options['start_year'], options['workers'])
+                self.stdout.write(
+                    self.style.SUCCESS(f"同步完成：抓取 {stats['years']} 个年度页面，新增 {stats['inserted']} 期")
+                )
+                if stats['failed']:
+                    self.stdout.write(
+                        self.style.WARNING(f"以下年份获取或保存失败，可稍后重试: {stats['failed']}")
                     )
             else:
                 start_year = options['start_year']
                 end_year = options['end_year'] or datetime.now().year
                 self.stdout.write(f'开始爬取 {start_year} 到 {end_year} 年的数据...')
-                crawler.crawl_history(start_year)
+                stats = crawler.crawl_history(start_year, end_year, options['workers'])
                 self.stdout.write(
-                    self.style.SUCCESS('数据爬取完成')
+                    self.style.SUCCESS(
+                        f"数据爬取完成：{stats['years']} 个年度页面，共 {stats['draws']} 期"
+                        f"（新增 {stats['inserted']} 期，更新 {stats['updated']} 期，未变化 {stats['unchanged']} 期）"
+                    )
                 )
+                if stats['failed']:
+                    self.stdout.write(
+                        self.style.WARNING(f"以下年份获取或保存失败，可稍后重试: {stats['failed']}")
+                    )
         except Exception as e:
             logger.error(f"爬取数据失败: {str(e)}")
             self.stdout.write(
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from luckyApp.models import LotteryHistory
+from luckyApp.random_tickets import RandomTicketGenerator, save_predictions, write_csv
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '批量生成不重复的随机号码，分批写入CSV文件或数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100000,
+            help='生成注数'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='随机种子，用于复现结果'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100000,
+            help='每批生成的注数'
+        )
+        parser.add_argument(
+            '--output',
+            default='random_tickets.csv',
+            help='输出CSV文件路径'
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='写入数据库作为随机选号的预测记录（不再输出CSV）'
+        )
+        parser.add_argument(
+            '--draw-num',
+            help='写入数据库时的预测期号（默认为最新期号的下一期）'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            generator = RandomTicketGenerator(options['seed'])
+            chunks = generator.iter_chunks(options['count'], options['chunk_size'])
+            start = time.perf_counter()
+
+            if options['save']:
+                draw_num = options['draw_num']
+                if not draw_num:
+                    latest_record = LotteryHistory.objects.order_by('-draw_num').first()
+                    if not latest_record:
+                        self.stdout.write(self.style.ERROR('没有历史开奖数据，请通过 --draw-num 指定期号'))
+                        return
+                    draw_num = str(int(latest_record.draw_num) + 1)
+                total = save_predictions(draw_num, chunks)
+                target = f"期号 {draw_num} 的预测记录"
+            else:
+                total = write_csv(options['output'], chunks)
+                target = options['output']
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"已生成 {total} 注随机号码，耗时 {time.perf_counter() - start:.1f} 秒，已写入{target}"
+                )
+            )
+        except Exception as e:
+            logger.error(f"批量生成随机号码失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"批量生成随机号码失败: {str(e)}")
+            )
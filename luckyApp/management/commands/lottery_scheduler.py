@@ -2,7 +2,9 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from luckyApp.models import LotteryHistory
 from luckyApp.crawler import LotteryCrawler
-from luckyApp.predictor import LotteryPredictor
+from luckyApp.predictor import (
+    LotteryPredictor, absorb_new_draw, schedule_score_table_rebuild, wait_for_score_table_rebuild
+)
 import logging
 import time
 import random
@@ -28,7 +30,7 @@ class Command(BaseCommand):
         group.add_argument(
             '--init',
             action='store_true',
-            help='初始化模式：抓取所有历史数据'
+            help='初始化模式：抓取所有缺失的历史数据'
         )
 
     def handle(self, *args, **options):
@@ -49,6 +51,8 @@ class Command(BaseCommand):
                 self.check_and_update()
                 
                 if not options['daemon']:
+                    # 后台线程是守护线程，一次性运行时等得分表重建完成再退出
+                    wait_for_score_table_rebuild()
                     break
                     
                 # 每10分钟检查一次
@@ -66,34 +70,31 @@ class Command(BaseCommand):
     def run_init(self):
         """运行初始化模式"""
         try:
-            # 检查是否已有数据
+            # 已有数据时不再清空重抓，只抓取缺失的年份和期号
             if LotteryHistory.objects.exists():
+                self.stdout.write('数据库中已有数据，只补充缺失的期号...')
+            else:
+                self.stdout.write('开始抓取历史数据...')
+            crawler = LotteryCrawler()
+            stats = crawler.sync()
+            self.stdout.write(f"抓取 {stats['years']} 个年度页面，新增 {stats['inserted']} 期")
+            if stats['failed']:
                 self.stdout.write(
-                    self.style.WARNING('数据库中已有数据，确认要重新初始化吗？[y/N]')
+                    self.style.WARNING(f"以下年份获取或保存失败，可再次运行补充: {stats['failed']}")
                 )
-                confirm = input().lower()
-                if confirm != 'y':
-                    self.stdout.write('初始化已取消')
-                    return
-                    
-                # 清空现有数据
-                self.stdout.write('清空现有数据...')
-                LotteryHistory.objects.all().delete()
-            
-            # 开始抓取历史数据
-            self.stdout.write('开始抓取历史数据...')
-            crawler = LotteryCrawler()
-            crawler.crawl_history()
             
             # 获取数据统计
             total_records = LotteryHistory.objects.count()
+            if not total_records:
+                self.stdout.write(self.style.ERROR('未获取到任何开奖数据'))
+                return
             latest_record = LotteryHistory.objects.order_by('-draw_num').first()
             earliest_record = LotteryHistory.objects.order_by('draw_num').first()
             
             self.stdout.write(
                 self.style.SUCCESS(
                     f"\n初始化完成！\n"
-                    f"总计抓取: {total_records} 期\n"
+                    f"数据总数: {total_records} 期\n"
                     f"数据范围: {earliest_record.draw_num} - {latest_record.draw_num}\n"
                     f"时间范围: {earliest_record.draw_date} - {latest_record.draw_date}"
                 )
@@ -174,13 +175,17 @@ class Command(BaseCommand):
         latest_data = crawler.crawl_latest()
         
         if not latest_data:
-            self.stdout.write('未获取到最新数据')
+            self.stdout.write('暂无新的开奖数据')
             return
             
         if not latest_record or latest_data['draw_num'] > latest_record.draw_num:
             self.stdout.write(f'发现新数据：期号 {latest_data["draw_num"]}')
+            # 把新数据增量并入分析状态
+            absorb_new_draw(latest_data)
             # 分析命中情况
             predictor = LotteryPredictor()
             predictor.check_prediction_accuracy(latest_data['draw_num'])
+            # 在后台按新数据重建组合得分表，不阻塞定时任务
+            schedule_score_table_rebuild(str(latest_data['draw_num']))
         else:
             self.stdout.write('数据已是最新')
\ No newline at end of file
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from luckyApp.predictor import LotteryPredictor
+import csv
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '多进程批量生成不重复的智能预测号码'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=10000,
+            help='生成注数'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='进程数（默认为CPU核数）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='随机种子，用于复现结果'
+        )
+        parser.add_argument(
+            '--output',
+            default='predictions.csv',
+            help='输出CSV文件路径'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            predictor = LotteryPredictor()
+            self.stdout.write(f"开始生成 {options['count']} 注号码...")
+            start = time.perf_counter()
+            result = predictor.predict_parallel(
+                options['count'], workers=options['workers'], seed=options['seed']
+            )
+            elapsed = time.perf_counter() - start
+            if result['min_score'] < predictor.min_score_threshold:
+                self.stdout.write(self.style.WARNING(
+                    f"得分达到 {predictor.min_score_threshold} 的组合不足，阈值已放宽到 {result['min_score']:.2f}"
+                ))
+
+            with open(options['output'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['红球1', '红球2', '红球3', '红球4', '红球5', '红球6', '蓝球', '得分'])
+                for red_balls, blue_ball, score in zip(
+                    result['red_balls'].tolist(), result['blue_balls'].tolist(), result['scores'].tolist()
+                ):
+                    writer.writerow(red_balls + [blue_ball, round(score, 2)])
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"已生成 {len(result['blue_balls'])} 注号码，耗时 {elapsed:.1f} 秒，已写入 {options['output']}"
+                )
+            )
+        except Exception as e:
+            logger.error(f"批量生成号码失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"批量生成号码失败: {str(e)}")
+            )
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from luckyApp.models import LotteryHistory
+from luckyApp.predictor import LotteryPredictor
+from luckyApp import profiling
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '开启性能统计运行预测流程，输出各环节的调用次数、耗时、查询次数和缓存命中情况'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=10,
+            help='智能预测的执行次数'
+        )
+        parser.add_argument(
+            '--predictions',
+            type=int,
+            default=5,
+            help='每次预测生成的注数'
+        )
+        parser.add_argument(
+            '--check-draw',
+            help='同时对该期号的预测记录执行命中判定（会更新预测记录和权重）'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='以JSON格式输出'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if not LotteryHistory.objects.exists():
+                self.stdout.write(self.style.ERROR('没有历史开奖数据，请先导入'))
+                return
+
+            profiling.enable_profiling(True)
+            profiling.reset_stats()
+
+            predictor = LotteryPredictor()
+            for _ in range(options['rounds']):
+                predictor.predict_based_on_frequency(options['predictions'])
+            if options['check_draw']:
+                predictor.check_prediction_accuracy(options['check_draw'])
+
+            stats = profiling.get_stats()
+            if options['json']:
+                self.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2))
+                return
+
+            self.stdout.write(f"{'环节':<44}{'调用':>8}{'总耗时(ms)':>12}{'平均(ms)':>10}{'查询':>8}{'命中':>8}{'未命中':>8}")
+            for name, entry in stats.items():
+                self.stdout.write(
+                    f"{name:<44}{entry['calls']:>8}{entry['total_time'] * 1000:>12.2f}"
+                    f"{entry['avg_time'] * 1000:>10.3f}{entry['queries']:>8}"
+                    f"{entry['cache_hits']:>8}{entry['cache_misses']:>8}"
+                )
+        except Exception as e:
+            logger.error(f"性能统计失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"性能统计失败: {str(e)}")
+            )
+        finally:
+            profiling.enable_profiling(None)
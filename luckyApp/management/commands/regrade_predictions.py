@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from luckyApp.grading import regrade_predictions
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = '按开奖记录批量重新判定全部预测记录的命中情况（支持按期号范围、分批和断点续跑）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='起始期号（包含）'
+        )
+        parser.add_argument(
+            '--until',
+            help='结束期号（包含）'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='每批处理的预测记录数'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default='regrade_checkpoint.json',
+            help='断点文件路径，记录已处理到的预测记录id'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='忽略断点文件，从头开始'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            checkpoint_path = options['checkpoint']
+            task = {'since': options['since'], 'until': options['until']}
+
+            # 只有期号范围相同时才从断点继续
+            start_id = 0
+            if not options['restart'] and os.path.exists(checkpoint_path):
+                with open(checkpoint_path) as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get('task') == task:
+                    start_id = checkpoint['last_id']
+                    self.stdout.write(f"从预测记录id {start_id} 之后继续")
+
+            def save_checkpoint(last_id, totals):
+                with open(checkpoint_path, 'w') as f:
+                    json.dump({'task': task, 'last_id': last_id}, f)
+                self.stdout.write(
+                    f"已处理至id {last_id}: 判定 {totals['checked']} 条，更新 {totals['updated']} 条"
+                )
+
+            start = time.perf_counter()
+            totals = regrade_predictions(
+                options['since'], options['until'], start_id, options['chunk_size'], save_checkpoint
+            )
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"重新判定完成：判定 {totals['checked']} 条，更新 {totals['updated']} 条，"
+                    f"未开奖跳过 {totals['skipped']} 条，耗时 {time.perf_counter() - start:.1f} 秒"
+                )
+            )
+        except Exception as e:
+            logger.error(f"重新判定预测记录失败: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"重新判定预测记录失败: {str(e)}")
+            )
@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from luckyApp.benchmarks import datasets, suite
+from luckyApp.predictor import invalidate_analysis_snapshot
+from datetime import datetime
+import json
+import math
+import os
+import tempfile
+
+class Command(BaseCommand):
+    help = '性能基准测试：在独立的测试数据库中用合成数据计时，并与基线对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--draws',
+            default='1000,3000',
+            help='开奖记录数据规模，逗号分隔（真实历史约3000期，更大规模如 100000 需显式指定）'
+        )
+        parser.add_argument(
+            '--predictions',
+            default='10000,100000',
+            help='预测记录数据规模，逗号分隔（1000000 条需显式指定，生成数据需数分钟）'
+        )
+        parser.add_argument(
+            '--quick',
+            action='store_true',
+            help='只运行最小规模（1000期开奖、10000条预测）'
+        )
+        parser.add_argument(
+            '--parse-only',
+            action='store_true',
+            help='只运行爬虫解析用例（不需要测试数据库），并输出各解析后端相对 html.parser 的加速比'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'),
+            help='基线文件路径'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.json',
+            help='本次结果的输出路径'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='把本次结果保存为新的基线'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='允许的耗时增长比例，超过即视为性能退化'
+        )
+
+    def handle(self, *args, **options):
+        if options['quick']:
+            draw_sizes, prediction_sizes = [1000], [10000]
+        else:
+            draw_sizes = [int(size) for size in options['draws'].split(',')]
+            prediction_sizes = [int(size) for size in options['predictions'].split(',')]
+
+        if options['parse_only']:
+            results = suite.run_cases(suite.parse_cases())
+            self.report_parse(results)
+        else:
+            results = self.run(draw_sizes, prediction_sizes)
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'results': results
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f"结果已写入 {options['output']}")
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"基线已保存到 {options['baseline']}"))
+            return
+        # 基线需在固定的机器上显式保存，缺失时不自动用本次结果代替
+        if not os.path.exists(options['baseline']):
+            raise CommandError(f"基线文件 {options['baseline']} 不存在，请先用 --save-baseline 保存基线")
+
+        with open(options['baseline']) as f:
+            baseline = json.load(f)['results']
+        rows = suite.compare(results, baseline, options['tolerance'])
+        regressions = [row for row in rows if row[4]]
+        for name, base, current, ratio, regressed in rows:
+            line = f"{name:<70}{base * 1000:>10.2f}ms{current * 1000:>10.2f}ms{ratio:>8.2f}x"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} 个用例性能退化超过 {options['tolerance']:.0%}")
+        self.stdout.write(self.style.SUCCESS('未发现性能退化'))
+
+    def report_parse(self, results):
+        """按页面输出各解析后端的耗时和相对 html.parser 的加速比"""
+        for name, result in results.items():
+            page = name[len('crawler.parse_page['):-1].split('][')[1]
+            reference = results.get(f'crawler.parse_page[html.parser][{page}]')
+            speedup = reference['median'] / result['median'] if reference else float('nan')
+            self.stdout.write(f"{name:<70}{result['median'] * 1000:>10.2f}ms{speedup:>8.1f}x")
+
+    def run(self, draw_sizes, prediction_sizes):
+        """在测试数据库中逐个规模生成数据并计时"""
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # 得分表写入临时目录，不覆盖正式数据的得分表
+        table_dir = tempfile.TemporaryDirectory()
+        table_settings = override_settings(SCORE_TABLE_PATH=os.path.join(table_dir.name, 'score_table.npy'))
+        table_settings.enable()
+        try:
+            results = suite.run_cases(suite.parse_cases())
+            for draw_count in draw_sizes:
+                self.stdout.write(f'生成 {draw_count} 期开奖数据...')
+                latest_draw_num = datasets.create_draws(draw_count)
+                invalidate_analysis_snapshot()
+                results.update(suite.run_cases(suite.analyzer_cases(), prefix=f'draws={draw_count}/'))
+
+                for prediction_count in prediction_sizes:
+                    self.stdout.write(f'生成 {prediction_count} 条预测记录...')
+                    datasets.create_predictions(latest_draw_num, prediction_count)
+                    prefix = f'draws={draw_count}/predictions={prediction_count}/'
+                    results.update(suite.run_cases(suite.grading_cases(latest_draw_num), prefix=prefix))
+                    results.update(suite.run_cases(
+                        suite.view_cases(math.ceil(draw_count / 20), math.ceil(prediction_count / 20)),
+                        prefix=prefix
+                    ))
+            return results
+        finally:
+            table_settings.disable()
+            table_dir.cleanup()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
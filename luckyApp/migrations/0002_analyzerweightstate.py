@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('luckyApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyzerWeightState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weights', models.JSONField(default=dict, verbose_name='维度权重')),
+                ('dimension_history', models.JSONField(default=dict, verbose_name='维度得分历史')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '权重状态',
+                'verbose_name_plural': '权重状态',
+            },
+        ),
+        migrations.AlterField(
+            model_name='predictionrecord',
+            name='draw_num',
+            field=models.CharField(max_length=20, verbose_name='预测期号'),
+        ),
+        migrations.AlterField(
+            model_name='predictionrecord',
+            name='prediction_type',
+            field=models.CharField(choices=[('random', '随机选号'), ('analysis', '智能分析')], max_length=20, verbose_name='预测类型'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+RED_FIELDS = ('red_ball_1', 'red_ball_2', 'red_ball_3', 'red_ball_4', 'red_ball_5', 'red_ball_6')
+
+
+def fill_red_masks(apps, schema_editor):
+    """为已有的开奖记录和预测记录计算红球掩码"""
+    for model_name in ('LotteryHistory', 'PredictionRecord'):
+        model = apps.get_model('luckyApp', model_name)
+        batch = []
+        for record in model.objects.only('id', *RED_FIELDS).iterator(chunk_size=2000):
+            record.red_mask = sum(1 << (getattr(record, field) - 1) for field in RED_FIELDS)
+            batch.append(record)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['red_mask'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['red_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('luckyApp', '0002_analyzerweightstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotteryhistory',
+            name='red_mask',
+            field=models.BigIntegerField(db_index=True, default=0, verbose_name='红球掩码'),
+        ),
+        migrations.AddField(
+            model_name='predictionrecord',
+            name='red_mask',
+            field=models.BigIntegerField(db_index=True, default=0, verbose_name='红球掩码'),
+        ),
+        migrations.RunPython(fill_red_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('luckyApp', '0003_red_mask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='predictionrecord',
+            name='draw_num',
+            field=models.CharField(db_index=True, max_length=20, verbose_name='预测期号'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+def fill_blue_masks(apps, schema_editor):
+    """已有的预测记录都是单式，按蓝球计算蓝球掩码（每个蓝球一条 UPDATE）"""
+    model = apps.get_model('luckyApp', 'PredictionRecord')
+    for ball in range(1, 17):
+        model.objects.filter(blue_ball=ball).update(blue_mask=1 << (ball - 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('luckyApp', '0004_predictionrecord_draw_num_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionrecord',
+            name='banker_hit_count',
+            field=models.IntegerField(default=0, verbose_name='胆码命中数'),
+        ),
+        migrations.AddField(
+            model_name='predictionrecord',
+            name='banker_mask',
+            field=models.BigIntegerField(default=0, verbose_name='胆码掩码'),
+        ),
+        migrations.AddField(
+            model_name='predictionrecord',
+            name='blue_mask',
+            field=models.IntegerField(default=0, verbose_name='蓝球掩码'),
+        ),
+        migrations.AddField(
+            model_name='predictionrecord',
+            name='ticket_type',
+            field=models.CharField(choices=[('single', '单式'), ('compound', '复式'), ('banker', '胆拖')], default='single', max_length=10, verbose_name='投注方式'),
+        ),
+        migrations.RunPython(fill_blue_masks, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,18 @@
 from django.db import models
 from django.utils import timezone
+from .bitmask import mask_to_balls, red_mask
+from .compound import normalize_ticket, prize_counts, ticket_count, ticket_masks
+from .prizes import prize_level
+
+
+class RedMaskQuerySet(models.QuerySet):
+    """bulk_create 不会调用 save()，写入前在这里补齐号码掩码"""
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_masks()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class LotteryHistory(models.Model):
     """双色球历史开奖记录"""
@@ -11,9 +24,12 @@ class LotteryHistory(models.Model):
     red_ball_5 = models.IntegerField(verbose_name='红球5')
     red_ball_6 = models.IntegerField(verbose_name='红球6')
     blue_ball = models.IntegerField(verbose_name='蓝球')
+    red_mask = models.BigIntegerField(default=0, db_index=True, verbose_name='红球掩码')
     draw_date = models.DateField(verbose_name='开奖日期')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
 
+    objects = RedMaskQuerySet.as_manager()
+
     class Meta:
         ordering = ['-draw_num']
         verbose_name = '开奖历史'
@@ -22,14 +38,33 @@ class LotteryHistory(models.Model):
     def __str__(self):
         return f"{self.draw_num} - {self.draw_date}"
 
+    @property
+    def red_balls(self):
+        return [
+            self.red_ball_1, self.red_ball_2, self.red_ball_3,
+            self.red_ball_4, self.red_ball_5, self.red_ball_6
+        ]
+
+    def fill_masks(self):
+        self.red_mask = red_mask(self.red_balls)
+
+    def save(self, *args, **kwargs):
+        self.fill_masks()
+        super().save(*args, **kwargs)
+
 class PredictionRecord(models.Model):
     """预测记录"""
     PREDICTION_TYPES = [
         ('random', '随机选号'),
         ('analysis', '智能分析'),
     ]
+    TICKET_TYPES = [
+        ('single', '单式'),
+        ('compound', '复式'),
+        ('banker', '胆拖'),
+    ]
     
-    draw_num = models.CharField(max_length=20, verbose_name='预测期号')
+    draw_num = models.CharField(max_length=20, db_index=True, verbose_name='预测期号')
     red_ball_1 = models.IntegerField(verbose_name='红球1')
     red_ball_2 = models.IntegerField(verbose_name='红球2')
     red_ball_3 = models.IntegerField(verbose_name='红球3')
@@ -45,8 +80,16 @@ class PredictionRecord(models.Model):
     is_hit = models.BooleanField(default=False, verbose_name='是否命中')
     hit_count = models.IntegerField(default=0, verbose_name='命中球数')
     blue_hit = models.BooleanField(default=False, verbose_name='蓝球是否命中')
+    red_mask = models.BigIntegerField(default=0, db_index=True, verbose_name='红球掩码')
+    # 复式/胆拖：red_mask 包含全部红球（胆码+拖码），红球1-6和蓝球字段保存展开后的第一注
+    ticket_type = models.CharField(max_length=10, choices=TICKET_TYPES, default='single', verbose_name='投注方式')
+    banker_mask = models.BigIntegerField(default=0, verbose_name='胆码掩码')
+    blue_mask = models.IntegerField(default=0, verbose_name='蓝球掩码')
+    banker_hit_count = models.IntegerField(default=0, verbose_name='胆码命中数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='预测时间')
 
+    objects = RedMaskQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = '预测记录'
@@ -55,6 +98,76 @@ class PredictionRecord(models.Model):
     def __str__(self):
         return f"{self.draw_num} - {self.get_prediction_type_display()}"
 
+    @property
+    def red_balls(self):
+        return [
+            self.red_ball_1, self.red_ball_2, self.red_ball_3,
+            self.red_ball_4, self.red_ball_5, self.red_ball_6
+        ]
+
+    @classmethod
+    def from_ticket(cls, draw_num, red_balls, blue_balls, banker_balls=(), **kwargs):
+        """按单式、复式或胆拖号码创建预测记录（未保存），号码不合法时抛出 ValueError"""
+        ticket_type, banker, drag, blue = normalize_ticket(red_balls, blue_balls, banker_balls)
+        first = banker + drag[:6 - len(banker)]
+        record = cls(
+            draw_num=draw_num,
+            red_ball_1=first[0],
+            red_ball_2=first[1],
+            red_ball_3=first[2],
+            red_ball_4=first[3],
+            red_ball_5=first[4],
+            red_ball_6=first[5],
+            blue_ball=blue[0],
+            ticket_type=ticket_type,
+            **kwargs
+        )
+        record.red_mask, record.banker_mask, record.blue_mask = ticket_masks(banker, drag, blue)
+        return record
+
+    def fill_masks(self):
+        """单式号码由红球、蓝球字段计算掩码；复式/胆拖的掩码在创建时已经给出"""
+        if self.ticket_type == 'single':
+            self.red_mask = red_mask(self.red_balls)
+            self.banker_mask = 0
+            self.blue_mask = 1 << (self.blue_ball - 1)
+
+    def save(self, *args, **kwargs):
+        self.fill_masks()
+        super().save(*args, **kwargs)
+
+    @property
+    def all_red_balls(self):
+        """全部红球（复式/胆拖包含胆码和拖码）"""
+        return mask_to_balls(self.red_mask)
+
+    @property
+    def banker_balls(self):
+        return mask_to_balls(self.banker_mask)
+
+    @property
+    def drag_balls(self):
+        return mask_to_balls(self.red_mask & ~self.banker_mask)
+
+    @property
+    def blue_balls(self):
+        return [ball for ball in range(1, 17) if self.blue_mask >> (ball - 1) & 1]
+
+    @property
+    def ticket_count(self):
+        """展开后的注数"""
+        banker_count = len(self.banker_balls)
+        return int(ticket_count(banker_count, len(self.all_red_balls) - banker_count, len(self.blue_balls)))
+
+    @property
+    def prize_counts(self):
+        """按已判定的命中数计算的各等级中奖注数（下标0为未中奖注数）"""
+        banker_count = len(self.banker_balls)
+        return prize_counts(
+            self.banker_hit_count, self.hit_count - self.banker_hit_count,
+            banker_count, len(self.all_red_balls) - banker_count, len(self.blue_balls), self.blue_hit
+        ).tolist()
+
     @property
     def is_drawn(self):
         """判断该期是否已开奖"""
@@ -69,17 +182,21 @@ class PredictionRecord(models.Model):
         """获取中奖等级"""
         if not self.is_hit:
             return None
-        
-        if self.hit_count == 6 and self.blue_hit:
-            return 1
-        elif self.hit_count == 6:
-            return 2
-        elif self.hit_count == 5 and self.blue_hit:
-            return 3
-        elif self.hit_count == 5 or (self.hit_count == 4 and self.blue_hit):
-            return 4
-        elif self.hit_count == 4 or (self.hit_count == 3 and self.blue_hit):
-            return 5
-        elif self.blue_hit:
-            return 6
-        return None
+        if self.ticket_type != 'single':
+            # 复式/胆拖取展开后最高的中奖等级
+            return next(level for level, count in enumerate(self.prize_counts) if level and count)
+        return prize_level(self.hit_count, self.blue_hit)
+
+class AnalyzerWeightState(models.Model):
+    """多维度分析器的自适应权重状态（全局唯一一条记录）"""
+    weights = models.JSONField(default=dict, verbose_name='维度权重')
+    dimension_history = models.JSONField(default=dict, verbose_name='维度得分历史')
+    version = models.PositiveIntegerField(default=0, verbose_name='版本号')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '权重状态'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"权重状态 v{self.version}"
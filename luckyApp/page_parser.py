@@ -0,0 +1,156 @@
+import functools
+import importlib.util
+import logging
+from datetime import datetime
+
+import bs4
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 按速度从快到慢排列；selectolax 和 lxml 为可选依赖，未安装时自动跳过
+PARSER_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+_BACKEND_MODULES = {
+    'selectolax': 'selectolax',
+    'lxml': 'lxml',
+    'html.parser': 'bs4'
+}
+
+
+@functools.lru_cache(maxsize=None)
+def available_backends():
+    """当前环境可用的解析后端"""
+    available = tuple(
+        name for name in PARSER_BACKENDS if importlib.util.find_spec(_BACKEND_MODULES[name]) is not None
+    )
+    if available == ('html.parser',):
+        logger.warning("未安装 lxml 或 selectolax，页面解析使用较慢的 html.parser")
+    return available
+
+
+def get_backend(name=None):
+    """
+    选择解析后端：优先使用参数，其次是 LUCKY_HTML_PARSER 设置，都未指定时用最快的可用后端
+    """
+    name = name or getattr(settings, 'LUCKY_HTML_PARSER', None)
+    available = available_backends()
+    if name is None:
+        return available[0]
+    if name not in available:
+        raise ValueError(f'解析后端 {name} 不可用，可用的后端: {list(available)}')
+    return name
+
+
+def _draw_date(title):
+    """开奖日期取自期号链接的 title（"开奖日期：2016-01-03"），缺失或格式不对时用当天"""
+    if title:
+        try:
+            return datetime.strptime(title.split('：')[-1], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return datetime.now().date()
+
+
+def _has_class(classes, name):
+    return classes is not None and name in classes.split()
+
+
+def _extract_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    draws = []
+    for row in LexborHTMLParser(html).css('.hgt'):
+        # 一次查询按文档顺序取出期号、红球、蓝球单元格
+        draw_num, title, red_balls, blue_ball = None, None, [], None
+        for cell in row.css('.qh7, .redqiu, .blueqiu3'):
+            classes = cell.attributes.get('class')
+            if draw_num is None and _has_class(classes, 'qh7'):
+                draw_num = cell.text(strip=True)
+                link = cell.css_first('a')
+                title = link.attributes.get('title') if link is not None else None
+            elif _has_class(classes, 'redqiu'):
+                red_balls.append(int(cell.text(strip=True)))
+            elif blue_ball is None and _has_class(classes, 'blueqiu3'):
+                blue_ball = int(cell.text(strip=True))
+        if draw_num.startswith('模拟'):
+            break
+        draws.append((draw_num, tuple(red_balls), blue_ball, _draw_date(title)))
+    return draws
+
+
+def _extract_lxml(html):
+    import lxml.html
+
+    draws = []
+    # 以 UTF-8 字节交给 lxml：str 输入带有 XML 编码声明时 lxml 会抛出 ValueError
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+        parser = lxml.html.HTMLParser(encoding='utf-8')
+    else:
+        parser = None
+    root = lxml.html.fromstring(html, parser=parser)
+    for row in root.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " hgt ")]'):
+        draw_num, title, red_balls, blue_ball = None, None, [], None
+        for cell in row.iterdescendants():
+            classes = cell.get('class')
+            if classes is None:
+                continue
+            if draw_num is None and _has_class(classes, 'qh7'):
+                draw_num = cell.text_content().strip()
+                link = cell.find('.//a')
+                title = link.get('title') if link is not None else None
+            elif _has_class(classes, 'redqiu'):
+                red_balls.append(int(cell.text_content()))
+            elif blue_ball is None and _has_class(classes, 'blueqiu3'):
+                blue_ball = int(cell.text_content().strip())
+        if draw_num.startswith('模拟'):
+            break
+        draws.append((draw_num, tuple(red_balls), blue_ball, _draw_date(title)))
+    return draws
+
+
+def extract_row(row):
+    """从 BeautifulSoup 的一行中一次取出期号、红球、蓝球和开奖日期，期号为"模拟"开头时返回None"""
+    draw_num, title, red_balls, blue_ball = None, None, [], None
+    for cell in row.find_all(class_=['qh7', 'redqiu', 'blueqiu3']):
+        classes = cell.get('class')
+        if draw_num is None and 'qh7' in classes:
+            draw_num = cell.string.strip()
+            link = cell.find('a')
+            title = link.get('title') if link else None
+        elif 'redqiu' in classes:
+            red_balls.append(int(cell.string))
+        elif blue_ball is None and 'blueqiu3' in classes:
+            blue_ball = int(cell.string.strip())
+    if draw_num.startswith('模拟'):
+        return None
+    return draw_num, tuple(red_balls), blue_ball, _draw_date(title)
+
+
+def _extract_html_parser(html):
+    draws = []
+    # 只为开奖行建树，跳过页面其余部分；建树时 class 还是未拆分的字符串，带多个 class 的行需要按空白拆分后匹配
+    strainer = bs4.SoupStrainer(class_=lambda classes: _has_class(classes, 'hgt'))
+    rows = bs4.BeautifulSoup(html, 'html.parser', parse_only=strainer)
+    for row in rows.find_all(class_='hgt'):
+        draw = extract_row(row)
+        if draw is None:
+            break
+        draws.append(draw)
+    return draws
+
+
+_EXTRACTORS = {
+    'selectolax': _extract_selectolax,
+    'lxml': _extract_lxml,
+    'html.parser': _extract_html_parser
+}
+
+
+def extract_draws(html, backend=None):
+    """
+    单次遍历年度页面的开奖行，返回 (期号, 红球元组, 蓝球, 开奖日期) 列表
+    遇到"模拟选号"行即停止
+    """
+    return _EXTRACTORS[get_backend(backend)](html)
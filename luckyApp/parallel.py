@@ -0,0 +1,68 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 工作进程内的只读抽样数据，由 _init_worker 设置
+_worker_context = None
+
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def _sample_chunk(seed_sequence, size, context=None):
+    """
+    用独立的随机数流抽取一批号码
+    返回号码编号数组：红球组合序号 * 16 + (蓝球 - 1)，批内已去重
+    """
+    context = context or _worker_context
+    rng = np.random.default_rng(seed_sequence)
+    ranks = context['sampler'].sample(min(size, context['sampler'].support), rng)
+    blues = rng.choice(16, size=len(ranks), p=context['blue_probabilities'])
+    return ranks * 16 + blues
+
+
+def _merge_unique(chunks):
+    """按批次顺序合并，全局去重并保留每个号码第一次出现的位置"""
+    merged = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+    _, first = np.unique(merged, return_index=True)
+    return merged[np.sort(first)]
+
+
+def generate_tickets_parallel(context, count, workers=None, seed=None, chunk_size=50000):
+    """
+    多进程生成count个不重复的号码编号
+    任务按chunk_size切分，每批使用由seed派生的独立随机数流；
+    切分方式与进程数无关，因此同一seed的结果与进程数无关
+    """
+    if count > context['sampler'].support * 16:
+        raise ValueError('可抽取的号码不足，无法生成足够的不重复号码')
+
+    workers = workers or os.cpu_count() or 1
+    seed_sequence = np.random.SeedSequence(seed)
+    tickets = np.empty(0, dtype=np.int64)
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,))
+    try:
+        while len(tickets) < count:
+            need = count - len(tickets)
+            sizes = [min(chunk_size, need - start) for start in range(0, need, chunk_size)]
+            seeds = seed_sequence.spawn(len(sizes))
+            if executor is not None:
+                chunks = list(executor.map(_sample_chunk, seeds, sizes))
+            else:
+                chunks = [_sample_chunk(s, size, context) for s, size in zip(seeds, sizes)]
+            tickets = _merge_unique([tickets] + chunks)
+            logger.debug("已生成 %s / %s 注号码", min(len(tickets), count), count)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return tickets[:count]
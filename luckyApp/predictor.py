@@ -1,387 +1,343 @@
 import numpy as np
-from datetime import datetime
 from .models import LotteryHistory, PredictionRecord
+from .history_store import DrawMatrix, BALL_FIELDS
+from .analysis_state import AnalysisState
+from .dimensions import (
+    LazyAnalysis, active_dimensions, default_weights, dimension_names, get_dimension, normalize_weights,
+    required_analyses
+)
+from .score_table import COMBINATION_COUNT, ScoreTable, all_combinations, get_score_table, unrank_combinations
+from .sampler import TicketSampler
+from .parallel import generate_tickets_parallel
+from .weight_state import load_weight_state, update_weight_state
+from .profiling import profiled, record_cache
+from .compound import grade_tickets
+from .grading import write_grades
+from .prizes import PRIZE_NAMES, PRIZE_SLOTS
+from .wheeling import CoverageWheel
+from django.db import connection
 import random
 import logging
-from collections import defaultdict
+import threading
+import itertools
 
 logger = logging.getLogger(__name__)
 
+# 进程内共享的分析快照缓存，按历史数据版本（最新期号）区分
+_snapshot_lock = threading.Lock()
+_snapshot_cache = {}
+
+
+def get_history_version():
+    """获取当前历史数据版本（最新期号），无数据时返回None"""
+    return LotteryHistory.objects.order_by('-draw_num').values_list('draw_num', flat=True).first()
+
+
+def invalidate_analysis_snapshot():
+    """清除分析快照缓存，已有开奖记录被修改或删除时调用"""
+    with _snapshot_lock:
+        _snapshot_cache.clear()
+
+
+# 后台重建得分表的线程，以及最近一次请求重建时的历史版本
+_rebuild_lock = threading.Lock()
+_rebuild_state = {'thread': None, 'version': None}
+
+
+def schedule_score_table_rebuild(version=None):
+    """
+    在后台线程中按最新历史数据重建组合得分表，调用方不等待
+    有新开奖数据、或请求发现得分表缺失/过期时调用；进程内同一时间只有一个重建，
+    同一历史版本只尝试一次（重建失败时不会每个请求都重试）。返回是否启动了重建
+    多个进程之间由 ScoreTable.ensure_current 的文件锁保证只有一个进程重建
+    """
+    with _rebuild_lock:
+        thread = _rebuild_state['thread']
+        if thread is not None and thread.is_alive():
+            return False
+        if version is not None and version == _rebuild_state['version']:
+            return False
+        _rebuild_state['version'] = version
+        thread = threading.Thread(target=_rebuild_score_table, name='score-table-rebuild', daemon=True)
+        _rebuild_state['thread'] = thread
+        thread.start()
+    return True
+
+
+def wait_for_score_table_rebuild(timeout=None):
+    """等待后台重建结束（一次性运行的命令在退出前调用），返回重建是否已结束"""
+    thread = _rebuild_state['thread']
+    if thread is None:
+        return True
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def _rebuild_score_table():
+    try:
+        ScoreTable.ensure_current(MultiDimensionalAnalyzer())
+    except Exception as e:
+        logger.error(f"重建组合得分表失败: {str(e)}")
+    finally:
+        # 后台线程使用独立的数据库连接，结束时关闭
+        connection.close()
+
+
+def absorb_new_draw(draw_data):
+    """
+    把刚入库的最新一期开奖数据并入进程内的统计状态，无需全量重算
+    draw_data 为爬虫返回的数据格式，只用其中的期号：号码取自数据库中已保存的记录；
+    该期未入库、状态未建立或与数据库不连续时返回False，下次获取快照时再自动同步
+    """
+    draw_num = str(draw_data['draw_num'])
+    with _snapshot_lock:
+        state = _snapshot_cache.get('state')
+        snapshot = _snapshot_cache.get('snapshot')
+        if state is None or snapshot is None or snapshot.version is None:
+            return False
+        if draw_num <= snapshot.version:
+            return draw_num == snapshot.version
+        row = LotteryHistory.objects.filter(draw_num=draw_num).values_list(*BALL_FIELDS).first()
+        if row is None or LotteryHistory.objects.count() != state.size + 1:
+            return False
+        snapshot.freeze()
+        state.push(draw_num, row[:6], row[6])
+        _snapshot_cache['snapshot'] = AnalysisSnapshot(draw_num, state)
+    logger.info("已将期号 %s 并入分析状态", draw_num)
+    return True
+
+
+class AnalysisSnapshot:
+    """
+    某一历史数据版本下的分析结果（只读，可在多个候选号码间共享）
+    各项分析和批量评分查找表都在首次使用时才计算，并随快照缓存
+    """
+    def __init__(self, version, state):
+        self.version = version
+        self.draws = state.draws
+        self.analysis = LazyAnalysis(state)
+        self._tables = {}
+
+    def freeze(self):
+        """统计状态即将更新：先算出全部分析结果，使快照不再依赖统计状态"""
+        self.analysis.freeze()
+
+    @property
+    def hot_cold(self):
+        return self.analysis['hot_cold']
+
+    @property
+    def missing_values(self):
+        return self.analysis['missing_values']
+
+    @property
+    def intervals(self):
+        return self.analysis['intervals']
+
+    @property
+    def odd_even(self):
+        return self.analysis['odd_even']
+
+    @property
+    def zones(self):
+        return self.analysis['zones']
+
+    @property
+    def frequency_index(self):
+        """按期次累计的号码出现次数，用于任意窗口的统计"""
+        return self.analysis['frequency_index']
+
+    def dimension_tables(self, name):
+        """某个维度批量评分使用的查找表，与该维度的单注评分规则一一对应"""
+        if name not in self._tables:
+            self._tables[name] = get_dimension(name).tables(self.analysis)
+        return self._tables[name]
+
+
 class MultiDimensionalAnalyzer:
     """多维度分析器"""
-    def __init__(self):
+    def __init__(self, restore_weights=True):
         self.red_range = range(1, 34)  # 红球范围1-33
         self.blue_range = range(1, 17)  # 蓝球范围1-16
         self.recent_periods = 30  # 最近30期数据用于冷热分析
+        self.history_limit = 100  # 最近100期数据用于遗漏、间隔、奇偶、区间分析
         self.history_data = None
+        self.snapshot = None
         self.red_freq = None
         self.blue_freq = None
-        # 初始权重
-        self.weights = {
-            'frequency': 0.30,
-            'hot_cold': 0.20,
-            'missing': 0.15,
-            'interval': 0.15,
-            'odd_even': 0.10,
-            'zone': 0.10
-        }
+        # 初始权重（各维度的默认权重见 dimensions 中的注册，归一化后总和为1）
+        self.weights = {'frequency': 0.30}
+        self.weights.update(default_weights())
         # 权重调整参数
         self.weight_adjust_rate = 0.05  # 权重调整步长
         self.min_weight = 0.05  # 最小权重
         self.max_weight = 0.40  # 最大权重
         # 维度得分历史记录
-        self.dimension_history = {
-            'hot_cold': [],
-            'missing': [],
-            'interval': [],
-            'odd_even': [],
-            'zone': []
-        }
+        self.dimension_history = {name: [] for name in dimension_names()}
         # 维度效果评估
-        self.dimension_performance = {
-            'hot_cold': 0,
-            'missing': 0,
-            'interval': 0,
-            'odd_even': 0,
-            'zone': 0
+        self.dimension_performance = {name: 0 for name in dimension_names()}
+        # 加载持久化的自适应权重
+        if restore_weights:
+            self.restore_weight_state()
+
+    def restore_weight_state(self):
+        """加载持久化的权重和维度历史（版本未变化时使用进程内缓存）"""
+        state = load_weight_state()
+        if state is not None:
+            self.apply_weight_state(state['weights'], state['dimension_history'])
+
+    def apply_weight_state(self, weights, dimension_history):
+        """
+        应用给定的权重和维度历史（复制一份，不与缓存共享）
+        权重按当前注册的维度重新归一化：保存之后新增的维度取默认权重，其余维度按比例缩小
+        """
+        self.weights.update(normalize_weights(weights))
+        self.dimension_history = {
+            dimension: list(dimension_history.get(dimension, []))
+            for dimension in self.dimension_history
         }
 
-    def load_history_data(self, limit=100):
-        """加载历史数据"""
-        self.history_data = list(LotteryHistory.objects.all().order_by('-draw_num')[:limit])
+    def load_history_data(self, limit=None):
+        """加载历史数据（列式存储，默认全部期数）"""
+        self.history_data = DrawMatrix.load(limit)
         return self.history_data
 
+    @profiled('analyzer.get_snapshot')
+    def get_snapshot(self, refresh=False):
+        """
+        获取当前历史版本的分析快照
+        同一版本的快照在进程内共享，只有最新期号变化时才更新；
+        refresh=True 时会重新检查历史数据版本
+        """
+        if self.snapshot is not None and not refresh:
+            return self.snapshot
+
+        version = get_history_version()
+        with _snapshot_lock:
+            snapshot = _snapshot_cache.get('snapshot')
+            hit = snapshot is not None and snapshot.version == version
+            if not hit:
+                snapshot = self._sync_snapshot(version)
+        record_cache('cache.analysis_snapshot', hit)
+
+        self.snapshot = snapshot
+        self.history_data = snapshot.draws
+        return snapshot
+
+    def _sync_snapshot(self, version):
+        """
+        把进程内的统计状态同步到指定版本
+        只是新增了若干期数据时逐期增量并入，否则重新全量构建（调用方需持有 _snapshot_lock）
+        """
+        state = _snapshot_cache.get('state')
+        snapshot = _snapshot_cache.get('snapshot')
+        if state is not None and snapshot is not None and version is not None and snapshot.version is not None:
+            new_rows = list(
+                LotteryHistory.objects.filter(draw_num__gt=snapshot.version)
+                .order_by('draw_num')
+                .values_list('draw_num', *BALL_FIELDS)
+            )
+            if new_rows and new_rows[-1][0] == version and \
+                    LotteryHistory.objects.count() == state.size + len(new_rows):
+                snapshot.freeze()
+                for row in new_rows:
+                    state.push(row[0], row[1:7], row[7])
+                snapshot = AnalysisSnapshot(version, state)
+                _snapshot_cache['snapshot'] = snapshot
+                logger.debug("已增量更新至期号 %s 的分析快照", version)
+                return snapshot
+
+        snapshot = self._build_snapshot(version)
+        return snapshot
+
+    def _build_snapshot(self, version):
+        """加载全部历史数据，重新构建统计状态和分析快照"""
+        draws = self.load_history_data()
+        state = AnalysisState.from_draws(draws, self.recent_periods, self.history_limit)
+        snapshot = AnalysisSnapshot(version, state)
+        _snapshot_cache['state'] = state
+        _snapshot_cache['snapshot'] = snapshot
+        logger.debug("已生成期号 %s 的分析快照", version)
+        return snapshot
+
+    @profiled('analyzer.analyze_hot_cold')
     def analyze_hot_cold(self):
         """冷热号分析"""
-        if not self.history_data:
-            self.load_history_data(self.recent_periods)
-
-        # 初始化计数器
-        red_count = defaultdict(int)
-        blue_count = defaultdict(int)
-
-        # 统计最近30期号码出现次数
-        for record in self.history_data[:self.recent_periods]:
-            red_balls = [
-                record.red_ball_1, record.red_ball_2, record.red_ball_3,
-                record.red_ball_4, record.red_ball_5, record.red_ball_6
-            ]
-            for ball in red_balls:
-                red_count[ball] += 1
-            blue_count[record.blue_ball] += 1
-
-        # 分类冷热号
-        red_hot = []    # 出现>=3次
-        red_warm = []   # 出现1-2次
-        red_cold = []   # 未出现
-        
-        for num in self.red_range:
-            count = red_count[num]
-            if count >= 3:
-                red_hot.append(num)
-            elif count > 0:
-                red_warm.append(num)
-            else:
-                red_cold.append(num)
-
-        return {
-            'red_hot': red_hot,
-            'red_warm': red_warm,
-            'red_cold': red_cold,
-            'red_count': dict(red_count),
-            'blue_count': dict(blue_count)
-        }
+        return self.get_snapshot().hot_cold
 
+    @profiled('analyzer.analyze_missing_values')
     def analyze_missing_values(self):
         """遗漏值分析"""
-        if not self.history_data:
-            self.load_history_data()
-
-        # 初始化最后出现期号
-        red_last_appear = {i: 0 for i in self.red_range}
-        blue_last_appear = {i: 0 for i in self.blue_range}
-        
-        # 获取最新期号
-        latest_draw = int(self.history_data[0].draw_num)
-        
-        # 分析遗漏值
-        for record in self.history_data:
-            draw_num = int(record.draw_num)
-            red_balls = [
-                record.red_ball_1, record.red_ball_2, record.red_ball_3,
-                record.red_ball_4, record.red_ball_5, record.red_ball_6
-            ]
-            
-            # 更新红球最后出现期号
-            for ball in red_balls:
-                if red_last_appear[ball] == 0:
-                    red_last_appear[ball] = draw_num
-                    
-            # 更新蓝球最后出现期号
-            if blue_last_appear[record.blue_ball] == 0:
-                blue_last_appear[record.blue_ball] = draw_num
-
-        # 计算遗漏值
-        red_missing = {num: latest_draw - last_draw if last_draw > 0 else latest_draw 
-                      for num, last_draw in red_last_appear.items()}
-        blue_missing = {num: latest_draw - last_draw if last_draw > 0 else latest_draw 
-                       for num, last_draw in blue_last_appear.items()}
-
-        return {
-            'red_missing': red_missing,
-            'blue_missing': blue_missing
-        }
+        return self.get_snapshot().missing_values
 
+    @profiled('analyzer.analyze_intervals')
     def analyze_intervals(self):
         """号码间隔分析"""
-        if not self.history_data:
-            self.load_history_data()
-
-        intervals = []
-        for record in self.history_data:
-            red_balls = sorted([
-                record.red_ball_1, record.red_ball_2, record.red_ball_3,
-                record.red_ball_4, record.red_ball_5, record.red_ball_6
-            ])
-            # 计算相邻号码间隔
-            record_intervals = []
-            for i in range(len(red_balls)-1):
-                interval = red_balls[i+1] - red_balls[i]
-                record_intervals.append(interval)
-            intervals.append(record_intervals)
-
-        # 统计间隔出现频率
-        interval_freq = defaultdict(int)
-        for record_intervals in intervals:
-            for interval in record_intervals:
-                interval_freq[interval] += 1
-
-        return {
-            'interval_freq': dict(interval_freq),
-            'avg_intervals': [sum(x)/len(x) for x in intervals]
-        }
+        return self.get_snapshot().intervals
 
+    @profiled('analyzer.analyze_odd_even')
     def analyze_odd_even(self):
         """奇偶比例分析"""
-        if not self.history_data:
-            self.load_history_data()
-
-        ratios = []
-        for record in self.history_data:
-            red_balls = [
-                record.red_ball_1, record.red_ball_2, record.red_ball_3,
-                record.red_ball_4, record.red_ball_5, record.red_ball_6
-            ]
-            # 统计奇数个数
-            odd_count = sum(1 for x in red_balls if x % 2 == 1)
-            even_count = 6 - odd_count
-            ratios.append((odd_count, even_count))
-
-        # 统计各种比例出现的次数
-        ratio_freq = defaultdict(int)
-        for ratio in ratios:
-            ratio_freq[ratio] += 1
-
-        return {
-            'ratio_freq': dict(ratio_freq),
-            'most_common_ratios': sorted(
-                ratio_freq.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:3]
-        }
+        return self.get_snapshot().odd_even
 
+    @profiled('analyzer.analyze_zones')
     def analyze_zones(self):
         """区间分布分析"""
-        if not self.history_data:
-            self.load_history_data()
-
-        zone_distributions = []
-        for record in self.history_data:
-            red_balls = [
-                record.red_ball_1, record.red_ball_2, record.red_ball_3,
-                record.red_ball_4, record.red_ball_5, record.red_ball_6
-            ]
-            # 统计红球区间分布
-            zone1 = sum(1 for x in red_balls if 1 <= x <= 11)
-            zone2 = sum(1 for x in red_balls if 12 <= x <= 22)
-            zone3 = sum(1 for x in red_balls if 23 <= x <= 33)
-            zone_distributions.append((zone1, zone2, zone3))
-
-        # 统计区间分布频率
-        zone_freq = defaultdict(int)
-        for dist in zone_distributions:
-            zone_freq[dist] += 1
+        return self.get_snapshot().zones
 
-        return {
-            'zone_freq': dict(zone_freq),
-            'most_common_zones': sorted(
-                zone_freq.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:3]
-        }
+    @profiled('analyzer.analyze_window')
+    def analyze_window(self, window=None, end=None):
+        """
+        任意窗口的频率、冷热号和区间统计
+        window 为期数（None 表示全部），end 为窗口结束位置（不含，默认最新一期之后）
+        """
+        return self.get_snapshot().frequency_index.window_stats(window, end)
 
+    @profiled('analyzer.analyze_all_dimensions')
     def analyze_all_dimensions(self):
-        """执行所有维度的分析"""
-        self.load_history_data()
-        
-        return {
-            'hot_cold': self.analyze_hot_cold(),
-            'missing_values': self.analyze_missing_values(),
-            'intervals': self.analyze_intervals(),
-            'odd_even': self.analyze_odd_even(),
-            'zones': self.analyze_zones()
-        }
+        """执行所有维度的分析（各维度直接依赖的分析结果）"""
+        analysis = self.get_snapshot(refresh=True).analysis
+        return {name: analysis[name] for name in required_analyses(dimension_names())}
 
+    @profiled('analyzer.score_dimension')
+    def score_dimension(self, name, red_balls):
+        """按注册的评分规则为一组红球评分，只会计算该维度依赖的分析"""
+        return get_dimension(name).score(self.get_snapshot().analysis, red_balls)
+
+    @profiled('analyzer.score_hot_cold')
     def score_hot_cold(self, red_balls):
         """评分：冷热号分布"""
-        analysis = self.analyze_hot_cold()
-        red_hot = set(analysis['red_hot'])
-        red_warm = set(analysis['red_warm'])
-        red_cold = set(analysis['red_cold'])
-        
-        # 计算所选号码中热温冷的数量
-        hot_count = sum(1 for ball in red_balls if ball in red_hot)
-        warm_count = sum(1 for ball in red_balls if ball in red_warm)
-        cold_count = sum(1 for ball in red_balls if ball in red_cold)
-        
-        # 理想比例：2-3个热号，2-3个温号，1个冷号
-        hot_score = 100 if 2 <= hot_count <= 3 else 60
-        warm_score = 100 if 2 <= warm_count <= 3 else 60
-        cold_score = 100 if cold_count == 1 else 60
-        
-        return (hot_score * 0.4 + warm_score * 0.4 + cold_score * 0.2)
+        return self.score_dimension('hot_cold', red_balls)
 
+    @profiled('analyzer.score_missing_values')
     def score_missing_values(self, red_balls):
         """评分：遗漏值分布"""
-        analysis = self.analyze_missing_values()
-        red_missing = analysis['red_missing']
-        
-        # 计算选中号码的遗漏值
-        missing_values = [red_missing[ball] for ball in red_balls]
-        
-        # 评分规则：
-        # 1. 至少包含1个遗漏值较大的号码（遗漏值>10）
-        # 2. 不要选择太多遗漏值大的号码
-        # 3. 遗漏值的分布应该相对均匀
-        high_missing = sum(1 for v in missing_values if v > 10)
-        max_missing = max(missing_values)
-        min_missing = min(missing_values)
-        avg_missing = sum(missing_values) / len(missing_values)
-        
-        # 计算得分
-        score = 100
-        if high_missing == 0:
-            score -= 20  # 没有大遗漏值扣分
-        elif high_missing > 2:
-            score -= 10  # 大遗漏值太多扣分
-            
-        if max_missing - min_missing > 20:
-            score -= 10  # 遗漏值差距太大扣分
-            
-        return score
+        return self.score_dimension('missing', red_balls)
 
+    @profiled('analyzer.score_intervals')
     def score_intervals(self, red_balls):
         """评分：号码间隔"""
-        sorted_balls = sorted(red_balls)
-        intervals = [sorted_balls[i+1] - sorted_balls[i] for i in range(len(sorted_balls)-1)]
-        
-        # 获取历史间隔数据
-        analysis = self.analyze_intervals()
-        interval_freq = analysis['interval_freq']
-        
-        # 评分规则：
-        # 1. 间隔不应该太大（>8）或太小（=1）
-        # 2. 间隔应该符合历史频率分布
-        # 3. 间隔的分布应该均匀
-        score = 100
-        
-        # 检查间隔是否合理
-        for interval in intervals:
-            if interval > 8:
-                score -= 10
-            elif interval == 1:
-                score -= 5
-                
-        # 检查间隔的频率分布
-        for interval in intervals:
-            freq = interval_freq.get(interval, 0)
-            if freq < 10:  # 历史上很少出现的间隔
-                score -= 5
-                
-        return max(score, 0)
+        return self.score_dimension('interval', red_balls)
 
+    @profiled('analyzer.score_odd_even')
     def score_odd_even(self, red_balls):
         """评分：奇偶比例"""
-        odd_count = sum(1 for x in red_balls if x % 2 == 1)
-        even_count = 6 - odd_count
-        
-        analysis = self.analyze_odd_even()
-        common_ratios = [ratio for ratio, _ in analysis['most_common_ratios']]
-        
-        # 评分规则：
-        # 1. 奇偶比应该在常见比例中
-        # 2. 避免极端比例（6:0或0:6）
-        score = 100
-        
-        if (odd_count, even_count) in common_ratios:
-            score = 100
-        elif odd_count in [2,3,4]:  # 较为合理的比例
-            score = 80
-        elif odd_count in [1,5]:    # 不太合理的比例
-            score = 60
-        else:                       # 极端比例
-            score = 40
-            
-        return score
+        return self.score_dimension('odd_even', red_balls)
 
+    @profiled('analyzer.score_zones')
     def score_zones(self, red_balls):
         """评分：区间分布"""
-        # 计算区间分布
-        zone1 = sum(1 for x in red_balls if 1 <= x <= 11)
-        zone2 = sum(1 for x in red_balls if 12 <= x <= 22)
-        zone3 = sum(1 for x in red_balls if 23 <= x <= 33)
-        
-        analysis = self.analyze_zones()
-        common_zones = [dist for dist, _ in analysis['most_common_zones']]
-        
-        # 评分规则：
-        # 1. 区间分布应该在常见分布中
-        # 2. 避免号码过于集中
-        # 3. 每个区间至少要有1个号码
-        score = 100
-        
-        if (zone1, zone2, zone3) in common_zones:
-            score = 100
-        elif min(zone1, zone2, zone3) >= 1:  # 每个区间都有号码
-            score = 80
-        elif max(zone1, zone2, zone3) >= 4:  # 某个区间过于集中
-            score = 60
-        else:
-            score = 40
-            
-        return score
+        return self.score_dimension('zone', red_balls)
 
+    @profiled('analyzer.calculate_comprehensive_score')
     def calculate_comprehensive_score(self, red_balls, blue_ball):
-        """计算综合得分"""
-        scores = {
-            'hot_cold': self.score_hot_cold(red_balls),
-            'missing': self.score_missing_values(red_balls),
-            'interval': self.score_intervals(red_balls),
-            'odd_even': self.score_odd_even(red_balls),
-            'zone': self.score_zones(red_balls)
-        }
-        
-        # 计算加权总分
-        total_score = (
-            scores['hot_cold'] * self.weights['hot_cold'] +
-            scores['missing'] * self.weights['missing'] +
-            scores['interval'] * self.weights['interval'] +
-            scores['odd_even'] * self.weights['odd_even'] +
-            scores['zone'] * self.weights['zone']
-        )
-        
+        """计算综合得分（只计算权重大于0的维度）"""
+        scores = {}
+        total_score = 0
+        for dimension in active_dimensions(self.weights):
+            scores[dimension.name] = self.score_dimension(dimension.name, red_balls)
+            total_score += scores[dimension.name] * self.weights[dimension.name]
+
         # 返回详细得分和总分
         return {
             'detailed_scores': scores,
@@ -389,6 +345,45 @@ class MultiDimensionalAnalyzer:
             'weights': self.weights
         }
 
+    @profiled('analyzer.batch_score')
+    def batch_score(self, red_balls, blue_balls=None, dimensions=None):
+        """
+        批量计算综合得分
+        red_balls 为 (K, 6) 的红球数组，blue_balls 为长度 K 的蓝球数组；
+        评分规则与 score_* 完全一致，返回各维度得分数组和加权总分数组。
+        默认只计算权重大于0的维度，dimensions 指定时计算这些维度（总分仍按权重累加）
+        """
+        red = np.asarray(red_balls, dtype=np.int64)
+        if red.ndim != 2 or red.shape[1] != 6:
+            raise ValueError('红球数组的形状必须为 (K, 6)')
+        if red.size and (red.min() < 1 or red.max() > 33):
+            raise ValueError('红球必须在1-33范围内')
+        if blue_balls is not None:
+            blue = np.asarray(blue_balls, dtype=np.int64)
+            if blue.shape != (len(red),):
+                raise ValueError('蓝球数组长度必须与红球组数一致')
+            if blue.size and (blue.min() < 1 or blue.max() > 16):
+                raise ValueError('蓝球必须在1-16范围内')
+
+        snapshot = self.get_snapshot()
+        if dimensions is None:
+            dimensions = [dimension.name for dimension in active_dimensions(self.weights)]
+
+        scores = {}
+        total_score = np.zeros(len(red), dtype=np.float64)
+        for name in dimensions:
+            scores[name] = get_dimension(name).batch_score(red, snapshot.dimension_tables(name))
+            weight = self.weights.get(name, 0)
+            if weight:
+                total_score += scores[name] * weight
+
+        return {
+            'detailed_scores': scores,
+            'total_score': total_score,
+            'weights': self.weights
+        }
+
+    @profiled('analyzer.evaluate_number_combination')
     def evaluate_number_combination(self, red_balls, blue_ball):
         """评估号码组合的质量"""
         if len(red_balls) != 6 or not all(1 <= x <= 33 for x in red_balls):
@@ -397,27 +392,18 @@ class MultiDimensionalAnalyzer:
         if not (1 <= blue_ball <= 16):
             return {'error': '蓝球必须在1-16范围内'}
             
-        # 确保数据已加载
-        if not self.history_data:
-            self.load_history_data()
+        # 确保分析快照已加载
+        self.get_snapshot()
             
         # 计算综合得分
         score_result = self.calculate_comprehensive_score(red_balls, blue_ball)
         
         # 添加评估建议
         suggestions = []
-        detailed_scores = score_result['detailed_scores']
-        
-        if detailed_scores['hot_cold'] < 70:
-            suggestions.append('建议调整冷热号的比例')
-        if detailed_scores['missing'] < 70:
-            suggestions.append('建议考虑遗漏值的分布')
-        if detailed_scores['interval'] < 70:
-            suggestions.append('建议优化号码间隔')
-        if detailed_scores['odd_even'] < 70:
-            suggestions.append('建议调整奇偶比例')
-        if detailed_scores['zone'] < 70:
-            suggestions.append('建议优化区间分布')
+        for name, score in score_result['detailed_scores'].items():
+            suggestion = get_dimension(name).suggestion
+            if score < 70 and suggestion:
+                suggestions.append(suggestion)
             
         score_result['suggestions'] = suggestions
         return score_result
@@ -458,10 +444,15 @@ class MultiDimensionalAnalyzer:
         # 评估维度表现
         self.evaluate_dimension_performance()
         
+        if self._apply_dimension_performance():
+            logger.info("权重已更新: %s", self.weights)
+
+    def _apply_dimension_performance(self):
+        """按当前的维度效果调整权重，返回是否有调整"""
         # 计算性能得分的总和（用于归一化）
         total_performance = sum(abs(score) for score in self.dimension_performance.values())
         if total_performance == 0:
-            return
+            return False
             
         # 根据性能得分调整权重
         new_weights = {}
@@ -481,8 +472,7 @@ class MultiDimensionalAnalyzer:
             
         # 更新权重
         self.weights.update(new_weights)
-        
-        logger.info("权重已更新: %s", self.weights)
+        return True
 
     def record_prediction_result(self, prediction_scores, is_hit):
         """记录预测结果并更新权重"""
@@ -490,203 +480,293 @@ class MultiDimensionalAnalyzer:
         self.update_dimension_history(prediction_scores, is_hit)
         
         # 当累积足够的历史数据时调整权重
-        if len(next(iter(self.dimension_history.values()))) >= 10:
+        if max(len(history) for history in self.dimension_history.values()) >= 10:
             self.adjust_weights()
 
+    def record_prediction_results(self, prediction_scores, is_hit):
+        """
+        批量记录预测结果并更新权重，与按顺序逐条调用 record_prediction_result 等价
+        prediction_scores 为 维度 -> 得分序列，is_hit 为对应的命中序列；
+        各维度最近50条记录中命中/未命中的得分和随窗口滑动增量维护，每条记录只需 O(维度数)
+        """
+        names = [name for name in prediction_scores if name in self.dimension_history]
+        columns = {name: list(prediction_scores[name]) for name in names}
+        is_hit = [bool(hit) for hit in is_hit]
+
+        # 维度 -> [命中得分和, 命中条数, 未命中得分和, 未命中条数]
+        windows = {}
+        for dimension, history in self.dimension_history.items():
+            window = [0, 0, 0, 0]
+            for entry in history:
+                offset = 0 if entry['is_hit'] else 2
+                window[offset] += entry['score']
+                window[offset + 1] += 1
+            windows[dimension] = window
+
+        adjusted = False
+        for row, hit in enumerate(is_hit):
+            for name in names:
+                history = self.dimension_history[name]
+                window = windows[name]
+                if len(history) >= 50:
+                    entry = history.pop(0)
+                    offset = 0 if entry['is_hit'] else 2
+                    window[offset] -= entry['score']
+                    window[offset + 1] -= 1
+                score = columns[name][row]
+                history.append({'score': score, 'is_hit': hit})
+                offset = 0 if hit else 2
+                window[offset] += score
+                window[offset + 1] += 1
+
+            if max(len(history) for history in self.dimension_history.values()) < 10:
+                continue
+            for dimension in self.dimension_performance:
+                if not self.dimension_history[dimension]:
+                    continue
+                hit_sum, hit_count, miss_sum, miss_count = windows[dimension]
+                hit_avg = hit_sum / hit_count if hit_count else 0
+                miss_avg = miss_sum / miss_count if miss_count else 0
+                self.dimension_performance[dimension] = hit_avg - miss_avg
+            adjusted = self._apply_dimension_performance() or adjusted
+
+        if adjusted:
+            logger.info("权重已更新: %s", self.weights)
+
 class LotteryPredictor:
-    def __init__(self):
+    def __init__(self, analyzer=None):
         self.red_range = range(1, 34)  # 红球范围1-33
         self.blue_range = range(1, 17)  # 蓝球范围1-16
-        self.analyzer = MultiDimensionalAnalyzer()  # 创建分析器实例
-        self.min_score_threshold = 75  # 最低接受分数
-
-    def generate_random_numbers(self):
-        """生成随机号码"""
-        red_balls = sorted(random.sample(list(self.red_range), 6))
-        blue_ball = random.choice(list(self.blue_range))
+        self.analyzer = analyzer or MultiDimensionalAnalyzer()  # 创建分析器实例
+        self.min_score_threshold = 75  # 最低接受分数（综合得分为各维度得分的加权平均，0-100）
+        self.min_support = 10000  # 达到阈值的组合少于该数量时放宽阈值
+        self.effective_min_score = None  # 最近一次预测实际使用的阈值
+        self.candidate_pool_size = 50000  # 得分表不可用时每次评分的随机候选组合数
+
+    def generate_random_numbers(self, rng=random):
+        """生成随机号码，rng 可传入独立的 random.Random 实例"""
+        red_balls = sorted(rng.sample(list(self.red_range), 6))
+        blue_ball = rng.choice(list(self.blue_range))
         return red_balls, blue_ball
 
+    @profiled('predictor.predict_based_on_frequency')
     def predict_based_on_frequency(self, num_predictions=5):
         """基于频率和多维度分析预测号码"""
-        predictions = []
-        max_attempts = 100  # 最大尝试次数
-        attempts = 0
-        
-        while len(predictions) < num_predictions and attempts < max_attempts:
-            # 生成候选号码
-            candidate = self._generate_candidate_numbers()
-            red_balls, blue_ball = candidate['numbers']
-            score_result = candidate['score_result']
-            
-            # 如果分数达到阈值，加入预测结果
-            if score_result['total_score'] >= self.min_score_threshold:
-                predictions.append({
-                    'red_balls': red_balls,
-                    'blue_ball': blue_ball,
-                    'score': score_result['total_score'],
-                    'analysis': score_result
-                })
-            
-            attempts += 1
-            
-        # 如果达到最大尝试次数仍未生成足够的预测，降低标准重试
-        if len(predictions) < num_predictions:
-            self.min_score_threshold = 60  # 降低分数阈值
-            while len(predictions) < num_predictions:
-                candidate = self._generate_candidate_numbers()
-                red_balls, blue_ball = candidate['numbers']
-                predictions.append({
-                    'red_balls': red_balls,
-                    'blue_ball': blue_ball,
-                    'score': 60,
-                    'analysis': {'total_score': 60}
-                })
-        
-        # 按分数排序，返回最好的num_predictions个结果
-        predictions.sort(key=lambda x: x['score'], reverse=True)
-        return predictions[:num_predictions]
+        # 每次预测只检查一次历史版本，所有候选号码共享同一份分析快照
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+
+        # 得分表文件缺失或与当前历史版本不一致时，后台重建，本次只对随机候选池评分
+        score_table = get_score_table(snapshot.version)
+        if score_table is None:
+            schedule_score_table_rebuild(snapshot.version)
+            return self._predict_from_candidates(num_predictions)
+        return self._predict_from_score_table(score_table, num_predictions)
+
+    @profiled('predictor._predict_from_score_table')
+    def _predict_from_score_table(self, score_table, num_predictions):
+        """
+        从组合得分表中按得分加权直接抽取不重复的红球组合
+        只在得分达到阈值的组合中抽取，每组号码都带有真实的评分结果；
+        达到阈值的组合少于min_support个时放宽到得分最高的min_support个组合（记录警告），
+        实际使用的阈值记在 effective_min_score
+        """
+        sampler = score_table.sampler(self.analyzer.weights, self.min_score_threshold, self.min_support)
+        self.effective_min_score = sampler.min_score
+        return self._build_predictions(unrank_combinations(sampler.sample(num_predictions)))
 
-    def _generate_candidate_numbers(self):
-        """生成候选号码并评分"""
-        # 获取分析数据
-        analysis = self.analyzer.analyze_all_dimensions()
-        
-        # 根据冷热号分析选择红球
-        hot_cold = analysis['hot_cold']
-        red_balls = self._select_red_balls_with_strategy(hot_cold)
-        
-        # 选择蓝球
-        blue_ball = self._select_blue_ball_with_strategy(analysis)
-        
-        # 评估号码组合
-        score_result = self.analyzer.evaluate_number_combination(red_balls, blue_ball)
-        
-        return {
-            'numbers': (red_balls, blue_ball),
-            'score_result': score_result
-        }
+    def _score_candidates(self, rng=None):
+        """
+        得分表不可用时的候选组合：随机抽取candidate_pool_size个组合，直接用分析快照批量评分
+        返回红球数组 (K, 6) 和总分数组 (K,)
+        """
+        rng = rng or np.random.default_rng()
+        ranks = rng.choice(COMBINATION_COUNT, size=self.candidate_pool_size, replace=False)
+        red = unrank_combinations(ranks)
+        return red, self.analyzer.batch_score(red)['total_score']
+
+    @profiled('predictor._predict_from_candidates')
+    def _predict_from_candidates(self, num_predictions):
+        """在随机候选池中按得分加权抽取，规则与 _predict_from_score_table 相同"""
+        red, totals = self._score_candidates()
+        sampler = TicketSampler(totals, self.min_score_threshold, min(self.min_support, len(totals)))
+        self.effective_min_score = sampler.min_score
+        return self._build_predictions(red[sampler.sample(num_predictions)])
+
+    def _build_predictions(self, red_rows):
+        """为抽出的红球组合选择蓝球并评分，按得分从高到低返回"""
+        analysis = self.analyzer.get_snapshot().analysis
+        predictions = []
+        for red_balls in red_rows.tolist():
+            blue_ball = self._select_blue_ball_with_strategy(analysis)
+            score_result = self.analyzer.evaluate_number_combination(red_balls, blue_ball)
+            predictions.append({
+                'red_balls': red_balls,
+                'blue_ball': blue_ball,
+                'score': score_result['total_score'],
+                'analysis': score_result
+            })
 
-    def _select_red_balls_with_strategy(self, hot_cold_analysis):
-        """根据策略选择红球"""
-        red_hot = hot_cold_analysis['red_hot']
-        red_warm = hot_cold_analysis['red_warm']
-        red_cold = hot_cold_analysis['red_cold']
-        
-        # 按照40%热号、40%温号、20%冷号的比例选择
-        selected = []
-        
-        # 选择2-3个热号
-        hot_count = random.randint(2, 3)
-        if red_hot:
-            selected.extend(random.sample(red_hot, min(hot_count, len(red_hot))))
-        
-        # 选择2-3个温号
-        warm_count = 3 if hot_count == 2 else 2
-        if red_warm:
-            selected.extend(random.sample(red_warm, min(warm_count, len(red_warm))))
-        
-        # 补充冷号
-        cold_count = 6 - len(selected)
-        if cold_count > 0 and red_cold:
-            selected.extend(random.sample(red_cold, min(cold_count, len(red_cold))))
-        
-        # 如果号码不足6个，从所有号码中随机补充
-        while len(selected) < 6:
-            remaining = list(set(range(1, 34)) - set(selected))
-            selected.append(random.choice(remaining))
-        
-        return sorted(selected)
+        # 按分数排序
+        predictions.sort(key=lambda x: x['score'], reverse=True)
+        return predictions
 
     def _select_blue_ball_with_strategy(self, analysis):
         """根据策略选择蓝球"""
+        # 按权重随机选择
+        return int(np.random.choice(
+            list(self.blue_range),
+            p=self._blue_ball_probabilities(analysis)
+        ))
+
+    def _blue_ball_probabilities(self, analysis):
+        """根据遗漏值计算各蓝球（1-16）被选中的概率"""
         # 获取蓝球分析数据
         blue_missing = analysis['missing_values']['blue_missing']
         
         # 根据遗漏值计算权重
-        weights = {}
+        weights = []
         for ball in self.blue_range:
             missing = blue_missing.get(ball, 0)
             # 漏值越大，权重越高，但有上限
             weight = min(missing / 10, 2.0) if missing > 0 else 0.5
-            weights[ball] = weight
+            weights.append(weight)
         
         # 归一化权重
-        total_weight = sum(weights.values())
-        for ball in weights:
-            weights[ball] /= total_weight
-        
-        # 按权重随机选择
-        return int(np.random.choice(
-            list(weights.keys()),
-            p=list(weights.values())
-        ))
+        total_weight = sum(weights)
+        return [weight / total_weight for weight in weights]
+
+    @profiled('predictor.predict_parallel')
+    def predict_parallel(self, num_tickets, workers=None, seed=None, chunk_size=50000):
+        """
+        多进程批量生成不重复的预测号码（命令行任务，得分表不可用时在内存中为全部组合评分）
+        返回 red_balls (K, 6)、blue_balls (K,)、scores (K,) 三个数组和实际使用的阈值 min_score，
+        同一seed在不同进程数下结果一致
+        """
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+        score_table = get_score_table(snapshot.version, analyzer=self.analyzer)
+        totals = score_table.total_scores(self.analyzer.weights)
+
+        # 可抽取的红球组合至少与所需注数相当，保证能凑够不重复的号码
+        sampler = TicketSampler(
+            totals, self.min_score_threshold,
+            min_support=min(max(self.min_support, num_tickets), COMBINATION_COUNT)
+        )
+        self.effective_min_score = sampler.min_score
+        context = {
+            'sampler': sampler,
+            'blue_probabilities': np.array(self._blue_ball_probabilities(snapshot.analysis))
+        }
+        ticket_ids = generate_tickets_parallel(context, num_tickets, workers, seed, chunk_size)
 
+        ranks, blue_balls = np.divmod(ticket_ids, 16)
+        return {
+            'red_balls': all_combinations()[ranks].astype(np.int64),
+            'blue_balls': blue_balls + 1,
+            'scores': totals[ranks],
+            'min_score': sampler.min_score
+        }
+
+    def select_pool(self, pool_size=12, top_k=2000):
+        """
+        从得分最高的top_k个红球组合中选出号码池：
+        按各红球在这些组合中出现时的得分累计排序，取前pool_size个；
+        得分表不可用时后台重建，本次在随机候选池中取得分最高的top_k个
+        """
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+        score_table = get_score_table(snapshot.version)
+        if score_table is None:
+            schedule_score_table_rebuild(snapshot.version)
+            red, totals = self._score_candidates()
+            top = np.argsort(-totals, kind='stable')[:top_k]
+            red, totals = red[top], totals[top]
+        else:
+            ranks = score_table.top_k(self.analyzer.weights, top_k)
+            totals = score_table.total_scores(self.analyzer.weights)[ranks]
+            red = all_combinations()[ranks]
+        red = red.astype(np.intp)
+        ball_scores = np.bincount(red.ravel(), weights=np.repeat(totals, 6), minlength=34)[1:]
+        pool = np.argsort(-ball_scores, kind='stable')[:pool_size] + 1
+        return sorted(pool.tolist())
+
+    @profiled('predictor.generate_wheel')
+    def generate_wheel(self, num_tickets=10, pool_size=12, t=4, pool=None, max_passes=5):
+        """
+        旋转矩阵选号：在号码池内选num_tickets注，使其共同覆盖尽可能多的t元子集
+        号码池默认由分析器选出，候选号码增益相同时按综合得分优先；
+        返回号码池、号码列表、3/4元子集覆盖率和中奖保证
+        """
+        if pool is None:
+            pool = self.select_pool(pool_size)
+        wheel = CoverageWheel(pool, t)
+        snapshot = self.analyzer.get_snapshot()
+        wheel.candidate_scores = self.analyzer.batch_score(wheel.red_balls)['total_score']
+        chosen = wheel.solve(num_tickets, max_passes)
+
+        probabilities = self._blue_ball_probabilities(snapshot.analysis)
+        blue_balls = np.random.choice(list(self.blue_range), size=len(chosen), p=probabilities)
+        tickets = [
+            {
+                'red_balls': wheel.red_balls[index].tolist(),
+                'blue_ball': int(blue),
+                'score': float(wheel.candidate_scores[index])
+            }
+            for index, blue in zip(chosen, blue_balls)
+        ]
+        return {
+            'pool': wheel.pool.tolist(),
+            't': t,
+            'tickets': tickets,
+            'coverage': wheel.coverage(chosen),
+            'guarantee': wheel.guarantee(chosen)
+        }
+
+    @profiled('predictor.check_prediction_accuracy')
     def check_prediction_accuracy(self, draw_num):
         """检查预测准确性并更新权重"""
         try:
             actual = LotteryHistory.objects.get(draw_num=draw_num)
             predictions = PredictionRecord.objects.filter(draw_num=draw_num)
             
-            actual_red = {
-                actual.red_ball_1, actual.red_ball_2, actual.red_ball_3,
-                actual.red_ball_4, actual.red_ball_5, actual.red_ball_6
-            }
-            
-            for pred in predictions:
-                pred_red = {
-                    pred.red_ball_1, pred.red_ball_2, pred.red_ball_3,
-                    pred.red_ball_4, pred.red_ball_5, pred.red_ball_6
-                }
-                
-                # 计算命中数
-                red_hits = len(actual_red & pred_red)
-                blue_hit = actual.blue_ball == pred.blue_ball
-                
-                # 判定中奖等级
-                prize_level = self._get_prize_level(red_hits, blue_hit)
-                is_hit = prize_level is not None
-                
-                # 重新评估这组号码
-                red_balls = sorted(list(pred_red))
-                score_result = self.analyzer.evaluate_number_combination(red_balls, pred.blue_ball)
-                
-                # 记录预测结果并更新权重
-                self.analyzer.record_prediction_result(score_result['detailed_scores'], is_hit)
-                
-                # 更新预测记录
-                pred.hit_count = red_hits
-                pred.blue_hit = blue_hit
-                pred.is_hit = is_hit
-                pred.save()
-                
-                logger.info(
-                    f"期号 {draw_num} 的预测分析结果: "
-                    f"红球命中 {red_hits} 个, "
-                    f"蓝球{'命中' if blue_hit else '未命中'}, "
-                    f"中奖等级: {f'{prize_level}等奖' if prize_level else '未中奖'}"
-                )
+            # 在同一事务中基于最新的持久化权重调整，并写回新版本
+            with update_weight_state(self.analyzer):
+                self._grade_predictions(draw_num, actual, predictions)
                 
         except LotteryHistory.DoesNotExist:
             logger.warning(f"期号 {draw_num} 的开奖记录不存在")
         except Exception as e:
             logger.error(f"检查预测准确性时发生错误: {str(e)}")
 
-    def _get_prize_level(self, red_hits, blue_hit):
+    def _grade_predictions(self, draw_num, actual, predictions, chunk_size=5000):
         """
-        根据双色球规则判定中奖等级
-        返回值：1-6表示对应等级奖项，None表示未中奖
+        分批判定预测记录的命中情况，并记录维度得分反馈
+        复式/胆拖按组合数直接计算各等级注数；维度得分用批量评分，只对单式号码反馈；
+        结果按命中情况分组写回（调用方负责事务）
         """
-        if red_hits == 6 and blue_hit:
-            return 1  # 一等奖：6红+1蓝
-        elif red_hits == 6 and not blue_hit:
-            return 2  # 二等奖：6红+0蓝
-        elif red_hits == 5 and blue_hit:
-            return 3  # 三等奖：5红+1蓝
-        elif (red_hits == 5 and not blue_hit) or (red_hits == 4 and blue_hit):
-            return 4  # 四等奖：5红+0蓝 或 4红+1蓝
-        elif (red_hits == 4 and not blue_hit) or (red_hits == 3 and blue_hit):
-            return 5  # 五等奖：4红+0蓝 或 3红+1蓝
-        elif red_hits <= 2 and blue_hit:
-            return 6  # 六等奖：2红+1蓝 或 1红+1蓝 或 0红+1蓝
-        else:
-            return None  # 未中奖
\ No newline at end of file
+        # 反馈顺序影响权重调整，按保存时间倒序（同一时间按id）确定顺序
+        rows = predictions.order_by('-created_at', '-id').values_list(
+            'id', 'red_mask', 'banker_mask', 'blue_mask', *BALL_FIELDS[:6]
+        ).iterator(chunk_size=chunk_size)
+        level_counts = np.zeros(PRIZE_SLOTS, dtype=np.int64)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            data = np.array(chunk, dtype=np.int64)
+            grades = grade_tickets(data[:, 1], data[:, 2], data[:, 3], actual.red_mask, actual.blue_ball)
+            counts = grades['prize_counts']
+            is_hit = counts[:, 1:].any(axis=1)
+
+            # 维度得分只与号码有关，先批量评分再按原顺序逐条反馈
+            single = counts.sum(axis=1) == 1
+            detailed_scores = self.analyzer.batch_score(data[single, 4:10])['detailed_scores']
+            self.analyzer.record_prediction_results(
+                {name: scores.tolist() for name, scores in detailed_scores.items()}, is_hit[single]
+            )
+
+            write_grades(data[:, 0], grades['red_hits'], grades['blue_hits'], is_hit, grades['banker_hits'])
+            level_counts += counts.sum(axis=0)
+
+        logger.info(
+            f"期号 {draw_num} 的预测分析结果: 共 {int(level_counts.sum())} 注, "
+            + ", ".join(f"{PRIZE_NAMES[level]} {int(level_counts[level])} 注" for level in range(1, 7))
+        )
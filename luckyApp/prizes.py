@@ -0,0 +1,44 @@
+import numpy as np
+
+PRIZE_SLOTS = 7  # 下标0表示未中奖，1-6表示对应等级奖项
+
+PRIZE_NAMES = ('未中奖', '一等奖', '二等奖', '三等奖', '四等奖', '五等奖', '六等奖')
+
+# 各等级单注奖金（元）；一、二等奖为浮动奖金，这里取估算值
+PRIZE_AMOUNTS = np.array([0, 5000000, 100000, 3000, 200, 10, 5], dtype=np.int64)
+
+# PRIZE_LEVELS[红球命中数, 蓝球是否命中] = 中奖等级，0 表示未中奖
+PRIZE_LEVELS = np.zeros((7, 2), dtype=np.int64)
+PRIZE_LEVELS[6, 1] = 1  # 一等奖：6红+1蓝
+PRIZE_LEVELS[6, 0] = 2  # 二等奖：6红+0蓝
+PRIZE_LEVELS[5, 1] = 3  # 三等奖：5红+1蓝
+PRIZE_LEVELS[5, 0] = PRIZE_LEVELS[4, 1] = 4  # 四等奖：5红+0蓝 或 4红+1蓝
+PRIZE_LEVELS[4, 0] = PRIZE_LEVELS[3, 1] = 5  # 五等奖：4红+0蓝 或 3红+1蓝
+PRIZE_LEVELS[:3, 1] = 6  # 六等奖：2红+1蓝 或 1红+1蓝 或 0红+1蓝
+PRIZE_LEVELS.flags.writeable = False
+
+
+def prize_level(red_hits, blue_hit):
+    """根据双色球规则判定中奖等级，返回1-6，未中奖返回None"""
+    level = int(PRIZE_LEVELS[red_hits, int(bool(blue_hit))])
+    return level or None
+
+
+def prize_levels(red_hits, blue_hits):
+    """批量判定中奖等级，0 表示未中奖"""
+    return PRIZE_LEVELS[np.asarray(red_hits, dtype=np.intp), np.asarray(blue_hits, dtype=bool).astype(np.intp)]
+
+
+def prize_amount(level):
+    """单注奖金，未中奖为0"""
+    return int(PRIZE_AMOUNTS[level or 0])
+
+
+def prize_amounts(levels):
+    """批量查询单注奖金"""
+    return PRIZE_AMOUNTS[np.asarray(levels, dtype=np.intp)]
+
+
+def prize_distribution(levels):
+    """各等级的注数，下标0为未中奖"""
+    return np.bincount(np.asarray(levels, dtype=np.intp), minlength=PRIZE_SLOTS)
@@ -0,0 +1,94 @@
+import functools
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+# 进程内的统计数据：名称 -> 调用次数、累计耗时、数据库查询次数、缓存命中情况
+_stats_lock = threading.Lock()
+_stats = {}
+_enabled = None  # 运行时开关，None 表示以 settings.LUCKY_PROFILING 为准
+
+
+def is_enabled():
+    if _enabled is not None:
+        return _enabled
+    return getattr(settings, 'LUCKY_PROFILING', False)
+
+
+def enable_profiling(enabled=True):
+    """运行时开启或关闭统计（传入None恢复使用配置项）"""
+    global _enabled
+    _enabled = enabled
+
+
+def _entry(name):
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = {
+            'calls': 0,
+            'total_time': 0.0,
+            'queries': 0,
+            'cache_hits': 0,
+            'cache_misses': 0
+        }
+    return entry
+
+
+def record_cache(name, hit):
+    """记录一次缓存命中或未命中"""
+    if not is_enabled():
+        return
+    with _stats_lock:
+        _entry(name)['cache_hits' if hit else 'cache_misses'] += 1
+
+
+def get_stats():
+    """当前进程的统计数据（按累计耗时从高到低）"""
+    with _stats_lock:
+        items = [(name, dict(entry)) for name, entry in _stats.items()]
+    for _, entry in items:
+        entry['avg_time'] = entry['total_time'] / entry['calls'] if entry['calls'] else 0.0
+    return dict(sorted(items, key=lambda item: item[1]['total_time'], reverse=True))
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class _QueryCounter:
+    """统计经过的数据库查询次数"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def profiled(name):
+    """
+    记录被装饰函数的调用次数、累计耗时和数据库查询次数
+    未开启统计时直接调用原函数；嵌套调用时耗时和查询次数计入每一层
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            counter = _QueryCounter()
+            start = time.perf_counter()
+            try:
+                with connection.execute_wrapper(counter):
+                    return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with _stats_lock:
+                    entry = _entry(name)
+                    entry['calls'] += 1
+                    entry['total_time'] += elapsed
+                    entry['queries'] += counter.count
+        return wrapper
+    return decorator
@@ -0,0 +1,103 @@
+import csv
+import logging
+
+import numpy as np
+from django.db import transaction
+from .models import PredictionRecord
+from .score_table import COMBINATION_COUNT, unrank_combinations
+
+logger = logging.getLogger(__name__)
+
+TICKET_COUNT = COMBINATION_COUNT * 16  # 全部不同号码（红球组合 × 蓝球）的个数
+
+
+class RandomTicketGenerator:
+    """
+    批量生成不重复的随机号码
+    号码编号 = 红球组合序号 * 16 + (蓝球 - 1)，均匀抽取编号即等价于逐注随机选号；
+    同一seed、同样的调用顺序得到的结果完全一致
+    """
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self._seen = None  # 跨批次去重用的位图，只在分批生成时才分配
+        self._seen_count = 0
+
+    def generate(self, count):
+        """生成count注不重复的号码，返回 (K, 6) 升序红球数组和 (K,) 蓝球数组"""
+        return self._decode(self._take_unique(count))
+
+    def iter_chunks(self, count, chunk_size=100000):
+        """分批生成共count注号码，批与批之间也不重复"""
+        if count > TICKET_COUNT:
+            raise ValueError(f'最多只能生成 {TICKET_COUNT} 注不重复的号码')
+        if count > chunk_size and self._seen is None:
+            self._seen = np.zeros(TICKET_COUNT, dtype=bool)
+        for start in range(0, count, chunk_size):
+            yield self.generate(min(chunk_size, count - start))
+
+    def _take_unique(self, count):
+        available = TICKET_COUNT - self._seen_count
+        if count > available:
+            raise ValueError(f'最多只能再生成 {available} 注不重复的号码')
+
+        if count * 2 > available:
+            # 剩余号码不多时直接从未使用的编号中无放回抽取
+            pool = np.arange(TICKET_COUNT) if self._seen is None else np.flatnonzero(~self._seen)
+            ids = self.rng.choice(pool, size=count, replace=False)
+        else:
+            ids = np.empty(0, dtype=np.int64)
+            while len(ids) < count:
+                picks = self.rng.integers(0, TICKET_COUNT, size=count - len(ids))
+                if self._seen is not None:
+                    picks = picks[~self._seen[picks]]
+                merged = np.concatenate((ids, picks))
+                _, first = np.unique(merged, return_index=True)
+                ids = merged[np.sort(first)]
+
+        if self._seen is not None:
+            self._seen[ids] = True
+            self._seen_count += len(ids)
+        return ids
+
+    @staticmethod
+    def _decode(ids):
+        """编号解码为红球和蓝球；红球按组合序号直接反算，不需要生成全部组合"""
+        ranks, blues = np.divmod(ids, 16)
+        return unrank_combinations(ranks).astype(np.int8), (blues + 1).astype(np.int8)
+
+
+def write_csv(path, chunks):
+    """把分批生成的号码依次写入CSV文件，返回写入的注数"""
+    total = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['红球1', '红球2', '红球3', '红球4', '红球5', '红球6', '蓝球'])
+        for red_balls, blue_balls in chunks:
+            writer.writerows(np.column_stack((red_balls, blue_balls)).tolist())
+            total += len(blue_balls)
+    return total
+
+
+def save_predictions(draw_num, chunks, prediction_type='random', batch_size=5000):
+    """把分批生成的号码作为预测记录批量写入数据库（单个事务），返回写入的注数"""
+    total = 0
+    with transaction.atomic():
+        for red_balls, blue_balls in chunks:
+            records = [
+                PredictionRecord(
+                    draw_num=draw_num,
+                    red_ball_1=red[0],
+                    red_ball_2=red[1],
+                    red_ball_3=red[2],
+                    red_ball_4=red[3],
+                    red_ball_5=red[4],
+                    red_ball_6=red[5],
+                    blue_ball=blue,
+                    prediction_type=prediction_type
+                )
+                for red, blue in zip(red_balls.tolist(), blue_balls.tolist())
+            ]
+            PredictionRecord.objects.bulk_create(records, batch_size=batch_size)
+            total += len(records)
+            logger.debug("已写入 %s 注随机号码", total)
+    return total
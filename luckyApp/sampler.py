@@ -0,0 +1,108 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AliasTable:
+    """Walker 别名表：O(n) 构建，每次抽样 O(1)"""
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.sum() <= 0:
+            weights = np.ones_like(weights)
+        size = len(weights)
+        prob = weights * size / weights.sum()
+        alias = np.arange(size)
+
+        small = [i for i in range(size) if prob[i] < 1.0]
+        large = [i for i in range(size) if prob[i] >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            alias[less] = more
+            prob[more] -= 1.0 - prob[less]
+            if prob[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # 剩余项只因浮点误差偏离1
+        for i in small + large:
+            prob[i] = 1.0
+
+        self.prob = prob
+        self.alias = alias
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng, size):
+        """抽取size个下标"""
+        index = rng.integers(0, len(self.prob), size=size)
+        keep = rng.random(size) < self.prob[index]
+        return np.where(keep, index, self.alias[index])
+
+
+class TicketSampler:
+    """
+    按得分加权直接抽取不重复的红球组合
+    组合先按总分分组，用别名表按“组内得分之和”选组，再在组内均匀选取，
+    每个组合被选中的概率与其得分成正比；开销与分数阈值高低无关
+    """
+    def __init__(self, totals, min_score=0, min_support=0):
+        """
+        totals 为按组合序号排列的总分数组；只在得分不低于min_score的组合中抽取。
+        min_support>0 时，满足条件的组合少于min_support个会放宽到得分最高的min_support个组合，
+        并记录警告；实际使用的阈值见 min_score，是否放宽见 relaxed。
+        min_support=0 时严格按阈值抽取，没有满足条件的组合时抛出 ValueError
+        """
+        totals = np.asarray(totals)
+        self.requested_min_score = min_score
+        eligible = int(np.count_nonzero(totals >= min_score))
+        if eligible < min_support:
+            min_support = min(min_support, len(totals))
+            min_score = float(np.partition(totals, len(totals) - min_support)[len(totals) - min_support])
+            logger.warning(
+                "得分不低于 %s 的组合只有 %d 个，阈值已放宽到 %.2f（得分最高的 %d 个组合）",
+                self.requested_min_score, eligible, min_score, min_support
+            )
+        elif eligible == 0:
+            raise ValueError(f'没有得分不低于 {min_score} 的组合')
+
+        ranks = np.flatnonzero(totals >= min_score)
+        values, inverse, counts = np.unique(totals[ranks], return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind='stable')
+
+        self.min_score = min_score
+        self.members = ranks[order]  # 按得分从低到高分组排列的组合序号
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))[:-1]
+        self.counts = counts
+        self.classes = AliasTable(values * counts)
+
+    @property
+    def relaxed(self):
+        """实际阈值是否低于请求的阈值"""
+        return self.min_score < self.requested_min_score
+
+    @property
+    def support(self):
+        """可抽取的组合数"""
+        return len(self.members)
+
+    def sample(self, k, rng=None):
+        """抽取k个不重复的组合序号，可抽取的组合不足2k个时直接按得分从高到低选取"""
+        rng = rng or np.random.default_rng()
+        if k >= self.support:
+            return self.members[::-1].copy()
+        if 2 * k >= self.support:
+            return self.members[::-1][:k].copy()
+
+        selected = np.empty(0, dtype=np.int64)
+        while len(selected) < k:
+            need = k - len(selected)
+            classes = self.classes.sample(rng, need)
+            picks = self.members[self.offsets[classes] + rng.integers(0, self.counts[classes])]
+            merged = np.concatenate((selected, picks))
+            _, first = np.unique(merged, return_index=True)
+            selected = merged[np.sort(first)]
+        return selected[:k]
@@ -0,0 +1,295 @@
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from math import comb
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from .sampler import TicketSampler
+from .dimensions import dimension_names
+from .profiling import profiled, record_cache
+
+logger = logging.getLogger(__name__)
+
+COMBINATION_COUNT = comb(33, 6)  # 红球组合总数 1,107,568
+
+# BINOM[n, k] = C(n, k)，用于组合序号的计算
+BINOM = np.array([[comb(n, k) for k in range(7)] for n in range(34)], dtype=np.int64)
+
+_combinations_lock = threading.Lock()
+_combinations = None
+
+# 进程内已加载的得分表
+_table_lock = threading.Lock()
+_table_cache = {}
+
+
+def all_combinations():
+    """按字典序排列的全部红球组合，(1107568, 6) 的 int8 数组，第 i 行的序号为 i"""
+    global _combinations
+    with _combinations_lock:
+        if _combinations is None:
+            flat = np.fromiter(
+                itertools.chain.from_iterable(itertools.combinations(range(1, 34), 6)),
+                dtype=np.int8,
+                count=COMBINATION_COUNT * 6
+            )
+            _combinations = flat.reshape(-1, 6)
+            _combinations.flags.writeable = False
+        return _combinations
+
+
+def combination_rank(red_balls):
+    """
+    红球组合在字典序中的序号
+    支持单组（6个号码）或 (K, 6) 数组，号码无需预先排序
+    """
+    red = np.sort(np.asarray(red_balls, dtype=np.int64), axis=-1)
+    # rank = C(33,6) - 1 - Σ C(33 - c_i, 6 - i)，i 从 0 开始
+    remaining = BINOM[33 - red, np.arange(6, 0, -1)]
+    return COMBINATION_COUNT - 1 - remaining.sum(axis=-1)
+
+
+def unrank_combinations(ranks):
+    """
+    组合序号转换为红球组合（combination_rank 的逆运算），返回 (K, 6) 的 int64 数组
+    逐位按组合数表二分查找，不需要生成全部组合
+    """
+    remaining = COMBINATION_COUNT - 1 - np.asarray(ranks, dtype=np.int64)
+    red = np.empty(remaining.shape + (6,), dtype=np.int64)
+    for position, k in enumerate(range(6, 0, -1)):
+        # 最大的 n 使 C(n, k) 不超过剩余值，对应号码为 33 - n
+        n = np.searchsorted(BINOM[:, k], remaining, side='right') - 1
+        remaining = remaining - BINOM[n, k]
+        red[..., position] = 33 - n
+    return red
+
+
+def default_table_path():
+    return getattr(settings, 'SCORE_TABLE_PATH', os.path.join(settings.BASE_DIR, 'data', 'score_table.npy'))
+
+
+@contextmanager
+def build_lock(path=None):
+    """
+    跨进程的得分表重建锁（与得分表同目录的 .lock 文件），不等待：
+    已被其他进程持有时返回False；进程退出时操作系统自动释放，不会遗留死锁
+    """
+    path = path or default_table_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(os.path.splitext(path)[0] + '.lock', 'a+b') as f:
+        f.seek(0)
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            f.seek(0)
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_score_table(version, path=None, analyzer=None):
+    """
+    获取与指定历史版本一致的得分表（进程内缓存）
+    文件不存在或已过期时：传入analyzer则在内存中计算一份（约数秒，只用于命令行任务），否则返回None
+    """
+    path = path or default_table_path()
+    with _table_lock:
+        table = _table_cache.get(path)
+        if table is not None and table.version == version:
+            record_cache('cache.score_table', True)
+            return table
+
+        table = ScoreTable.load(path)
+        if table is not None and table.version == version:
+            record_cache('cache.score_table', False)
+            _table_cache[path] = table
+            return table
+        if analyzer is None:
+            return None
+
+        table = _table_cache.get('memory')
+        record_cache('cache.score_table', table is not None and table.version == version)
+        if table is None or table.version != version:
+            table = ScoreTable.compute(analyzer)
+            _table_cache['memory'] = table
+            logger.info("得分表文件不可用，已在内存中计算期号 %s 的得分表", version)
+        return table
+
+
+class ScoreTable:
+    """
+    全部红球组合的各维度得分表
+    得分按组合序号存放在内存映射文件中，(1107568, 维度数) 的 uint8 数组，列顺序同 dimensions；
+    保存全部已注册维度的得分，权重调整后无需重建
+    """
+    def __init__(self, scores, version, dimensions=None):
+        self.scores = scores
+        self.version = version
+        self.dimensions = list(dimensions or dimension_names())
+        self._totals_key = None
+        self._totals = None
+        self._sampler = None
+
+    @staticmethod
+    def meta_path(path):
+        return os.path.splitext(path)[0] + '.json'
+
+    @staticmethod
+    def _fill_scores(analyzer, scores, dimensions, chunk_size=200000):
+        """分块为全部组合评分，写入 scores 数组"""
+        combos = all_combinations()
+        for start in range(0, COMBINATION_COUNT, chunk_size):
+            chunk = combos[start:start + chunk_size]
+            detailed = analyzer.batch_score(chunk, dimensions=dimensions)['detailed_scores']
+            for column, dimension in enumerate(dimensions):
+                scores[start:start + len(chunk), column] = np.rint(detailed[dimension])
+
+    @classmethod
+    @profiled('score_table.compute')
+    def compute(cls, analyzer):
+        """在内存中为全部组合评分（不写文件）"""
+        snapshot = analyzer.get_snapshot()
+        dimensions = dimension_names()
+        scores = np.empty((COMBINATION_COUNT, len(dimensions)), dtype=np.uint8)
+        cls._fill_scores(analyzer, scores, dimensions)
+        return cls(scores, snapshot.version, dimensions)
+
+    @staticmethod
+    def data_path(path, version):
+        """某一版本的得分数据文件，按版本号区分，元数据文件中记录当前使用的是哪一个"""
+        return f'{os.path.splitext(path)[0]}.{version}.npy'
+
+    @classmethod
+    def build(cls, analyzer, path=None):
+        """
+        用分析器当前的快照为全部组合评分并写入文件
+        数据按版本写入单独的文件，最后原子替换元数据文件切换到新版本：
+        读取方先读元数据再打开其中记录的数据文件，版本号和数据始终对应
+        """
+        path = path or default_table_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        snapshot = analyzer.get_snapshot(refresh=True)
+        dimensions = dimension_names()
+        data_path = cls.data_path(path, snapshot.version)
+        meta_path = cls.meta_path(path)
+        # 临时文件名带进程和线程号，多个进程同时重建时互不覆盖
+        suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        scores = np.lib.format.open_memmap(
+            data_path + suffix, mode='w+', dtype=np.uint8, shape=(COMBINATION_COUNT, len(dimensions))
+        )
+        cls._fill_scores(analyzer, scores, dimensions)
+        scores.flush()
+        del scores
+        os.replace(data_path + suffix, data_path)
+
+        with open(meta_path + suffix, 'w') as f:
+            json.dump({
+                'version': snapshot.version,
+                'dimensions': dimensions,
+                'data': os.path.basename(data_path)
+            }, f)
+        os.replace(meta_path + suffix, meta_path)
+        cls._remove_stale(path, data_path)
+
+        logger.info("已生成期号 %s 的组合得分表: %s", snapshot.version, data_path)
+        return cls.load(path)
+
+    @classmethod
+    def ensure_current(cls, analyzer, path=None):
+        """
+        得分表不是分析器当前历史版本时重建，返回得分表
+        多个进程（各 web worker、定时任务）可能同时发现得分表过期：只有取得 build_lock 的进程重建，
+        其余进程直接返回None；取得锁后再读一次文件中的版本，其他进程刚重建完成时不再重复
+        """
+        path = path or default_table_path()
+        version = analyzer.get_snapshot(refresh=True).version
+        with build_lock(path) as acquired:
+            if not acquired:
+                logger.info("其他进程正在重建得分表，跳过")
+                return None
+            table = cls.load(path)
+            if table is not None and table.version == version:
+                return table
+            return cls.build(analyzer, path)
+
+    @classmethod
+    def _remove_stale(cls, path, current):
+        """删除旧版本的数据文件（已打开的内存映射不受影响，删除失败时忽略）"""
+        root = os.path.splitext(path)[0]
+        for stale in glob.glob(glob.escape(root) + '.*.npy') + [path]:
+            if stale != current and os.path.exists(stale):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, path=None):
+        """以只读内存映射方式打开得分表，文件不存在时返回None"""
+        path = path or default_table_path()
+        meta_path = cls.meta_path(path)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # 注册的维度有变化时视为过期
+        if meta.get('dimensions') != dimension_names():
+            return None
+        data_path = os.path.join(os.path.dirname(path), meta['data']) if 'data' in meta else path
+        if not os.path.exists(data_path):
+            return None
+        return cls(np.load(data_path, mmap_mode='r'), meta['version'], meta['dimensions'])
+
+    def total_scores(self, weights):
+        """按给定权重计算全部组合的加权总分（同一组权重只计算一次，跳过权重为0的维度）"""
+        key = tuple(weights.get(dimension, 0) for dimension in self.dimensions)
+        record_cache('cache.total_scores', key == self._totals_key)
+        if key != self._totals_key:
+            totals = np.zeros(COMBINATION_COUNT, dtype=np.float64)
+            for column, weight in enumerate(key):
+                if weight:
+                    totals += self.scores[:, column] * weight
+            self._totals = totals
+            self._totals_key = key
+            self._sampler = None
+        return self._totals
+
+    def top_k(self, weights, k):
+        """得分最高的k个组合的序号"""
+        totals = self.total_scores(weights)
+        top = np.argpartition(-totals, k - 1)[:k]
+        return top[np.argsort(-totals[top], kind='stable')]
+
+    def sampler(self, weights, min_score=0, min_support=0):
+        """
+        按给定权重和分数阈值构建的抽样器（同一组参数只构建一次）
+        min_support 的含义同 TicketSampler：达到阈值的组合不足时放宽到得分最高的min_support个
+        """
+        totals = self.total_scores(weights)
+        key = (min_score, min_support)
+        hit = self._sampler is not None and self._sampler[0] == key
+        record_cache('cache.sampler', hit)
+        if not hit:
+            self._sampler = (key, TicketSampler(totals, min_score, min_support))
+        return self._sampler[1]
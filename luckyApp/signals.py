@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import LotteryHistory
+from .predictor import invalidate_analysis_snapshot
+
+
+@receiver(post_save, sender=LotteryHistory)
+def lottery_history_saved(sender, created, **kwargs):
+    """
+    已有开奖记录被修改时清除分析快照缓存
+    新增的记录由 absorb_new_draw 或下次获取快照时增量并入
+    """
+    if not created:
+        invalidate_analysis_snapshot()
+
+
+@receiver(post_delete, sender=LotteryHistory)
+def lottery_history_deleted(sender, **kwargs):
+    """开奖记录被删除时清除分析快照缓存"""
+    invalidate_analysis_snapshot()
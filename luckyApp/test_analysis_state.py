@@ -0,0 +1,138 @@
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .analysis_state import AnalysisState
+from .history_store import DrawMatrix
+from .predictor import AnalysisSnapshot, MultiDimensionalAnalyzer, _snapshot_cache, absorb_new_draw
+from .testcases import LotteryTestCase, create_draws
+
+STATE_ARRAYS = (
+    'red_freq', 'blue_freq', 'red_last_row', 'blue_last_row', 'red_recent', 'blue_recent',
+    'interval_hist', 'odd_hist', 'odd_last_row', 'zone_hist', 'zone_last_row'
+)
+
+
+def draw_matrix(draws):
+    return DrawMatrix.from_rows([(draw_num, *reds, blue) for draw_num, reds, blue in draws])
+
+
+def ordered(value):
+    """分析结果中的字典按插入顺序比较（最近出现的取值在前影响 most_common_* 的并列顺序）"""
+    if isinstance(value, dict):
+        return [(key, ordered(item)) for key, item in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [ordered(item) for item in value]
+    return value
+
+
+class AnalysisStateMixin:
+
+    def assert_same_state(self, state, expected):
+        self.assertEqual(state.size, expected.size)
+        np.testing.assert_array_equal(state.draws.draw_nums, expected.draws.draw_nums)
+        np.testing.assert_array_equal(state.draws.balls, expected.draws.balls)
+        for name in STATE_ARRAYS:
+            np.testing.assert_array_equal(getattr(state, name), getattr(expected, name), err_msg=name)
+        self.assertEqual(ordered(state.analysis()), ordered(expected.analysis()))
+
+
+class AnalysisStatePushTests(AnalysisStateMixin, SimpleTestCase):
+    """逐期 push 与一次性 from_draws 构建的统计状态一致"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.draws = [
+            (2003001 + index, sorted(rng.sample(range(1, 34), 6)), rng.randint(1, 16)) for index in range(260)
+        ]
+
+    def test_push_from_empty(self):
+        state = AnalysisState()
+        for draw_num, reds, blue in self.draws:
+            state.push(draw_num, reds, blue)
+        self.assert_same_state(state, AnalysisState.from_draws(draw_matrix(self.draws)))
+
+    def test_push_across_windows(self):
+        """从不同的起点开始增量并入，跨过冷热窗口和分析窗口的边界"""
+        for start in (0, 1, 29, 30, 99, 100, 101, 250):
+            with self.subTest(start=start):
+                state = AnalysisState.from_draws(draw_matrix(self.draws[:start]))
+                for draw_num, reds, blue in self.draws[start:]:
+                    state.push(draw_num, reds, blue)
+                    self.assertEqual(state.latest_draw_num, draw_num)
+                self.assert_same_state(state, AnalysisState.from_draws(draw_matrix(self.draws)))
+
+    def test_small_windows(self):
+        draws = draw_matrix(self.draws[:50])
+        state = AnalysisState.from_draws(draws.head(5), recent_periods=3, history_limit=7)
+        for draw_num, reds, blue in self.draws[5:50]:
+            state.push(draw_num, reds, blue)
+        self.assert_same_state(state, AnalysisState.from_draws(draws, recent_periods=3, history_limit=7))
+
+
+class SnapshotSyncTests(AnalysisStateMixin, LotteryTestCase):
+    """获取快照时增量并入新数据，与重新全量构建的结果一致"""
+
+    def setUp(self):
+        super().setUp()
+        create_draws(200)
+        self.analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+        self.analyzer.get_snapshot()
+        self.state = _snapshot_cache['state']
+
+    def assert_matches_rebuild(self, snapshot):
+        # 仍是同一个统计状态对象，说明走的是增量路径
+        self.assertIs(_snapshot_cache['state'], self.state)
+        rebuilt = AnalysisSnapshot(snapshot.version, AnalysisState.from_draws(DrawMatrix.load()))
+        self.assert_same_state(self.state, AnalysisState.from_draws(DrawMatrix.load()))
+        for name in ('hot_cold', 'missing_values', 'intervals', 'odd_even', 'zones'):
+            self.assertEqual(ordered(snapshot.analysis[name]), ordered(rebuilt.analysis[name]), name)
+
+        red = np.sort(np.array([random.Random(index).sample(range(1, 34), 6) for index in range(200)]), axis=1)
+        fresh = MultiDimensionalAnalyzer(restore_weights=False)
+        fresh.snapshot = rebuilt
+        np.testing.assert_allclose(
+            self.analyzer.batch_score(red)['total_score'], fresh.batch_score(red)['total_score']
+        )
+
+    def test_sync_new_draws(self):
+        previous = self.analyzer.snapshot
+        create_draws(40, start=200)
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+        self.assertIsNot(snapshot, previous)
+        self.assertEqual(self.state.size, 240)
+        # 旧快照已冻结，仍可读取同步前的分析结果
+        self.assertEqual(previous.analysis['hot_cold'], AnalysisState.from_draws(previous.draws).hot_cold())
+        self.assert_matches_rebuild(snapshot)
+
+    def test_absorb_new_draw(self):
+        (draw_num, reds, blue), = create_draws(1, seed=99, start=200)
+        self.assertTrue(absorb_new_draw({'draw_num': draw_num, 'red_balls': reds, 'blue_ball': blue}))
+        self.assertEqual(self.state.size, 201)
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+        self.assertEqual(snapshot.version, draw_num)
+        self.assert_matches_rebuild(snapshot)
+
+    def test_absorb_uses_stored_balls(self):
+        """并入的是数据库中保存的号码，而不是调用方传入的数据"""
+        (draw_num, reds, blue), = create_draws(1, seed=99, start=200)
+        wrong = [ball % 33 + 1 for ball in reds]
+        self.assertTrue(absorb_new_draw({'draw_num': draw_num, 'red_balls': wrong, 'blue_ball': blue % 16 + 1}))
+        self.assertEqual(list(self.state.draws.balls[-1]), reds + [blue])
+        self.assert_matches_rebuild(self.analyzer.get_snapshot(refresh=True))
+
+    def test_absorb_rejects_unsaved_draw(self):
+        """期号未入库时不并入，即使其他记录使总数恰好多一条"""
+        create_draws(1, start=-1)
+        self.assertFalse(absorb_new_draw({'draw_num': '2004051', 'red_balls': [1, 2, 3, 4, 5, 6], 'blue_ball': 1}))
+        self.assertEqual(self.state.size, 200)
+
+    def test_rebuilds_when_not_contiguous(self):
+        """新一期入库的同时补录了更早的期号，不能增量并入，重新全量构建"""
+        create_draws(1, start=-1)
+        create_draws(1, seed=99, start=200)
+        snapshot = self.analyzer.get_snapshot(refresh=True)
+        self.assertIsNot(_snapshot_cache['state'], self.state)
+        self.assert_same_state(_snapshot_cache['state'], AnalysisState.from_draws(DrawMatrix.load()))
+        self.assertEqual(snapshot.version, '2004051')
@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from .backtest import backtest_options, backtest_steps, run_backtest
+from .history_store import DrawMatrix
+from .testcases import LotteryTestCase, create_draws
+
+
+def random_draws(count, seed=9):
+    rng = random.Random(seed)
+    return DrawMatrix.from_rows([
+        (2003001 + index, *sorted(rng.sample(range(1, 34), 6)), rng.randint(1, 16)) for index in range(count)
+    ])
+
+
+class BacktestStepsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.draws = random_draws(130)
+        self.options = json.loads(json.dumps(backtest_options(5, 60, seed=3, pool_size=20000)))
+
+    def test_no_look_ahead(self):
+        """某一期的结果只取决于之前的数据"""
+        full = backtest_steps(self.draws, [110, 120], self.options)
+        head = DrawMatrix(self.draws.draw_nums[:121], self.draws.balls[:121])
+        self.assertEqual(full, backtest_steps(head, [110, 120], self.options))
+
+    def test_independent_of_chunking(self):
+        steps = list(range(100, 115))
+        results = {}
+        for chunk_steps in (1, 4, 15):
+            collected = []
+            run_backtest(self.draws, steps, self.options, chunk_steps=chunk_steps, on_result=collected.extend)
+            results[chunk_steps] = sorted(collected, key=lambda result: result['draw_num'])
+        self.assertEqual(results[1], results[4])
+        self.assertEqual(results[1], results[15])
+        self.assertEqual([result['draw_num'] for result in results[1]], [str(2003001 + i) for i in steps])
+        for result in results[1]:
+            self.assertEqual(result['params'], self.options)
+            self.assertEqual(sum(result['predicted']), 5)
+            self.assertEqual(sum(result['random']), 5)
+
+
+class BacktestCommandTests(LotteryTestCase):
+    """结果逐期写入 JSONL，中断后以相同参数再次运行只补齐缺失的期号"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_draws(112)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.output = os.path.join(directory, 'backtest.jsonl')
+
+    def run_command(self, tickets=3):
+        out = StringIO()
+        call_command(
+            'backtest', tickets=tickets, min_history=100, pool_size=20000, workers=1, seed=5,
+            output=self.output, stdout=out
+        )
+        self.assertNotIn('回测失败', out.getvalue())
+        return out.getvalue()
+
+    def read_rows(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_resume_after_interrupt(self):
+        self.run_command()
+        complete = self.read_rows()
+        self.assertEqual(len(complete), 12)
+
+        # 模拟中断：只保留前5期的结果
+        with open(self.output, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in complete[:5])
+        out = self.run_command()
+        self.assertIn('共 7 期待回测，已完成 5 期', out)
+        resumed = sorted(self.read_rows(), key=lambda row: row['draw_num'])
+        self.assertEqual(resumed, sorted(complete, key=lambda row: row['draw_num']))
+
+    def test_completed_run_is_skipped(self):
+        self.run_command()
+        out = self.run_command()
+        self.assertIn('共 0 期待回测，已完成 12 期', out)
+        self.assertEqual(len(self.read_rows()), 12)
+
+    def test_other_params_are_not_skipped(self):
+        """参数不同的结果不会被当作已完成，汇总时也不计入"""
+        self.run_command(tickets=3)
+        out = self.run_command(tickets=4)
+        self.assertIn('共 12 期待回测，已完成 0 期', out)
+        self.assertIn('共 12 期，每期 4 注', out)
+        rows = self.read_rows()
+        self.assertEqual(len(rows), 24)
+        self.assertEqual({row['params']['tickets'] for row in rows}, {3, 4})
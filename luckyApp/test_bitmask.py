@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .bitmask import hit_counts, mask_to_balls, popcount, red_mask, red_masks
+from .models import LotteryHistory, PredictionRecord
+from .testcases import LotteryTestCase, create_draws
+
+
+class BitmaskTests(SimpleTestCase):
+    """按位与后的 popcount 与集合交集的大小一致"""
+
+    def setUp(self):
+        rng = random.Random(16)
+        self.tickets = [sorted(rng.sample(range(1, 34), 6)) for _ in range(3000)]
+        self.tickets += [list(range(1, 7)), list(range(28, 34)), [1, 11, 12, 22, 23, 33]]
+
+    def test_masks(self):
+        masks = red_masks(self.tickets)
+        self.assertEqual(masks.dtype, np.uint64)
+        self.assertEqual(masks.tolist(), [red_mask(ticket) for ticket in self.tickets])
+        for ticket, mask in zip(self.tickets, masks):
+            self.assertEqual(mask_to_balls(mask), ticket)
+        self.assertEqual(red_mask([1]), 1)
+        self.assertEqual(red_mask([33]), 1 << 32)
+
+    def test_popcount(self):
+        values = np.concatenate([
+            [0, 1, 2 ** 33 - 1, 2 ** 63, 2 ** 64 - 1],
+            np.random.default_rng(2).integers(0, 2 ** 63, 1000, dtype=np.uint64)
+        ]).astype(np.uint64)
+        self.assertEqual(popcount(values).tolist(), [bin(int(value)).count('1') for value in values])
+        self.assertEqual(popcount(red_masks(self.tickets)).tolist(), [6] * len(self.tickets))
+
+    def test_hit_counts_match_set_intersection(self):
+        masks = red_masks(self.tickets)
+        for draw in self.tickets[:50:7] + [[2, 4, 6, 8, 10, 12]]:
+            with self.subTest(draw=draw):
+                expected = [len(set(ticket) & set(draw)) for ticket in self.tickets]
+                self.assertEqual(hit_counts(masks, red_mask(draw)).tolist(), expected)
+
+
+class StoredMaskTests(LotteryTestCase):
+
+    def test_masks_filled_on_save_and_bulk_create(self):
+        draws = create_draws(20)
+        for draw_num, red_balls, _ in draws:
+            self.assertEqual(LotteryHistory.objects.get(draw_num=draw_num).red_mask, red_mask(red_balls))
+
+        record = PredictionRecord(
+            draw_num='2024001', red_ball_1=3, red_ball_2=8, red_ball_3=15, red_ball_4=21, red_ball_5=27,
+            red_ball_6=33, blue_ball=9, prediction_type='random'
+        )
+        record.save()
+        record.refresh_from_db()
+        self.assertEqual(mask_to_balls(record.red_mask), [3, 8, 15, 21, 27, 33])
@@ -0,0 +1,170 @@
+import json
+import random
+from math import comb
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .bitmask import red_mask
+from .compound import grade_tickets, normalize_ticket, prize_odds, ticket_masks
+from .models import PredictionRecord
+from .testcases import brute_force_counts
+
+
+class PrizeCountsTests(SimpleTestCase):
+    """组合数计算的中奖注数与逐注展开的结果一致"""
+
+    def setUp(self):
+        self.rng = random.Random(20160103)
+
+    def random_draw(self):
+        return self.rng.sample(range(1, 34), 6), self.rng.randint(1, 16)
+
+    def assert_matches_brute_force(self, red_balls, blue_balls, banker_balls=()):
+        _, banker, drag, blue = normalize_ticket(red_balls, blue_balls, banker_balls)
+        red, banker_mask, blue_mask = ticket_masks(banker, drag, blue)
+        for _ in range(20):
+            draw_reds, draw_blue = self.random_draw()
+            # 保证高等级奖项也被覆盖：一半开奖号码从彩票的红球中抽取
+            if self.rng.random() < 0.5:
+                draw_reds = self.rng.sample(banker + drag, 6)
+            graded = grade_tickets([red], [banker_mask], [blue_mask], red_mask(draw_reds), draw_blue)
+            self.assertEqual(
+                graded['prize_counts'][0].tolist(),
+                brute_force_counts(banker, drag, blue, draw_reds, draw_blue)
+            )
+
+    def test_compound(self):
+        for red_count, blue_count in ((7, 1), (9, 2), (12, 3), (6, 4)):
+            with self.subTest(reds=red_count, blues=blue_count):
+                self.assert_matches_brute_force(
+                    self.rng.sample(range(1, 34), red_count), self.rng.sample(range(1, 17), blue_count)
+                )
+
+    def test_banker(self):
+        for banker_count, drag_count, blue_count in ((1, 7, 1), (2, 6, 2), (5, 4, 1), (3, 10, 2)):
+            with self.subTest(bankers=banker_count, drags=drag_count, blues=blue_count):
+                reds = self.rng.sample(range(1, 34), banker_count + drag_count)
+                self.assert_matches_brute_force(
+                    reds[banker_count:], self.rng.sample(range(1, 17), blue_count), reds[:banker_count]
+                )
+
+    def test_batch_matches_single_tickets(self):
+        """一次判定多张彩票与逐张判定结果相同"""
+        tickets = [
+            ticket_masks(*normalize_ticket(self.rng.sample(range(1, 34), 8), [1, 2])[1:])
+            for _ in range(5)
+        ] + [ticket_masks(*normalize_ticket(range(3, 11), [5], [1, 2])[1:])]
+        draw_reds, draw_blue = self.random_draw()
+        red, banker, blue = (list(column) for column in zip(*tickets))
+        batch = grade_tickets(red, banker, blue, red_mask(draw_reds), draw_blue)['prize_counts']
+        for index, ticket in enumerate(tickets):
+            single = grade_tickets([ticket[0]], [ticket[1]], [ticket[2]], red_mask(draw_reds), draw_blue)
+            np.testing.assert_array_equal(batch[index], single['prize_counts'][0])
+
+
+class PrizeOddsTests(SimpleTestCase):
+
+    def test_single_ticket_jackpot(self):
+        odds = prize_odds(0, 6, 1)
+        self.assertEqual(odds['ticket_count'], 1)
+        self.assertAlmostEqual(odds['probability'][0], 1 / 17721088, delta=1e-18)
+        self.assertAlmostEqual(odds['probability'][0], odds['expected'][0], delta=1e-18)
+
+    def test_single_ticket_any_prize(self):
+        """单式总中奖概率约为 6.71%"""
+        self.assertAlmostEqual(sum(prize_odds(0, 6, 1)['probability']), 0.0671, places=4)
+
+    def test_compound_expected_counts(self):
+        """复式各等级期望中奖注数等于注数乘以单注中奖概率"""
+        single = np.array(prize_odds(0, 6, 1)['probability'])
+        odds = prize_odds(0, 10, 3)
+        self.assertEqual(odds['ticket_count'], comb(10, 6) * 3)
+        np.testing.assert_allclose(odds['expected'], single * odds['ticket_count'])
+
+
+class TicketOddsTests(SimpleTestCase):
+
+    def get(self, **params):
+        return self.client.get(reverse('luckyApp:ticket_odds'), params)
+
+    def test_matches_prize_odds(self):
+        for params, counts in (
+            ({}, (0, 6, 1)),
+            ({'reds': 10, 'blues': 3}, (0, 10, 3)),
+            ({'reds': 9, 'blues': 2, 'bankers': 2}, (2, 7, 2)),
+        ):
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 200)
+                odds = prize_odds(*counts)
+                self.assertEqual(response.json()['ticket_count'], odds['ticket_count'])
+                self.assertEqual(
+                    [level['probability'] for level in response.json()['levels']], list(odds['probability'])
+                )
+
+    def test_rejects_invalid_counts(self):
+        for params in (
+            {'reds': 8, 'bankers': -1},
+            {'reds': 8, 'bankers': 8},
+            {'reds': 8, 'bankers': 6},
+            {'reds': 5},
+            {'reds': 21},
+            {'blues': 0},
+            {'blues': 17},
+            {'reds': 'a'},
+        ):
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class SavePredictionTests(TestCase):
+
+    def post(self, **data):
+        payload = {'draw_num': '2024001', 'prediction_type': 'random', **data}
+        return self.client.post(
+            reverse('luckyApp:save_prediction'), json.dumps(payload), content_type='application/json'
+        )
+
+    def test_saves_compound_and_banker(self):
+        response = self.post(red_balls=list(range(1, 9)), blue_balls=[3, 7])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ticket_type'], 'compound')
+        self.assertEqual(response.json()['ticket_count'], comb(8, 6) * 2)
+
+        response = self.post(banker_balls=[1, 2], red_balls=list(range(3, 10)), blue_balls=[5])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ticket_type'], 'banker')
+        self.assertEqual(response.json()['ticket_count'], comb(7, 4))
+
+        record = PredictionRecord.objects.get(ticket_type='banker')
+        self.assertEqual(record.banker_balls, [1, 2])
+        self.assertEqual(record.drag_balls, list(range(3, 10)))
+        self.assertEqual(record.blue_balls, [5])
+
+    def test_rejects_invalid_tickets(self):
+        invalid = {
+            'too few reds': {'red_balls': [1, 2, 3, 4, 5], 'blue_balls': [1]},
+            'too many reds': {'red_balls': list(range(1, 22)), 'blue_balls': [1]},
+            'red out of range': {'red_balls': [1, 2, 3, 4, 5, 34], 'blue_balls': [1]},
+            'blue out of range': {'red_balls': [1, 2, 3, 4, 5, 6], 'blue_balls': [17]},
+            'too many bankers': {'banker_balls': [1, 2, 3, 4, 5, 6], 'red_balls': [7, 8], 'blue_balls': [1]},
+            'banker too short': {'banker_balls': [1, 2], 'red_balls': [3, 4, 5, 6], 'blue_balls': [1]},
+            'not numbers': {'red_balls': ['a', 2, 3, 4, 5, 6], 'blue_balls': [1]},
+            'missing blue': {'red_balls': [1, 2, 3, 4, 5, 6]},
+        }
+        for name, data in invalid.items():
+            with self.subTest(name):
+                response = self.post(**data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+        self.assertFalse(PredictionRecord.objects.exists())
+
+    def test_rejects_duplicate_in_any_order(self):
+        self.assertEqual(self.post(red_balls=list(range(1, 9)), blue_balls=[3, 7]).status_code, 200)
+        response = self.post(red_balls=list(range(8, 0, -1)), blue_balls=[7, 3])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PredictionRecord.objects.count(), 1)
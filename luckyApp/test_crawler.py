@@ -0,0 +1,374 @@
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .benchmarks.datasets import synthetic_year_page
+from .bitmask import red_mask
+from .crawler import LotteryCrawler, RateLimiter, next_draw_date
+from .models import LotteryHistory
+from .predictor import _snapshot_cache
+from .testcases import LotteryTestCase
+
+
+class YearPageHandler(BaseHTTPRequestHandler):
+    """按 kj_year 参数返回合成的年度页面，记录并发数和请求时间"""
+
+    def do_GET(self):
+        server = self.server
+        year = int(parse_qs(urlparse(self.path).query)['kj_year'][0])
+        with server.lock:
+            server.requests.append((year, time.monotonic()))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            failing = server.failures.get(year, 0)
+            if failing:
+                server.failures[year] = failing - 1
+        try:
+            time.sleep(server.delay)
+            if failing or year not in server.pages:
+                self.send_response(503 if failing else 404)
+                self.end_headers()
+                return
+            body = server.pages[year].encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CrawlerServerTestCase(LotteryTestCase):
+    """在本机启动年度页面服务，爬虫请求它而不访问外部网络"""
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), YearPageHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = self.server.max_active = 0
+        self.server.failures = {}
+        self.server.delay = 0
+        self.server.pages = {}
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def serve_years(self, years, count=20):
+        for year in years:
+            self.server.pages[year] = synthetic_year_page(year, count, seed=year)
+
+    def make_crawler(self, **kwargs):
+        kwargs = {'min_interval': 0, 'backoff': 0, **kwargs}
+        crawler = LotteryCrawler(**kwargs)
+        crawler.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/ssq.jsp'
+        return crawler
+
+    def requested_years(self):
+        return [year for year, _ in self.server.requests]
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def test_spacing_across_threads(self):
+        limiter = RateLimiter(0.05)
+        starts = []
+        lock = threading.Lock()
+
+        def request():
+            limiter.wait()
+            with lock:
+                starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        starts.sort()
+        self.assertEqual(len(starts), 6)
+        self.assertTrue(all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:])))
+
+    def test_no_wait_after_idle(self):
+        limiter = RateLimiter(0.05)
+        limiter.wait()
+        time.sleep(0.06)
+        start = time.monotonic()
+        limiter.wait()
+        self.assertLess(time.monotonic() - start, 0.03)
+
+
+class ConcurrentCrawlTests(CrawlerServerTestCase):
+    """并发下载年度页面：并发数受 workers 限制，超时和 5xx 按配置重试，失败的年份单独列出"""
+
+    def test_downloads_years_concurrently(self):
+        years = range(2010, 2016)
+        self.serve_years(years)
+        self.server.delay = 0.2
+        start = time.monotonic()
+        stats = self.make_crawler().crawl_history(2010, 2015, workers=3)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(self.server.max_active, 3)
+        self.assertLess(elapsed, 0.2 * len(years) - 0.3)
+        self.assertEqual(sorted(self.requested_years()), list(years))
+        self.assertEqual(stats['years'], 6)
+        self.assertEqual(stats['failed'], [])
+        self.assertEqual(stats['inserted'], 120)
+        self.assertEqual(LotteryHistory.objects.count(), 120)
+        self.assertEqual(LotteryHistory.objects.filter(draw_num__startswith='2013').count(), 20)
+
+    def test_rate_limit_shared_by_workers(self):
+        self.serve_years(range(2010, 2015))
+        self.make_crawler(min_interval=0.1).crawl_history(2010, 2014, workers=4)
+        times = sorted(moment for _, moment in self.server.requests)
+        self.assertEqual(len(times), 5)
+        self.assertTrue(all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:])))
+
+    def test_retries_server_errors(self):
+        self.serve_years([2010])
+        self.server.failures[2010] = 2
+        crawler = self.make_crawler(retries=2)
+        self.assertIsNotNone(crawler.get_html(crawler.year_url(2010)))
+        self.assertEqual(self.requested_years(), [2010] * 3)
+
+    def test_gives_up_after_retries(self):
+        self.serve_years([2010, 2011])
+        self.server.failures[2011] = 3
+        with self.assertLogs('luckyApp.crawler', 'WARNING'):
+            stats = self.make_crawler(retries=1).crawl_history(2010, 2012, workers=2)
+        self.assertEqual(stats['failed'], [2011, 2012])
+        self.assertEqual(stats['years'], 1)
+        self.assertEqual(self.requested_years().count(2011), 2)
+        # 404 不重试
+        self.assertEqual(self.requested_years().count(2012), 1)
+        self.assertEqual(LotteryHistory.objects.count(), 20)
+
+    def test_timeout(self):
+        self.serve_years([2010])
+        self.server.delay = 1
+        crawler = self.make_crawler(timeout=0.1, retries=0)
+        start = time.monotonic()
+        with self.assertLogs('luckyApp.crawler', 'ERROR'):
+            self.assertIsNone(crawler.get_html(crawler.year_url(2010)))
+        self.assertLess(time.monotonic() - start, 0.8)
+
+
+def schedule(year, until=None, skip=()):
+    """按每周二、四、日的开奖日程生成某年的 {期号: 开奖日期}，截止到 until（含），skip 中的序号不入库"""
+    stored = {}
+    day, number = next_draw_date(date(year - 1, 12, 31)), 1
+    while day.year == year and (until is None or day <= until):
+        if number not in skip:
+            stored[f'{year}{number:03d}'] = day
+        day, number = next_draw_date(day), number + 1
+    return stored
+
+
+class MissingYearsTests(SimpleTestCase):
+    """按已入库的期号和开奖日程判断需要抓取的年份"""
+
+    def setUp(self):
+        self.crawler = LotteryCrawler()
+
+    def missing(self, stored, now, start_year=2021):
+        return self.crawler.missing_years(start_year, stored, now)
+
+    def test_empty_database(self):
+        self.assertEqual(self.missing({}, datetime(2023, 6, 1)), [2021, 2022, 2023])
+        # 2024-01-01 是周一，当年第一个开奖日之前还没有开奖
+        self.assertEqual(self.missing({}, datetime(2024, 1, 1, 22), start_year=2022), [2022, 2023])
+        self.assertEqual(self.missing({}, datetime(2024, 1, 2, 22), start_year=2022), [2022, 2023, 2024])
+
+    def test_complete_history(self):
+        stored = {**schedule(2021), **schedule(2022), **schedule(2023, until=date(2023, 6, 1))}
+        self.assertEqual(self.missing(stored, datetime(2023, 6, 1, 22)), [])
+        # 下一个开奖日（6月4日周日）21:30 之后才需要抓取
+        self.assertEqual(self.missing(stored, datetime(2023, 6, 4, 21, 29)), [])
+        self.assertEqual(self.missing(stored, datetime(2023, 6, 4, 21, 30)), [2023])
+
+    def test_gaps(self):
+        stored = {
+            **schedule(2021, skip={50}),
+            **{draw_num: day for draw_num, day in schedule(2022).items() if draw_num != '2022001'},
+            **schedule(2023, until=date(2023, 6, 1))
+        }
+        self.assertEqual(self.missing(stored, datetime(2023, 6, 1, 22)), [2021, 2022])
+
+    def test_year_end(self):
+        # 2023-12-31 是周日，之后的开奖日是 2024-01-02（周二）
+        last_sunday = datetime(2023, 12, 31)
+        stored = {**schedule(2022), **schedule(2023, until=date(2023, 12, 28))}
+        self.assertEqual(self.missing(stored, last_sunday.replace(hour=20), 2022), [])
+        self.assertEqual(self.missing(stored, last_sunday.replace(hour=22), 2022), [2023])
+        # 跨年后仍未抓取到年底最后一期：上一年也需要抓取，当年还没有开奖
+        self.assertEqual(self.missing(stored, datetime(2024, 1, 1, 12), 2022), [2023])
+
+        stored.update(schedule(2023))
+        self.assertEqual(self.missing(stored, datetime(2024, 1, 1, 12), 2022), [])
+        self.assertEqual(self.missing(stored, datetime(2024, 1, 2, 21), 2022), [])
+        self.assertEqual(self.missing(stored, datetime(2024, 1, 2, 22), 2022), [2024])
+
+    def test_only_latest_years_follow_schedule(self):
+        """往年期号从1起连续即视为完整，不按开奖日程检查年底的期次"""
+        stored = {**schedule(2021, until=date(2021, 12, 1)), **schedule(2022), **schedule(2023, until=date(2023, 6, 1))}
+        self.assertEqual(self.missing(stored, datetime(2023, 6, 1, 22)), [])
+
+
+class SyncTests(CrawlerServerTestCase):
+
+    def test_fetches_only_missing_years_and_draws(self):
+        self.serve_years([2014, 2015])
+        self.server.pages[2016] = synthetic_year_page(2016, 75, seed=2016)
+        pages = {year: LotteryCrawler().parse_page(html) for year, html in self.server.pages.items()}
+        crawler = self.make_crawler()
+        crawler.save_to_db(
+            pages[2014] + [data for data in pages[2015] if data['draw_num'] != '2015005'] + pages[2016][:70]
+        )
+
+        now = datetime.combine(pages[2016][-1]['draw_date'] + timedelta(days=1), datetime.min.time())
+
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now
+
+        with mock.patch('luckyApp.crawler.datetime', FixedDatetime):
+            stats = crawler.sync(2014)
+            self.assertEqual(sorted(self.requested_years()), [2015, 2016])
+            self.assertEqual(stats['inserted'], 6)
+            self.assertEqual(stats['unchanged'], 0)
+            self.assertEqual(LotteryHistory.objects.count(), 20 + 20 + 75)
+
+            # 数据完整时不发出请求
+            self.server.requests.clear()
+            self.assertEqual(crawler.sync(2014)['years'], 0)
+            self.assertEqual(self.server.requests, [])
+
+
+class SaveToDbTests(LotteryTestCase):
+    """按期号批量插入或更新开奖数据，返回新增、更新、未变化的期数"""
+
+    def setUp(self):
+        super().setUp()
+        self.crawler = LotteryCrawler()
+        rng = random.Random(24)
+        self.data = [
+            {
+                'draw_num': f'2023{index + 1:03d}',
+                'red_balls': sorted(rng.sample(range(1, 34), 6)),
+                'blue_ball': rng.randint(1, 16),
+                'draw_date': date(2023, 1, 1) + timedelta(days=index * 3)
+            }
+            for index in range(25)
+        ]
+
+    def assert_stored(self, data):
+        stored = {record.draw_num: record for record in LotteryHistory.objects.all()}
+        self.assertEqual(len(stored), len(data))
+        for draw in data:
+            record = stored[draw['draw_num']]
+            self.assertEqual(record.red_balls, draw['red_balls'])
+            self.assertEqual(record.blue_ball, draw['blue_ball'])
+            self.assertEqual(record.draw_date, draw['draw_date'])
+            self.assertEqual(record.red_mask, red_mask(draw['red_balls']))
+
+    def test_insert_then_unchanged(self):
+        self.assertEqual(
+            self.crawler.save_to_db(self.data, batch_size=10), {'inserted': 25, 'updated': 0, 'unchanged': 0}
+        )
+        self.assert_stored(self.data)
+        self.assertEqual(
+            self.crawler.save_to_db(self.data, batch_size=10), {'inserted': 0, 'updated': 0, 'unchanged': 25}
+        )
+
+    def test_mixed_insert_update_unchanged(self):
+        self.crawler.save_to_db(self.data[:20])
+        changed = [dict(draw) for draw in self.data]
+        changed[3]['blue_ball'] = changed[3]['blue_ball'] % 16 + 1
+        changed[7]['red_balls'] = [1, 2, 3, 4, 5, 6] if changed[7]['red_balls'] != [1, 2, 3, 4, 5, 6] \
+            else [28, 29, 30, 31, 32, 33]
+        changed[12]['draw_date'] += timedelta(days=1)
+
+        self.assertEqual(
+            self.crawler.save_to_db(changed, batch_size=7), {'inserted': 5, 'updated': 3, 'unchanged': 17}
+        )
+        self.assert_stored(changed)
+
+    def test_duplicate_draw_num_keeps_last(self):
+        duplicate = dict(self.data[0], blue_ball=self.data[0]['blue_ball'] % 16 + 1)
+        self.assertEqual(
+            self.crawler.save_to_db([self.data[0], duplicate]), {'inserted': 1, 'updated': 0, 'unchanged': 0}
+        )
+        self.assert_stored([duplicate])
+
+    def test_single_dict(self):
+        self.assertEqual(self.crawler.save_to_db(self.data[0]), {'inserted': 1, 'updated': 0, 'unchanged': 0})
+        self.assert_stored(self.data[:1])
+
+    def test_update_invalidates_snapshot(self):
+        """只有已有记录被修改时才清除分析快照缓存"""
+        self.crawler.save_to_db(self.data[:10])
+        _snapshot_cache['snapshot'] = object()
+        self.crawler.save_to_db(self.data)
+        self.assertIn('snapshot', _snapshot_cache)
+
+        changed = dict(self.data[0], blue_ball=self.data[0]['blue_ball'] % 16 + 1)
+        self.crawler.save_to_db([changed])
+        self.assertNotIn('snapshot', _snapshot_cache)
+
+    def test_failure_rolls_back_and_raises(self):
+        invalid = dict(self.data[0], draw_date=None)
+        with self.assertLogs('luckyApp.crawler', 'ERROR'), self.assertRaises(IntegrityError):
+            self.crawler.save_to_db([self.data[1], invalid])
+        self.assertFalse(LotteryHistory.objects.exists())
+
+
+class SaveFailureTests(CrawlerServerTestCase):
+    """保存失败的年份列入 failed，最新一期保存失败时不返回未入库的数据"""
+
+    def test_failed_year_is_reported(self):
+        self.serve_years([2010, 2011, 2012])
+        crawler = self.make_crawler()
+        save_to_db = crawler.save_to_db
+
+        def failing_save(lottery_data):
+            if lottery_data[0]['draw_num'].startswith('2011'):
+                raise IntegrityError('写入失败')
+            return save_to_db(lottery_data)
+
+        with mock.patch.object(crawler, 'save_to_db', side_effect=failing_save), \
+                self.assertLogs('luckyApp.crawler', 'WARNING'):
+            stats = crawler.crawl_history(2010, 2012, workers=2)
+        self.assertEqual(stats['failed'], [2011])
+        self.assertEqual(stats['years'], 2)
+        self.assertEqual(stats['inserted'], 40)
+        self.assertFalse(LotteryHistory.objects.filter(draw_num__startswith='2011').exists())
+
+    def test_crawl_latest_raises(self):
+        year = datetime.now().year
+        self.serve_years([year - 1, year])
+        crawler = self.make_crawler()
+        with mock.patch.object(crawler, 'save_to_db', side_effect=IntegrityError('写入失败')):
+            with self.assertRaises(IntegrityError):
+                crawler.crawl_latest()
+            with mock.patch('luckyApp.views.LotteryCrawler', return_value=crawler):
+                response = self.client.post(reverse('luckyApp:update_data'))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertFalse(LotteryHistory.objects.exists())
@@ -0,0 +1,90 @@
+import random
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from .frequency_index import FrequencyIndex
+from .history_store import DrawMatrix
+from .predictor import MultiDimensionalAnalyzer
+from .testcases import LotteryTestCase, create_draws
+
+
+def direct_counts(rows):
+    """逐期计数（对照实现）"""
+    red, blue, zones = Counter(), Counter(), Counter()
+    for _, *red_balls, blue_ball in rows:
+        red.update(red_balls)
+        blue[blue_ball] += 1
+        zones[(
+            sum(1 for ball in red_balls if ball <= 11),
+            sum(1 for ball in red_balls if 12 <= ball <= 22),
+            sum(1 for ball in red_balls if ball >= 23)
+        )] += 1
+    return red, blue, zones
+
+
+class FrequencyIndexTests(SimpleTestCase):
+    """前缀和得到的任意窗口统计与直接逐期计数一致"""
+
+    def setUp(self):
+        rng = random.Random(13)
+        self.rows = [
+            (2003001 + index, *sorted(rng.sample(range(1, 34), 6)), rng.randint(1, 16)) for index in range(200)
+        ]
+        self.index = FrequencyIndex(DrawMatrix.from_rows(self.rows))
+
+    def test_counts_match_direct_counts(self):
+        for window, end in [(None, None), (10, None), (30, None), (1, 1), (50, 120), (500, 60), (30, 0), (None, 999)]:
+            with self.subTest(window=window, end=end):
+                start, stop = self.index.bounds(window, end)
+                rows = self.rows[start:stop]
+                if window is not None and end is None:
+                    self.assertEqual(rows, self.rows[-window:])
+                red, blue, zones = direct_counts(rows)
+
+                stats = self.index.window_stats(window, end)
+                self.assertEqual(stats['periods'], len(rows))
+                self.assertEqual(stats['red_count'], {num: red[num] for num in range(1, 34)})
+                self.assertEqual(stats['blue_count'], {num: blue[num] for num in range(1, 17)})
+                self.assertEqual(stats['zone_freq'], dict(zones))
+                self.assertEqual(
+                    stats['zone_ball_count'],
+                    [sum(red[num] for num in range(lo, hi + 1)) for lo, hi in ((1, 11), (12, 22), (23, 33))]
+                )
+                self.assertEqual(stats['start_draw'], str(rows[0][0]) if rows else None)
+                self.assertEqual(stats['end_draw'], str(rows[-1][0]) if rows else None)
+
+    def test_hot_threshold(self):
+        stats = self.index.window_stats(30)
+        self.assertEqual(stats['red_hot'], [num for num, count in stats['red_count'].items() if count >= 3])
+        self.assertEqual(stats['red_cold'], [num for num, count in stats['red_count'].items() if count == 0])
+        self.assertEqual(len(stats['red_hot']) + len(stats['red_warm']) + len(stats['red_cold']), 33)
+        stats = self.index.window_stats(100)
+        self.assertEqual(stats['red_hot'], [num for num, count in stats['red_count'].items() if count >= 10])
+        stats = self.index.window_stats(30, hot_threshold=5)
+        self.assertEqual(stats['red_hot'], [num for num, count in stats['red_count'].items() if count >= 5])
+
+
+class AnalyzeWindowTests(LotteryTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_draws(80)
+
+    def test_matches_hot_cold_analysis(self):
+        """30期窗口与冷热号分析的统计口径一致"""
+        analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+        hot_cold = analyzer.analyze_hot_cold()
+        stats = analyzer.analyze_window(30)
+        for key in ('red_hot', 'red_warm', 'red_cold', 'red_count'):
+            self.assertEqual(stats[key], hot_cold[key], msg=key)
+        self.assertEqual({num: count for num, count in stats['blue_count'].items() if count}, hot_cold['blue_count'])
+
+    def test_window_stats_view(self):
+        response = self.client.get('/api/window-stats/', {'window': ['10', 'all']})
+        self.assertEqual(response.status_code, 200)
+        windows = response.json()['windows']
+        self.assertEqual(windows['10']['periods'], 10)
+        self.assertEqual(windows['all']['periods'], 80)
+        self.assertEqual(sum(windows['all']['zone_freq'].values()), 80)
+        self.assertEqual(self.client.get('/api/window-stats/', {'window': '0'}).status_code, 400)
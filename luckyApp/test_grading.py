@@ -0,0 +1,132 @@
+import copy
+import random
+
+from django.test import SimpleTestCase
+
+from .models import LotteryHistory, PredictionRecord
+from .predictor import LotteryPredictor, MultiDimensionalAnalyzer
+from .testcases import LotteryTestCase, brute_force_counts, create_draws
+
+
+def weight_feedback(analyzer):
+    return analyzer.weights, analyzer.dimension_history, analyzer.dimension_performance
+
+
+class RecordPredictionResultsTests(SimpleTestCase):
+    """record_prediction_results 与逐条调用 record_prediction_result 等价"""
+
+    def setUp(self):
+        self.rng = random.Random(17)
+        self.analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+
+    def random_feedback(self, count, hit_rate=0.3):
+        names = list(self.analyzer.dimension_history)
+        scores = {name: [self.rng.uniform(0, 100) for _ in range(count)] for name in names}
+        return scores, [self.rng.random() < hit_rate for _ in range(count)]
+
+    def assert_equivalent(self, scores, is_hit):
+        sequential = copy.deepcopy(self.analyzer)
+        for row, hit in enumerate(is_hit):
+            sequential.record_prediction_result({name: column[row] for name, column in scores.items()}, hit)
+        self.analyzer.record_prediction_results(scores, is_hit)
+
+        expected_weights, expected_history, expected_performance = weight_feedback(sequential)
+        weights, history, performance = weight_feedback(self.analyzer)
+        self.assertEqual(history, expected_history)
+        for name, weight in expected_weights.items():
+            self.assertAlmostEqual(weights[name], weight, places=12, msg=name)
+        for name, value in expected_performance.items():
+            self.assertAlmostEqual(performance[name], value, places=9, msg=name)
+
+    def test_from_empty_history(self):
+        self.assert_equivalent(*self.random_feedback(200))
+
+    def test_below_adjust_threshold(self):
+        """不足10条记录时不调整权重"""
+        weights = dict(self.analyzer.weights)
+        self.assert_equivalent(*self.random_feedback(9))
+        self.assertEqual(self.analyzer.weights, weights)
+
+    def test_existing_full_window(self):
+        """已有50条历史时，每条新记录都会挤出最早的一条"""
+        self.assert_equivalent(*self.random_feedback(60))
+        self.assert_equivalent(*self.random_feedback(75, hit_rate=0.7))
+
+    def test_all_hits_or_misses(self):
+        self.assert_equivalent(*self.random_feedback(30, hit_rate=0))
+        self.assert_equivalent(*self.random_feedback(30, hit_rate=1))
+
+
+class GradePredictionsTests(LotteryTestCase):
+    """批量判定与反馈的结果和逐条判定、逐条反馈相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_draws(150)
+        cls.actual = LotteryHistory.objects.latest('draw_num')
+        rng = random.Random(2024)
+        records = []
+        for _ in range(400):
+            # 大部分号码从开奖号码附近抽取，保证各等级都有命中
+            reds = set(rng.sample(cls.actual.red_balls, rng.randint(0, 6)))
+            while len(reds) < 6:
+                reds.add(rng.randint(1, 33))
+            blue = cls.actual.blue_ball if rng.random() < 0.2 else rng.randint(1, 16)
+            records.append(PredictionRecord.from_ticket(
+                cls.actual.draw_num, sorted(reds), [blue], prediction_type='analysis'
+            ))
+        records += [
+            PredictionRecord.from_ticket(cls.actual.draw_num, list(range(1, 11)), [1, 2], prediction_type='random'),
+            PredictionRecord.from_ticket(
+                cls.actual.draw_num, rng.sample(range(1, 34), 8), [cls.actual.blue_ball],
+                cls.actual.red_balls[:2], prediction_type='analysis'
+            ),
+        ]
+        PredictionRecord.objects.bulk_create(records)
+
+    def sequential_grade(self, analyzer):
+        """逐条展开判定，单式号码逐条计算得分并反馈"""
+        actual = self.actual
+        grades = {}
+        for record in PredictionRecord.objects.filter(draw_num=actual.draw_num).order_by('-created_at', '-id'):
+            counts = brute_force_counts(
+                record.banker_balls, record.drag_balls, record.blue_balls, actual.red_balls, actual.blue_ball
+            )
+            is_hit = any(counts[1:])
+            grades[record.id] = (
+                len(set(record.all_red_balls) & set(actual.red_balls)),
+                len(set(record.banker_balls) & set(actual.red_balls)),
+                actual.blue_ball in record.blue_balls,
+                is_hit
+            )
+            if record.ticket_type == 'single':
+                scores = analyzer.calculate_comprehensive_score(record.red_balls, record.blue_ball)
+                analyzer.record_prediction_result(scores['detailed_scores'], is_hit)
+        return grades
+
+    def test_matches_sequential(self):
+        expected_analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+        initial_weights = dict(expected_analyzer.weights)
+        expected = self.sequential_grade(expected_analyzer)
+        self.assertNotEqual(expected_analyzer.weights, initial_weights)
+
+        predictor = LotteryPredictor(MultiDimensionalAnalyzer(restore_weights=False))
+        predictions = PredictionRecord.objects.filter(draw_num=self.actual.draw_num)
+        predictor._grade_predictions(self.actual.draw_num, self.actual, predictions, chunk_size=64)
+
+        stored = {
+            row[0]: row[1:]
+            for row in predictions.values_list('id', 'hit_count', 'banker_hit_count', 'blue_hit', 'is_hit')
+        }
+        self.assertEqual(stored, expected)
+        self.assertTrue(any(grade[3] for grade in expected.values()))
+
+        weights, history, _ = weight_feedback(predictor.analyzer)
+        expected_weights, expected_history, _ = weight_feedback(expected_analyzer)
+        self.assertEqual(history.keys(), expected_history.keys())
+        for name, entries in expected_history.items():
+            self.assertEqual([entry['is_hit'] for entry in history[name]], [entry['is_hit'] for entry in entries])
+            for entry, expected_entry in zip(history[name], entries):
+                self.assertAlmostEqual(entry['score'], expected_entry['score'], places=9)
+        for name, weight in expected_weights.items():
+            self.assertAlmostEqual(weights[name], weight, places=9, msg=name)
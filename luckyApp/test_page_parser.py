@@ -0,0 +1,89 @@
+from datetime import datetime
+from unittest import skipUnless
+
+import bs4
+from django.test import SimpleTestCase, override_settings
+
+from .benchmarks.datasets import synthetic_year_page
+from .crawler import LotteryCrawler
+from .page_parser import available_backends, extract_draws, get_backend
+
+# 真实页面中出现过的写法：多个 class、单元格内有空白、期号没有链接、XML 编码声明、"模拟选号"之后还有行
+EDGE_CASE_PAGE = """<?xml version="1.0" encoding="utf-8"?>
+<html><head><meta charset="utf-8"></head><body>
+<table>
+<tr class="hgt odd">
+  <td class="qh7 first"><a title="开奖日期：2016-01-03" href="#"> 2016001 </a></td>
+  <td class="hui">1</td><td class="redqiu">03</td><td class="redqiu hot"> 09 </td><td class="redqiu">17</td>
+  <td class="redqiu">22</td><td class="redqiu">23</td><td class="redqiu">33</td>
+  <td class="blueqiu3">10</td><td class="blueqiu3">11</td>
+</tr>
+<tr class="hgt">
+  <td class="qh7">2016002</td>
+  <td class="redqiu">01</td><td class="redqiu">02</td><td class="redqiu">03</td>
+  <td class="redqiu">04</td><td class="redqiu">05</td><td class="redqiu">06</td><td class="blueqiu3">16</td>
+</tr>
+<tr class="hgt"><td class="qh7">模拟选号</td><td class="redqiu">01</td></tr>
+<tr class="hgt">
+  <td class="qh7">2016003</td><td class="redqiu">01</td><td class="blueqiu3">01</td>
+</tr>
+</table>
+</body></html>
+"""
+
+
+def legacy_parse(html):
+    """原来的解析流程：BeautifulSoup 整页建树后逐行解析"""
+    crawler = LotteryCrawler(parser='html.parser')
+    return crawler.parse_data(bs4.BeautifulSoup(html, 'html.parser').find_all(class_='hgt'))
+
+
+class PageParserTests(SimpleTestCase):
+    """各解析后端的结果与原来的 BeautifulSoup 解析逐行一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        pages = (synthetic_year_page(2016), synthetic_year_page(2003, 89, seed=3), EDGE_CASE_PAGE)
+        cls.pages = [(html, legacy_parse(html)) for html in pages]
+
+    def assert_backend_matches(self, backend):
+        for html, expected in self.pages:
+            parsed = LotteryCrawler(parser=backend).parse_page(html)
+            self.assertEqual(len(parsed), len(expected))
+            for row, expected_row in zip(parsed, expected):
+                self.assertEqual(row, expected_row)
+
+    @skipUnless('selectolax' in available_backends(), '未安装 selectolax')
+    def test_selectolax(self):
+        self.assert_backend_matches('selectolax')
+
+    @skipUnless('lxml' in available_backends(), '未安装 lxml')
+    def test_lxml(self):
+        self.assert_backend_matches('lxml')
+
+    def test_html_parser(self):
+        self.assert_backend_matches('html.parser')
+
+    def test_edge_case_page(self):
+        draws = extract_draws(EDGE_CASE_PAGE, 'html.parser')
+        self.assertEqual([draw[0] for draw in draws], ['2016001', '2016002'])
+        self.assertEqual(draws[0][1:3], ((3, 9, 17, 22, 23, 33), 10))
+        self.assertEqual(draws[0][3], datetime(2016, 1, 3).date())
+        # 没有开奖日期时用当天
+        self.assertEqual(draws[1][3], datetime.now().date())
+
+    def test_synthetic_page(self):
+        draws = extract_draws(synthetic_year_page(2016), 'html.parser')
+        self.assertEqual(len(draws), 154)
+        self.assertEqual(draws[0][0], '2016001')
+        self.assertEqual(draws[0][3].weekday(), 6)
+        self.assertTrue(all(len(red) == 6 and list(red) == sorted(red) for _, red, _, _ in draws))
+
+    def test_backend_selection(self):
+        self.assertEqual(get_backend(), available_backends()[0])
+        self.assertEqual(get_backend('html.parser'), 'html.parser')
+        with override_settings(LUCKY_HTML_PARSER='html.parser'):
+            self.assertEqual(get_backend(), 'html.parser')
+        with self.assertRaises(ValueError):
+            get_backend('html5lib')
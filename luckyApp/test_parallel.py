@@ -0,0 +1,60 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from .parallel import generate_tickets_parallel
+from .predictor import LotteryPredictor, MultiDimensionalAnalyzer
+from .sampler import TicketSampler
+from .testcases import LotteryTestCase, create_draws
+
+
+class GenerateTicketsParallelTests(SimpleTestCase):
+    """同一种子的结果与进程数无关"""
+
+    def setUp(self):
+        totals = np.random.default_rng(7).integers(1, 100, 3000).astype(np.float64)
+        self.context = {
+            'sampler': TicketSampler(totals, min_score=30),
+            'blue_probabilities': np.full(16, 1 / 16)
+        }
+
+    def generate(self, count, workers, seed=42, chunk_size=700):
+        return generate_tickets_parallel(self.context, count, workers=workers, seed=seed, chunk_size=chunk_size)
+
+    def test_independent_of_worker_count(self):
+        # 批次之间有重复号码，需要多轮补抽
+        expected = self.generate(5000, workers=1)
+        for workers in (2, 3):
+            with self.subTest(workers=workers):
+                np.testing.assert_array_equal(self.generate(5000, workers=workers), expected)
+
+    def test_unique_and_eligible(self):
+        tickets = self.generate(8000, workers=1)
+        self.assertEqual(len(tickets), 8000)
+        self.assertEqual(len(np.unique(tickets)), 8000)
+        ranks, blues = np.divmod(tickets, 16)
+        self.assertTrue(np.isin(ranks, self.context['sampler'].members).all())
+        self.assertTrue(((blues >= 0) & (blues < 16)).all())
+
+    def test_seed_changes_output(self):
+        self.assertFalse(np.array_equal(self.generate(1000, workers=1, seed=1), self.generate(1000, workers=1, seed=2)))
+
+    def test_rejects_more_tickets_than_available(self):
+        with self.assertRaises(ValueError):
+            self.generate(self.context['sampler'].support * 16 + 1, workers=1)
+
+
+class PredictParallelTests(LotteryTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_draws(120)
+
+    def test_independent_of_worker_count(self):
+        predictor = LotteryPredictor(MultiDimensionalAnalyzer(restore_weights=False))
+        single = predictor.predict_parallel(3000, workers=1, seed=9, chunk_size=1000)
+        multi = predictor.predict_parallel(3000, workers=2, seed=9, chunk_size=1000)
+        for key in ('red_balls', 'blue_balls', 'scores'):
+            np.testing.assert_array_equal(single[key], multi[key], err_msg=key)
+        tickets = np.column_stack((single['red_balls'], single['blue_balls']))
+        self.assertEqual(len(np.unique(tickets, axis=0)), 3000)
+        self.assertTrue((single['scores'] >= single['min_score']).all())
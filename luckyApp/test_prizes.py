@@ -0,0 +1,66 @@
+import itertools
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .models import PredictionRecord
+from .prizes import (
+    PRIZE_AMOUNTS, PRIZE_LEVELS, PRIZE_NAMES, PRIZE_SLOTS, prize_amount, prize_amounts, prize_distribution,
+    prize_level, prize_levels
+)
+
+OUTCOMES = list(itertools.product(range(7), (False, True)))
+
+
+def branch_prize_level(red_hits, blue_hit):
+    """原 LotteryPredictor._get_prize_level 的逐条件判断（对照实现）"""
+    if red_hits == 6 and blue_hit:
+        return 1
+    elif red_hits == 6 and not blue_hit:
+        return 2
+    elif red_hits == 5 and blue_hit:
+        return 3
+    elif (red_hits == 5 and not blue_hit) or (red_hits == 4 and blue_hit):
+        return 4
+    elif (red_hits == 4 and not blue_hit) or (red_hits == 3 and blue_hit):
+        return 5
+    elif red_hits <= 2 and blue_hit:
+        return 6
+    else:
+        return None
+
+
+class PrizeTableTests(SimpleTestCase):
+    """查表判定与原来的条件分支在全部命中组合上一致"""
+
+    def test_prize_level_matches_branches(self):
+        for red_hits, blue_hit in OUTCOMES:
+            with self.subTest(red_hits=red_hits, blue_hit=blue_hit):
+                self.assertEqual(prize_level(red_hits, blue_hit), branch_prize_level(red_hits, blue_hit))
+                self.assertEqual(prize_level(np.int64(red_hits), np.bool_(blue_hit)), prize_level(red_hits, blue_hit))
+
+    def test_prize_levels_matches_branches(self):
+        red_hits, blue_hits = zip(*(OUTCOMES * 3))
+        self.assertEqual(
+            prize_levels(red_hits, blue_hits).tolist(),
+            [branch_prize_level(red, blue) or 0 for red, blue in zip(red_hits, blue_hits)]
+        )
+        self.assertEqual(prize_levels(np.array([6, 0]), np.array([1, 0])).tolist(), [1, 0])
+
+    def test_hit_prize_level_of_single_ticket(self):
+        for red_hits, blue_hit in OUTCOMES:
+            level = branch_prize_level(red_hits, blue_hit)
+            record = PredictionRecord(hit_count=red_hits, blue_hit=blue_hit, is_hit=level is not None)
+            self.assertEqual(record.hit_prize_level, level)
+
+    def test_amounts_and_distribution(self):
+        self.assertEqual(len(PRIZE_NAMES), PRIZE_SLOTS)
+        self.assertEqual(len(PRIZE_AMOUNTS), PRIZE_SLOTS)
+        self.assertEqual(prize_amount(None), 0)
+        self.assertEqual(prize_amount(6), 5)
+        self.assertEqual(prize_amounts([0, 3, 5]).tolist(), [0, 3000, 10])
+        self.assertEqual(prize_distribution([0, 6, 6, 1]).tolist(), [1, 1, 0, 0, 0, 0, 2])
+
+    def test_table_is_read_only(self):
+        with self.assertRaises(ValueError):
+            PRIZE_LEVELS[0, 0] = 1
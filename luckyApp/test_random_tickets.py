@@ -0,0 +1,80 @@
+import itertools
+from math import comb
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .models import PredictionRecord
+from .random_tickets import TICKET_COUNT, RandomTicketGenerator, save_predictions
+from .testcases import LotteryTestCase
+
+
+def lexicographic_rank(red):
+    """升序红球组合在 itertools.combinations(range(1, 34), 6) 中的序号（逐位计数的对照实现）"""
+    rank, previous = 0, 0
+    for position, ball in enumerate(red):
+        remaining = 6 - position - 1
+        rank += sum(comb(33 - smaller, remaining) for smaller in range(previous + 1, ball))
+        previous = ball
+    return rank
+
+
+def ticket_ids(red_balls, blue_balls):
+    """按红球组合序号和蓝球重新编码"""
+    return [lexicographic_rank(red) * 16 + blue - 1 for red, blue in zip(red_balls.tolist(), blue_balls.tolist())]
+
+
+class RandomTicketGeneratorTests(SimpleTestCase):
+
+    def test_reference_rank(self):
+        combos = itertools.islice(itertools.combinations(range(1, 34), 6), 0, None, 9973)
+        for rank, combo in zip(itertools.count(0, 9973), combos):
+            self.assertEqual(lexicographic_rank(combo), rank)
+
+    def test_decode_matches_lexicographic_order(self):
+        ids = np.concatenate([[0, 15, 16, TICKET_COUNT - 1], np.random.default_rng(1).integers(0, TICKET_COUNT, 2000)])
+        red_balls, blue_balls = RandomTicketGenerator._decode(ids)
+        self.assertEqual(ticket_ids(red_balls, blue_balls), ids.tolist())
+        np.testing.assert_array_equal(red_balls[0], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(blue_balls[1], 16)
+        np.testing.assert_array_equal(red_balls[3], [28, 29, 30, 31, 32, 33])
+
+    def test_generate_is_unique_and_seeded(self):
+        red_balls, blue_balls = RandomTicketGenerator(seed=7).generate(5000)
+        self.assertTrue((np.diff(red_balls, axis=1) > 0).all())
+        self.assertTrue(((red_balls >= 1) & (red_balls <= 33)).all())
+        self.assertTrue(((blue_balls >= 1) & (blue_balls <= 16)).all())
+        self.assertEqual(len(set(ticket_ids(red_balls, blue_balls))), 5000)
+
+        again = RandomTicketGenerator(seed=7).generate(5000)
+        np.testing.assert_array_equal(again[0], red_balls)
+        np.testing.assert_array_equal(again[1], blue_balls)
+
+    def test_chunks_are_unique_across_batches(self):
+        chunks = list(RandomTicketGenerator(seed=3).iter_chunks(25000, chunk_size=4000))
+        self.assertEqual([len(blue) for _, blue in chunks], [4000] * 6 + [1000])
+        ids = [ticket for red, blue in chunks for ticket in ticket_ids(red, blue)]
+        self.assertEqual(len(set(ids)), 25000)
+
+    def test_chunks_match_single_batch_seed(self):
+        """同一seed分批与不分批时第一批相同"""
+        first = next(RandomTicketGenerator(seed=5).iter_chunks(3000, chunk_size=1000))
+        whole = RandomTicketGenerator(seed=5).generate(1000)
+        np.testing.assert_array_equal(first[0], whole[0])
+        np.testing.assert_array_equal(first[1], whole[1])
+
+    def test_rejects_more_than_all_tickets(self):
+        with self.assertRaises(ValueError):
+            next(RandomTicketGenerator().iter_chunks(TICKET_COUNT + 1))
+
+
+class SavePredictionsTests(LotteryTestCase):
+
+    def test_saves_every_chunk(self):
+        chunks = list(RandomTicketGenerator(seed=11).iter_chunks(2500, chunk_size=1000))
+        self.assertEqual(save_predictions('2024001', iter(chunks), batch_size=700), 2500)
+        saved = PredictionRecord.objects.filter(draw_num='2024001', prediction_type='random')
+        self.assertEqual(saved.count(), 2500)
+        first = saved.order_by('id').first()
+        self.assertEqual(first.red_balls, chunks[0][0][0].tolist())
+        self.assertEqual(first.blue_ball, chunks[0][1][0])
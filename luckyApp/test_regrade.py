@@ -0,0 +1,130 @@
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from .grading import regrade_predictions, write_grades
+from .models import LotteryHistory, PredictionRecord
+from .testcases import LotteryTestCase, brute_force_counts, create_draws
+
+
+class RegradeTests(LotteryTestCase):
+    """分批重新判定的结果与逐注展开判定一致，中断后从断点继续"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.draws = {draw_num: (reds, blue) for draw_num, reds, blue in create_draws(30)}
+        rng = random.Random(18)
+        draw_nums = sorted(cls.draws)
+        records = []
+        for index in range(300):
+            draw_num = rng.choice(draw_nums)
+            reds, blue = cls.draws[draw_num]
+            picked = set(rng.sample(reds, rng.randint(0, 6)))
+            while len(picked) < 6:
+                picked.add(rng.randint(1, 33))
+            blues = [blue if rng.random() < 0.3 else rng.randint(1, 16)]
+            if index % 25 == 0:
+                # 复式、胆拖
+                records.append(PredictionRecord.from_ticket(draw_num, sorted(picked) + [34 - reds[0]], blues))
+                records.append(PredictionRecord.from_ticket(draw_num, rng.sample(range(1, 34), 9), [1, blue], reds[:2]))
+            records.append(PredictionRecord.from_ticket(draw_num, sorted(picked), blues))
+        # 未开奖的期号
+        records += [PredictionRecord.from_ticket('2099001', [1, 2, 3, 4, 5, 6], [1]) for _ in range(7)]
+        PredictionRecord.objects.bulk_create(records)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.checkpoint = os.path.join(directory, 'checkpoint.json')
+
+    def assert_graded(self, predictions=None):
+        predictions = PredictionRecord.objects.exclude(draw_num='2099001') if predictions is None else predictions
+        for record in predictions:
+            reds, blue = self.draws[record.draw_num]
+            counts = brute_force_counts(record.banker_balls, record.drag_balls, record.blue_balls, reds, blue)
+            self.assertEqual(record.hit_count, len(set(record.all_red_balls) & set(reds)))
+            self.assertEqual(record.banker_hit_count, len(set(record.banker_balls) & set(reds)))
+            self.assertEqual(record.blue_hit, blue in record.blue_balls)
+            self.assertEqual(record.is_hit, any(counts[1:]))
+
+    def test_matches_brute_force(self):
+        # 范围内缺失的开奖记录跳过，范围之后未开奖的期号不读取
+        missing = sorted(self.draws)[15]
+        LotteryHistory.objects.filter(draw_num=missing).delete()
+        skipped = PredictionRecord.objects.filter(draw_num=missing)
+        totals = regrade_predictions(chunk_size=64)
+        self.assertEqual(totals['checked'], PredictionRecord.objects.count() - 7 - skipped.count())
+        self.assertEqual(totals['skipped'], skipped.count())
+        self.assertGreater(totals['skipped'], 0)
+        self.assertGreater(totals['updated'], 0)
+        self.assert_graded(PredictionRecord.objects.exclude(draw_num__in=['2099001', missing]))
+        self.assertFalse(skipped.filter(hit_count__gt=0).exists())
+        self.assertTrue(PredictionRecord.objects.filter(is_hit=True).exists())
+
+        # 再次判定没有变化
+        self.assertEqual(regrade_predictions(chunk_size=64)['updated'], 0)
+
+    def test_start_id_and_range(self):
+        ids = list(PredictionRecord.objects.order_by('id').values_list('id', flat=True))
+        draw_nums = sorted(self.draws)
+        checkpoints = []
+        totals = regrade_predictions(
+            since=draw_nums[10], until=draw_nums[19], start_id=ids[99], chunk_size=50,
+            on_chunk=lambda last_id, totals: checkpoints.append(last_id)
+        )
+        expected = PredictionRecord.objects.filter(
+            id__gt=ids[99], draw_num__gte=draw_nums[10], draw_num__lte=draw_nums[19]
+        )
+        self.assertEqual(totals['checked'], expected.count())
+        self.assertEqual(checkpoints, sorted(checkpoints))
+        self.assertEqual(checkpoints[-1], expected.order_by('id').last().id)
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command('regrade_predictions', chunk_size=100, checkpoint=self.checkpoint, stdout=out, **options)
+        return out.getvalue()
+
+    def test_resume_from_checkpoint(self):
+        calls = []
+
+        def interrupted(*args, **kwargs):
+            # 第二批写回时中断
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('中断')
+            return write_grades(*args, **kwargs)
+
+        with mock.patch('luckyApp.grading.write_grades', side_effect=interrupted), \
+                self.assertLogs('luckyApp.management.commands.regrade_predictions', 'ERROR'):
+            out = self.run_command()
+        self.assertIn('重新判定预测记录失败', out)
+        first_chunk_last_id = PredictionRecord.objects.order_by('id').values_list('id', flat=True)[99]
+        self.assertIn(f'已处理至id {first_chunk_last_id}', out)
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        out = self.run_command()
+        self.assertIn(f'从预测记录id {first_chunk_last_id} 之后继续', out)
+        remaining = PredictionRecord.objects.filter(id__gt=first_chunk_last_id).exclude(draw_num='2099001')
+        self.assertIn(f'判定 {remaining.count()} 条', out)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assert_graded()
+
+    def test_restart_ignores_checkpoint(self):
+        with open(self.checkpoint, 'w') as f:
+            f.write('{"task": {"since": null, "until": null}, "last_id": 999999}')
+        out = self.run_command(restart=True)
+        self.assertNotIn('之后继续', out)
+        self.assert_graded()
+
+    def test_checkpoint_for_other_range_is_ignored(self):
+        with open(self.checkpoint, 'w') as f:
+            f.write('{"task": {"since": "2003001", "until": null}, "last_id": 999999}')
+        out = self.run_command()
+        self.assertNotIn('之后继续', out)
+        self.assert_graded()
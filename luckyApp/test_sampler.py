@@ -0,0 +1,93 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from .dimensions import dimension_names
+from .sampler import AliasTable, TicketSampler
+from .score_table import COMBINATION_COUNT, ScoreTable
+
+
+class AliasTableTests(SimpleTestCase):
+
+    def test_frequencies_follow_weights(self):
+        weights = np.array([1, 0, 3, 6, 10, 0.5])
+        draws = AliasTable(weights).sample(np.random.default_rng(1), 200000)
+        frequencies = np.bincount(draws, minlength=len(weights)) / len(draws)
+        np.testing.assert_allclose(frequencies, weights / weights.sum(), atol=0.005)
+        self.assertEqual(frequencies[1], 0)
+
+    def test_zero_weights_fall_back_to_uniform(self):
+        draws = AliasTable(np.zeros(4)).sample(np.random.default_rng(2), 40000)
+        np.testing.assert_allclose(np.bincount(draws) / len(draws), 0.25, atol=0.01)
+
+
+class TicketSamplerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(6)
+        # 得分有大量并列，覆盖按分组抽样的路径
+        self.totals = self.rng.integers(0, 100, 50000).astype(np.float64)
+
+    def test_samples_are_distinct_and_eligible(self):
+        sampler = TicketSampler(self.totals, min_score=60)
+        for k in (1, 10, 1000, 5000):
+            with self.subTest(k=k):
+                ranks = sampler.sample(k, self.rng)
+                self.assertEqual(len(ranks), k)
+                self.assertEqual(len(np.unique(ranks)), k)
+                self.assertTrue((self.totals[ranks] >= 60).all())
+
+    def test_large_k_returns_best_first(self):
+        sampler = TicketSampler(self.totals, min_score=95)
+        support = sampler.support
+        self.assertEqual(support, np.count_nonzero(self.totals >= 95))
+        everything = sampler.sample(support + 10, self.rng)
+        self.assertEqual(sorted(everything), sorted(np.flatnonzero(self.totals >= 95)))
+        half = sampler.sample(support // 2 + 1, self.rng)
+        self.assertEqual(len(np.unique(half)), len(half))
+        self.assertEqual(self.totals[half].min(), np.sort(self.totals[self.totals >= 95])[::-1][len(half) - 1])
+
+    def test_probability_proportional_to_score(self):
+        totals = np.array([10, 20, 20, 30, 0, 40, 80], dtype=np.float64)
+        sampler = TicketSampler(totals, min_score=1)
+        picks = np.concatenate([sampler.sample(1, self.rng) for _ in range(40000)])
+        frequencies = np.bincount(picks, minlength=len(totals)) / len(picks)
+        np.testing.assert_allclose(frequencies, totals / totals.sum(), atol=0.01)
+
+    def test_threshold_kept_when_enough_combinations(self):
+        sampler = TicketSampler(self.totals, min_score=50, min_support=100)
+        self.assertFalse(sampler.relaxed)
+        self.assertEqual(sampler.min_score, 50)
+        self.assertEqual(sampler.requested_min_score, 50)
+
+    def test_threshold_relaxed_to_min_support(self):
+        with self.assertLogs('luckyApp.sampler', 'WARNING'):
+            sampler = TicketSampler(self.totals, min_score=1000, min_support=2000)
+        self.assertTrue(sampler.relaxed)
+        self.assertEqual(sampler.requested_min_score, 1000)
+        self.assertEqual(sampler.min_score, np.sort(self.totals)[::-1][1999])
+        self.assertGreaterEqual(sampler.support, 2000)
+        self.assertTrue((self.totals[sampler.sample(500, self.rng)] >= sampler.min_score).all())
+
+    def test_min_support_larger_than_all_combinations(self):
+        with self.assertLogs('luckyApp.sampler', 'WARNING'):
+            sampler = TicketSampler(np.arange(10, dtype=np.float64), min_score=100, min_support=50)
+        self.assertEqual(sampler.support, 10)
+
+    def test_strict_threshold_without_candidates(self):
+        with self.assertRaises(ValueError):
+            TicketSampler(self.totals, min_score=1000)
+
+
+class ScoreTableSamplerTests(SimpleTestCase):
+
+    def test_sampler_cached_per_weights_and_threshold(self):
+        dimensions = dimension_names()
+        scores = np.random.default_rng(3).integers(0, 101, (COMBINATION_COUNT, len(dimensions)), dtype=np.uint8)
+        table = ScoreTable(scores, '2024001', dimensions)
+        weights = {name: 1 / len(dimensions) for name in dimensions}
+
+        sampler = table.sampler(weights, min_score=60, min_support=10)
+        self.assertIs(table.sampler(weights, min_score=60, min_support=10), sampler)
+        self.assertIsNot(table.sampler(weights, min_score=70, min_support=10), sampler)
+        ranks = table.sampler(weights, min_score=70, min_support=10).sample(100)
+        self.assertTrue((table.total_scores(weights)[ranks] >= 70).all())
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .dimensions import dimension_names
+from .predictor import MultiDimensionalAnalyzer, invalidate_analysis_snapshot
+from .score_table import (
+    COMBINATION_COUNT, ScoreTable, all_combinations, build_lock, combination_rank, get_score_table,
+    unrank_combinations
+)
+from .testcases import LotteryTestCase, create_draws
+
+
+class CombinationRankTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(4)
+
+    def test_rank_matches_lexicographic_order(self):
+        combos = all_combinations()
+        ranks = np.concatenate([[0, 1, COMBINATION_COUNT - 1], self.rng.integers(0, COMBINATION_COUNT, 5000)])
+        np.testing.assert_array_equal(combination_rank(combos[ranks]), ranks)
+        np.testing.assert_array_equal(unrank_combinations(ranks), combos[ranks])
+
+    def test_round_trip(self):
+        ranks = self.rng.integers(0, COMBINATION_COUNT, 10000)
+        np.testing.assert_array_equal(combination_rank(unrank_combinations(ranks)), ranks)
+
+    def test_rank_ignores_order(self):
+        red = np.array([[33, 1, 17, 5, 9, 2], [6, 5, 4, 3, 2, 1]])
+        np.testing.assert_array_equal(combination_rank(red), combination_rank(np.sort(red, axis=1)))
+        self.assertEqual(int(combination_rank([1, 2, 3, 4, 5, 6])), 0)
+        self.assertEqual(int(combination_rank([28, 29, 30, 31, 32, 33])), COMBINATION_COUNT - 1)
+
+
+class ScoreTableTests(LotteryTestCase):
+    """得分表中每个组合的得分与 batch_score 一致，并且只在版本变化且未被其他进程重建时重建"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 得分表只生成一次（约数秒），每个用例使用一份副本
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+        create_draws(120)
+        invalidate_analysis_snapshot()
+        path = os.path.join(cls.directory, 'score_table.npy')
+        ScoreTable.build(MultiDimensionalAnalyzer(restore_weights=False), path)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shutil.copytree(self.directory, directory, dirs_exist_ok=True)
+        self.path = os.path.join(directory, 'score_table.npy')
+        self.table = ScoreTable.load(self.path)
+        self.analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+
+    def test_scores_match_batch_score(self):
+        ranks = np.random.default_rng(0).integers(0, COMBINATION_COUNT, 5000)
+        ranks = np.concatenate([[0, COMBINATION_COUNT - 1], ranks])
+        red = unrank_combinations(ranks)
+        detailed = self.analyzer.batch_score(red, dimensions=dimension_names())['detailed_scores']
+        self.assertEqual(self.table.dimensions, dimension_names())
+        for column, name in enumerate(self.table.dimensions):
+            np.testing.assert_array_equal(self.table.scores[ranks, column], np.rint(detailed[name]), err_msg=name)
+
+    def test_load_current_version(self):
+        version = self.analyzer.get_snapshot().version
+        self.assertEqual(self.table.version, version)
+        self.assertEqual(ScoreTable.load(self.path).version, version)
+        self.assertIsNotNone(get_score_table(version, self.path))
+        self.assertIsNone(get_score_table('2099001', self.path))
+
+    def test_ensure_current_skips_current_table(self):
+        with mock.patch.object(ScoreTable, 'build') as build:
+            table = ScoreTable.ensure_current(self.analyzer, self.path)
+        build.assert_not_called()
+        self.assertEqual(table.version, self.table.version)
+
+    def test_ensure_current_skips_while_another_process_builds(self):
+        create_draws(1, seed=5, start=120)
+        with build_lock(self.path) as acquired, mock.patch.object(ScoreTable, 'build') as build:
+            self.assertTrue(acquired)
+            self.assertIsNone(ScoreTable.ensure_current(self.analyzer, self.path))
+        build.assert_not_called()
+
+    def test_ensure_current_rebuilds_new_version(self):
+        (draw_num, _, _), = create_draws(1, seed=5, start=120)
+        old_data = ScoreTable.data_path(self.path, self.table.version)
+        table = ScoreTable.ensure_current(self.analyzer, self.path)
+        self.assertEqual(table.version, draw_num)
+        self.assertEqual(ScoreTable.load(self.path).version, draw_num)
+        self.assertTrue(os.path.exists(ScoreTable.data_path(self.path, draw_num)))
+        self.assertFalse(os.path.exists(old_data))
+        # 锁已释放
+        with build_lock(self.path) as acquired:
+            self.assertTrue(acquired)
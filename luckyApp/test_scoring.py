@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+
+from .models import LotteryHistory
+from .predictor import MultiDimensionalAnalyzer
+from .testcases import LotteryTestCase, create_draws
+
+
+class BatchScoreTests(LotteryTestCase):
+    """批量评分与逐注调用 calculate_comprehensive_score 的结果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_draws(240)
+
+    def setUp(self):
+        super().setUp()
+        self.analyzer = MultiDimensionalAnalyzer(restore_weights=False)
+        rng = random.Random(42)
+        self.red = [sorted(rng.sample(range(1, 34), 6)) for _ in range(300)]
+        # 加入最近一期的号码等边界组合
+        latest = LotteryHistory.objects.latest('draw_num')
+        self.red += [latest.red_balls, list(range(1, 7)), list(range(28, 34))]
+        self.blue = [rng.randint(1, 16) for _ in self.red]
+
+    def assert_matches_scalar(self):
+        batch = self.analyzer.batch_score(self.red, self.blue)
+        for index, (reds, blue) in enumerate(zip(self.red, self.blue)):
+            scalar = self.analyzer.calculate_comprehensive_score(reds, blue)
+            self.assertEqual(set(batch['detailed_scores']), set(scalar['detailed_scores']))
+            for name, score in scalar['detailed_scores'].items():
+                self.assertAlmostEqual(batch['detailed_scores'][name][index], score, places=9, msg=name)
+            self.assertAlmostEqual(batch['total_score'][index], scalar['total_score'], places=9)
+
+    def test_default_weights(self):
+        self.assert_matches_scalar()
+
+    def test_custom_weights(self):
+        """权重为0的维度两种方式都跳过"""
+        self.analyzer.weights.update({'hot_cold': 0.5, 'missing': 0, 'interval': 0.2, 'odd_even': 0.3, 'zone': 0})
+        self.assert_matches_scalar()
+        self.assertNotIn('missing', self.analyzer.batch_score(self.red[:1])['detailed_scores'])
+
+    def test_unsorted_input(self):
+        """红球顺序不影响得分"""
+        shuffled = [random.Random(index).sample(reds, 6) for index, reds in enumerate(self.red)]
+        np.testing.assert_allclose(
+            self.analyzer.batch_score(shuffled)['total_score'],
+            self.analyzer.batch_score(self.red)['total_score']
+        )
+
+    def test_rejects_invalid_shapes(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.batch_score([[1, 2, 3, 4, 5]])
+        with self.assertRaises(ValueError):
+            self.analyzer.batch_score([[1, 2, 3, 4, 5, 34]])
+        with self.assertRaises(ValueError):
+            self.analyzer.batch_score(self.red, self.blue[:-1])
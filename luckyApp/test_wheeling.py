@@ -0,0 +1,85 @@
+import itertools
+import random
+
+from django.test import SimpleTestCase
+
+from .wheeling import CoverageWheel
+
+
+def brute_force_coverage(pool, tickets, size):
+    """逐注列出全部 size 元子集，统计覆盖比例"""
+    covered = {subset for ticket in tickets for subset in itertools.combinations(sorted(ticket), size)}
+    return len(covered) / len(list(itertools.combinations(pool, size)))
+
+
+def brute_force_guarantee(pool, tickets, t):
+    """枚举池内每种可能的开奖号码，统计各注的最大命中数"""
+    result = []
+    for in_pool in range(t, min(6, len(pool)) + 1):
+        best = [max(len(set(drawn) & set(ticket)) for ticket in tickets) for drawn in itertools.combinations(pool, in_pool)]
+        result.append({
+            'in_pool': in_pool,
+            'min_hits': min(best),
+            'hit_rate': sum(hits >= t for hits in best) / len(best)
+        })
+    return result
+
+
+class CoverageWheelTests(SimpleTestCase):
+    """覆盖比例和中奖保证与逐注枚举的结果一致"""
+
+    def setUp(self):
+        self.rng = random.Random(20)
+
+    def tickets(self, wheel, chosen):
+        return [wheel.red_balls[index].tolist() for index in chosen]
+
+    def assert_matches_brute_force(self, wheel, chosen):
+        pool = wheel.pool.tolist()
+        tickets = self.tickets(wheel, chosen)
+        coverage = wheel.coverage(chosen)
+        for size in (3, 4):
+            self.assertAlmostEqual(coverage[size], brute_force_coverage(pool, tickets, size), places=12)
+        guarantee = wheel.guarantee(chosen)
+        expected = brute_force_guarantee(pool, tickets, wheel.t)
+        self.assertEqual([row['in_pool'] for row in guarantee], [row['in_pool'] for row in expected])
+        for row, expected_row in zip(guarantee, expected):
+            self.assertEqual(row['min_hits'], expected_row['min_hits'])
+            self.assertAlmostEqual(row['hit_rate'], expected_row['hit_rate'], places=12)
+
+    def test_random_tickets(self):
+        for pool_size, t, count in ((8, 3, 4), (10, 4, 12), (12, 3, 20)):
+            with self.subTest(pool=pool_size, t=t):
+                wheel = CoverageWheel(self.rng.sample(range(1, 34), pool_size), t=t)
+                chosen = self.rng.sample(range(len(wheel.masks)), count)
+                self.assert_matches_brute_force(wheel, chosen)
+
+    def test_solved_tickets(self):
+        wheel = CoverageWheel(self.rng.sample(range(1, 34), 11), t=4)
+        greedy = wheel.greedy(15)
+        chosen = wheel.solve(15)
+        self.assertEqual(len(set(chosen)), 15)
+        self.assert_matches_brute_force(wheel, chosen)
+        # 局部搜索不会降低覆盖
+        self.assertGreaterEqual(wheel.coverage(chosen)[4], wheel.coverage(greedy)[4])
+
+    def test_candidates_and_covers(self):
+        pool = [3, 7, 12, 18, 25, 30, 33]
+        wheel = CoverageWheel(pool, t=3)
+        self.assertEqual(wheel.red_balls.tolist(), [list(combo) for combo in itertools.combinations(pool, 6)])
+        # 每个候选号码覆盖的子集序号互不相同，全部候选覆盖全部子集
+        self.assertTrue(all(len(set(row)) == 20 for row in wheel.covers.tolist()))
+        self.assertEqual(set(wheel.covers.ravel().tolist()), set(range(35)))
+        self.assertEqual(wheel.coverage(range(len(wheel.masks))), {3: 1.0, 4: 1.0})
+
+    def test_full_pool_guarantee(self):
+        """池内全部组合都选中时，池内开出 m 个号码必定命中 m 个"""
+        wheel = CoverageWheel(range(1, 9), t=4)
+        guarantee = wheel.guarantee(list(range(len(wheel.masks))))
+        self.assertEqual([row['min_hits'] for row in guarantee], [4, 5, 6])
+        self.assertEqual([row['hit_rate'] for row in guarantee], [1.0, 1.0, 1.0])
+
+    def test_rejects_invalid_pool(self):
+        for pool, t in ((range(1, 7), 4), (range(1, 20), 4), (range(0, 8), 4), (range(1, 9), 5)):
+            with self.subTest(pool=list(pool), t=t), self.assertRaises(ValueError):
+                CoverageWheel(pool, t=t)
@@ -0,0 +1,57 @@
+import itertools
+import random
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from .benchmarks.datasets import synthetic_draw_num
+from .models import LotteryHistory
+from .predictor import invalidate_analysis_snapshot
+from .prizes import PRIZE_SLOTS, prize_level
+
+
+def create_draws(count, seed=2003, start=0):
+    """
+    按固定种子写入 count 期开奖记录，期号与基准测试的合成数据相同（第 start 期起），
+    返回 [(期号, 红球列表, 蓝球)]
+    """
+    rng = random.Random(seed)
+    draws = [
+        (synthetic_draw_num(index), sorted(rng.sample(range(1, 34), 6)), rng.randint(1, 16))
+        for index in range(start, start + count)
+    ]
+    LotteryHistory.objects.bulk_create(
+        LotteryHistory(
+            draw_num=draw_num,
+            red_ball_1=reds[0], red_ball_2=reds[1], red_ball_3=reds[2],
+            red_ball_4=reds[3], red_ball_5=reds[4], red_ball_6=reds[5],
+            blue_ball=blue,
+            draw_date=date(2003, 2, 16) + timedelta(days=(start + offset) * 3)
+        )
+        for offset, (draw_num, reds, blue) in enumerate(draws)
+    )
+    return draws
+
+
+def expand_ticket(banker, drag, blue):
+    """复式/胆拖逐注展开为单式号码"""
+    for reds in itertools.combinations(drag, 6 - len(banker)):
+        for ball in blue:
+            yield list(banker) + list(reds), ball
+
+
+def brute_force_counts(banker, drag, blue, draw_reds, draw_blue):
+    """逐注判定中奖等级，返回各等级注数（下标0为未中奖）"""
+    counts = [0] * PRIZE_SLOTS
+    for reds, ball in expand_ticket(banker, drag, blue):
+        counts[prize_level(len(set(reds) & set(draw_reds)), ball == draw_blue) or 0] += 1
+    return counts
+
+
+class LotteryTestCase(TestCase):
+    """分析快照在进程内缓存，各测试用例的数据不同，每个用例前后都清除"""
+
+    def setUp(self):
+        super().setUp()
+        invalidate_analysis_snapshot()
+        self.addCleanup(invalidate_analysis_snapshot)
@@ -9,7 +9,11 @@ urlpatterns = [
     path('predictions/', views.prediction_list, name='predictions'),
     path('api/random/', views.generate_random, name='generate_random'),
     path('api/predict/', views.generate_prediction, name='generate_prediction'),
+    path('api/wheel/', views.generate_wheel, name='generate_wheel'),
     path('api/save-prediction/', views.save_prediction, name='save_prediction'),
+    path('api/ticket-odds/', views.ticket_odds, name='ticket_odds'),
     path('api/latest-predictions/', views.get_latest_predictions, name='get_latest_predictions'),
     path('api/update/', views.update_lottery_data, name='update_data'),
+    path('api/window-stats/', views.window_stats, name='window_stats'),
+    path('api/profile/', views.profile_stats, name='profile_stats'),
 ] 
\ No newline at end of file
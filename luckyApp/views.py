@@ -4,7 +4,11 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import ensure_csrf_cookie
 from .models import LotteryHistory, PredictionRecord
 from .crawler import LotteryCrawler
-from .predictor import LotteryPredictor
+from .predictor import LotteryPredictor, absorb_new_draw, schedule_score_table_rebuild
+from .random_tickets import RandomTicketGenerator
+from .compound import normalize_ticket, prize_odds
+from .prizes import PRIZE_NAMES, PRIZE_SLOTS
+from . import profiling
 from django.core.paginator import Paginator
 import json
 
@@ -66,19 +70,17 @@ def prediction_list(request):
 @require_http_methods(["POST"])
 def generate_random(request):
     """生成随机号码"""
-    predictor = LotteryPredictor()
-    
     # 获取最新期号
     latest_record = LotteryHistory.objects.all().order_by('-draw_num').first()
     next_draw_num = str(int(latest_record.draw_num) + 1) if latest_record else "未知"
     
-    # 生成5组随机号码
+    # 生成5组不重复的随机号码
+    red_balls, blue_balls = RandomTicketGenerator().generate(5)
     result = []
-    for _ in range(5):
-        red_balls, blue_ball = predictor.generate_random_numbers()
+    for red, blue in zip(red_balls.tolist(), blue_balls.tolist()):
         result.append({
-            'red_balls': red_balls,
-            'blue_ball': blue_ball
+            'red_balls': red,
+            'blue_ball': blue
         })
     
     return JsonResponse({
@@ -121,35 +123,102 @@ def generate_prediction(request):
             'message': f'生成预测失败: {str(e)}'
         }, status=500)
 
+@require_http_methods(["POST"])
+def generate_wheel(request):
+    """
+    旋转矩阵选号：在号码池内选出共同覆盖尽可能多3/4元子集的一组号码
+    可选参数 num_tickets、pool_size、t（3或4）、pool（红球列表，不传则由分析器选出）
+    """
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body or '{}')
+            if not isinstance(data, dict):
+                raise ValueError('请求体必须是JSON对象')
+        else:
+            data = request.POST.dict()
+            data['pool'] = request.POST.getlist('pool') or None
+        num_tickets = int(data.get('num_tickets', 10))
+        pool_size = int(data.get('pool_size', 12))
+        t = int(data.get('t', 4))
+        pool = data.get('pool')
+        if not 1 <= num_tickets <= 200:
+            raise ValueError('num_tickets 必须在1-200之间')
+        if pool is not None:
+            if not isinstance(pool, list):
+                raise ValueError('pool 必须是红球列表')
+            pool = [int(ball) for ball in pool]
+    except (TypeError, ValueError) as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'参数不正确: {str(e)}'
+        }, status=400)
+
+    try:
+        result = LotteryPredictor().generate_wheel(num_tickets, pool_size, t, pool)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'生成旋转矩阵失败: {str(e)}'
+        }, status=500)
+
+    latest_record = LotteryHistory.objects.all().order_by('-draw_num').first()
+    next_draw_num = str(int(latest_record.draw_num) + 1) if latest_record else "未知"
+    # JSON 的键必须为字符串
+    result['coverage'] = {str(size): rate for size, rate in result['coverage'].items()}
+    return JsonResponse({
+        'status': 'success',
+        'draw_num': next_draw_num,
+        **result
+    })
+
 @require_http_methods(["POST"])
 def save_prediction(request):
-    """保存预测号码"""
+    """
+    保存预测号码
+    支持单式（6红1蓝）、复式（red_balls 为6-20个红球，blue_balls 为多个蓝球）
+    和胆拖（banker_balls 为胆码，red_balls 为拖码）
+    """
     try:
         data = json.loads(request.body)
         draw_num = data.get('draw_num')
         red_balls = data.get('red_balls')
-        blue_ball = data.get('blue_ball')
+        blue_balls = data.get('blue_balls')
+        if blue_balls is None and data.get('blue_ball') is not None:
+            blue_balls = [data.get('blue_ball')]
+        banker_balls = data.get('banker_balls') or []
         prediction_type = data.get('prediction_type')
         
-        if not all([draw_num, red_balls, blue_ball is not None, prediction_type]) or len(red_balls) != 6:
+        if not all([draw_num, red_balls, blue_balls, prediction_type]):
             return JsonResponse({
                 'status': 'error',
                 'message': '数据格式不正确'
             }, status=400)
+
+        try:
+            record = PredictionRecord.from_ticket(
+                draw_num, red_balls, blue_balls, banker_balls,
+                prediction_type=prediction_type,
+                hit_count=0,  # 初始化命中数为0
+                is_hit=False,  # 初始化未命中
+                blue_hit=False  # 初始化蓝球未命中
+            )
+        except (TypeError, ValueError) as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'数据格式不正确: {str(e)}'
+            }, status=400)
             
-        # 对红球进行排序，确保比较时顺序一致
-        red_balls = sorted(red_balls)
-            
-        # 检查是否已经存在相同的预测
+        # 检查是否已经存在相同的预测（号码掩码相同即号码相同，与顺序无关）
         existing = PredictionRecord.objects.filter(
             draw_num=draw_num,
-            red_ball_1=red_balls[0],
-            red_ball_2=red_balls[1],
-            red_ball_3=red_balls[2],
-            red_ball_4=red_balls[3],
-            red_ball_5=red_balls[4],
-            red_ball_6=red_balls[5],
-            blue_ball=blue_ball,
+            red_mask=record.red_mask,
+            banker_mask=record.banker_mask,
+            blue_mask=record.blue_mask,
             prediction_type=prediction_type
         ).exists()
         
@@ -160,24 +229,13 @@ def save_prediction(request):
             }, status=400)
             
         # 保存预测记录
-        PredictionRecord.objects.create(
-            draw_num=draw_num,
-            red_ball_1=red_balls[0],
-            red_ball_2=red_balls[1],
-            red_ball_3=red_balls[2],
-            red_ball_4=red_balls[3],
-            red_ball_5=red_balls[4],
-            red_ball_6=red_balls[5],
-            blue_ball=blue_ball,
-            prediction_type=prediction_type,
-            hit_count=0,  # 初始化命中数为0
-            is_hit=False,  # 初始化未命中
-            blue_hit=False  # 初始化蓝球未命中
-        )
+        record.save()
         
         return JsonResponse({
             'status': 'success',
-            'message': '预测号码已保存'
+            'message': '预测号码已保存',
+            'ticket_type': record.ticket_type,
+            'ticket_count': record.ticket_count
         })
         
     except Exception as e:
@@ -188,16 +246,63 @@ def save_prediction(request):
             'message': str(e)
         }, status=500)
 
+@require_http_methods(["GET"])
+def ticket_odds(request):
+    """
+    单式、复式、胆拖投注的注数和各等级精确中奖概率
+    参数 reds（红球总数，含胆码）、blues（蓝球数）、bankers（胆码数，默认0）
+    """
+    try:
+        reds = int(request.GET.get('reds', 6))
+        blues = int(request.GET.get('blues', 1))
+        bankers = int(request.GET.get('bankers', 0))
+        if not 0 <= bankers < reds:
+            raise ValueError('胆码数需要大于等于0且小于红球总数')
+        # 用任意号码校验个数是否合法，注数和概率按整理后的胆码、拖码、蓝球个数计算
+        _, banker, drag, blue = normalize_ticket(range(1, reds + 1), range(1, blues + 1), range(1, bankers + 1))
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'参数不正确: {str(e)}'
+        }, status=400)
+
+    odds = prize_odds(len(banker), len(drag), len(blue))
+    return JsonResponse({
+        'status': 'success',
+        'ticket_count': odds['ticket_count'],
+        'levels': [
+            {
+                'level': level,
+                'name': PRIZE_NAMES[level],
+                'probability': odds['probability'][level - 1],
+                'expected': odds['expected'][level - 1]
+            }
+            for level in range(1, PRIZE_SLOTS)
+        ]
+    })
+
 @require_http_methods(["POST"])
 def update_lottery_data(request):
     """更新最新开奖数据"""
     crawler = LotteryCrawler()
-    latest_data = crawler.crawl_latest()
+    try:
+        latest_data = crawler.crawl_latest()
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'保存开奖数据失败: {str(e)}'
+        }, status=500)
     
     if latest_data:
+        # 把新数据增量并入分析状态
+        absorb_new_draw(latest_data)
+
         # 检查预测准确性
         predictor = LotteryPredictor()
         predictor.check_prediction_accuracy(latest_data['draw_num'])
+
+        # 按新数据在后台重建组合得分表，重建完成前预测使用随机候选池
+        schedule_score_table_rebuild(str(latest_data['draw_num']))
         
         return JsonResponse({
             'status': 'success',
@@ -263,7 +368,9 @@ def get_latest_predictions(request):
                         <span class="lottery-ball blue-ball">{pred.blue_ball}</span>
                     </div>
                 </td>
-                <td class="d-none d-md-table-cell">{pred.get_prediction_type_display()}</td>
+                <td class="d-none d-md-table-cell">{pred.get_prediction_type_display()}{
+                    f'<br><small class="text-muted">{pred.get_ticket_type_display()} {pred.ticket_count}注</small>'
+                    if pred.ticket_type != 'single' else ''}</td>
                 <td class="d-none d-md-table-cell">{pred.created_at.strftime('%Y-%m-%d %H:%M')}</td>
                 <td class="d-none d-md-table-cell">
                     {f'<span class="badge bg-success">命中{pred.hit_prize_level}等奖</span>' if pred.is_hit else
@@ -310,3 +417,63 @@ def get_latest_predictions(request):
         'predictions_html': ''.join(predictions_html),
         'pagination_html': ''.join(pagination_html)
     })
+
+@require_http_methods(["GET"])
+def window_stats(request):
+    """
+    按窗口统计号码频率、冷热号和区间分布
+    可传入多个 window 参数（期数或 all），默认 10、30、50、100 和全部
+    """
+    windows = request.GET.getlist('window') or ['10', '30', '50', '100', 'all']
+    try:
+        sizes = [None if window == 'all' else int(window) for window in windows]
+        if any(size is not None and size <= 0 for size in sizes):
+            raise ValueError
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'window 必须为正整数或 all'
+        }, status=400)
+
+    try:
+        analyzer = LotteryPredictor().analyzer
+        snapshot = analyzer.get_snapshot(refresh=True)
+        result = {}
+        for window, size in zip(windows, sizes):
+            stats = analyzer.analyze_window(size)
+            # 区间分布以 "一区:二区:三区" 作为键
+            stats['zone_freq'] = {
+                ':'.join(map(str, zones)): count for zones, count in stats['zone_freq'].items()
+            }
+            result[window] = stats
+        return JsonResponse({
+            'status': 'success',
+            'version': snapshot.version,
+            'windows': result
+        })
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'窗口统计失败: {str(e)}'
+        }, status=500)
+
+@require_http_methods(["GET", "POST"])
+def profile_stats(request):
+    """
+    当前进程的评分流程性能统计
+    统计只在处理本次请求的进程内累计，多进程部署时各 worker 互不相同；
+    GET 只读取，POST 返回后清零（仅限管理员）
+    """
+    if request.method == 'POST' and not request.user.is_staff:
+        return JsonResponse({
+            'status': 'error',
+            'message': '只有管理员可以清零性能统计'
+        }, status=403)
+    stats = profiling.get_stats()
+    if request.method == 'POST':
+        profiling.reset_stats()
+    return JsonResponse({
+        'status': 'success',
+        'enabled': profiling.is_enabled(),
+        'stats': stats
+    })
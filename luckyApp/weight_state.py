@@ -0,0 +1,58 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from .models import AnalyzerWeightState
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = 1  # 权重状态只保存一条记录
+
+# 进程内缓存的权重状态，版本号变化时才重新读取
+_state_lock = threading.Lock()
+_state_cache = {}
+
+
+def load_weight_state():
+    """
+    读取持久化的权重状态
+    每次只查询版本号，版本未变化时直接返回进程内缓存；尚未保存过时返回None
+    """
+    version = AnalyzerWeightState.objects.filter(pk=STATE_ID).values_list('version', flat=True).first()
+    if not version:
+        return None
+
+    with _state_lock:
+        cached = _state_cache.get('state')
+        if cached is not None and cached['version'] == version:
+            return cached
+
+    state = AnalyzerWeightState.objects.filter(pk=STATE_ID).values(
+        'version', 'weights', 'dimension_history'
+    ).first()
+    with _state_lock:
+        _state_cache['state'] = state
+    return state
+
+
+@contextmanager
+def update_weight_state(analyzer):
+    """
+    在事务中加锁读取最新的权重状态并应用到analyzer，
+    退出时把analyzer调整后的权重和维度历史写回，版本号加1
+    """
+    AnalyzerWeightState.objects.get_or_create(pk=STATE_ID)
+    with transaction.atomic():
+        row = AnalyzerWeightState.objects.select_for_update().get(pk=STATE_ID)
+        if row.version:
+            analyzer.apply_weight_state(row.weights, row.dimension_history)
+
+        yield analyzer
+
+        row.weights = analyzer.weights
+        row.dimension_history = analyzer.dimension_history
+        row.version += 1
+        row.save()
+
+    logger.info("权重状态已更新至版本 %s", row.version)
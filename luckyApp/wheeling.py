@@ -0,0 +1,147 @@
+import itertools
+from math import comb
+
+import numpy as np
+from .bitmask import RED_BITS, popcount
+from .profiling import profiled
+from .score_table import BINOM
+
+MIN_POOL_SIZE = 7
+MAX_POOL_SIZE = 18  # C(18,6)=18564 个候选号码，再大候选集和保证计算都会明显变慢
+GUARANTEE_SIZES = (3, 4)
+
+
+def _subset_ranks(positions, size):
+    """
+    positions 为 (K, m) 的升序下标数组，返回每行全部 size 元子集的序号 (K, C(m,size))
+    序号按 colex 顺序：rank = Σ C(p_j, j+1)
+    """
+    columns = np.array(list(itertools.combinations(range(positions.shape[1]), size)), dtype=np.intp)
+    subsets = positions[:, columns]
+    return BINOM[subsets, np.arange(1, size + 1)].sum(axis=-1)
+
+
+class CoverageWheel:
+    """
+    旋转矩阵（覆盖设计）：从号码池的全部6元组合中选出N注，尽量覆盖池内全部 t 元子集
+    每注号码用红球掩码表示；covers[c] 为第 c 注候选号码包含的 C(6,t) 个子集的序号，
+    containing[s] 为包含第 s 个子集的全部候选号码，用于选中号码后增量更新各候选的覆盖增益
+    """
+    def __init__(self, pool, t=4, candidate_scores=None):
+        self.pool = np.array(sorted(set(int(ball) for ball in pool)), dtype=np.int64)
+        if not MIN_POOL_SIZE <= len(self.pool) <= MAX_POOL_SIZE:
+            raise ValueError(f'号码池需要 {MIN_POOL_SIZE}-{MAX_POOL_SIZE} 个不同的红球')
+        if self.pool[0] < 1 or self.pool[-1] > 33:
+            raise ValueError('红球号码必须在1-33之间')
+        if t not in GUARANTEE_SIZES:
+            raise ValueError(f'覆盖子集大小只支持 {GUARANTEE_SIZES}')
+        self.t = t
+
+        size = len(self.pool)
+        self.positions = np.array(list(itertools.combinations(range(size), 6)), dtype=np.intp)
+        self.red_balls = self.pool[self.positions]
+        self.masks = np.bitwise_or.reduce(RED_BITS[self.red_balls], axis=1)
+        self.subset_count = comb(size, t)
+
+        self.covers = _subset_ranks(self.positions, t)
+        order = np.argsort(self.covers.ravel(), kind='stable')
+        self.containing = (order // self.covers.shape[1]).reshape(self.subset_count, -1)
+
+        # 增益相同的候选按得分优先，未提供得分时按字典序
+        if candidate_scores is None:
+            candidate_scores = np.zeros(len(self.masks))
+        self.candidate_scores = np.asarray(candidate_scores, dtype=np.float64)
+
+    def _pick(self, gains):
+        best = np.flatnonzero(gains == gains.max())
+        return int(best[np.argmax(self.candidate_scores[best])])
+
+    @profiled('wheeling.greedy')
+    def greedy(self, num_tickets):
+        """贪心选号：每次选覆盖新子集最多的候选号码"""
+        covered = np.zeros(self.subset_count, dtype=bool)
+        gains = np.full(len(self.masks), self.covers.shape[1], dtype=np.int64)
+        chosen = []
+        for _ in range(min(num_tickets, len(self.masks))):
+            pick = self._pick(gains)
+            chosen.append(pick)
+            new = self.covers[pick][~covered[self.covers[pick]]]
+            covered[new] = True
+            # 新覆盖的每个子集让所有包含它的候选增益减1
+            np.subtract.at(gains, self.containing[new].ravel(), 1)
+            gains[pick] = -1
+        return chosen
+
+    def _uncover(self, counts, gains, ticket):
+        """移除一注：覆盖次数降为0的子集让所有包含它的候选增益加1"""
+        subsets = self.covers[ticket]
+        counts[subsets] -= 1
+        freed = subsets[counts[subsets] == 0]
+        np.add.at(gains, self.containing[freed].ravel(), 1)
+
+    def _cover(self, counts, gains, ticket):
+        """加入一注：新覆盖的子集让所有包含它的候选增益减1"""
+        subsets = self.covers[ticket]
+        new = subsets[counts[subsets] == 0]
+        counts[subsets] += 1
+        np.subtract.at(gains, self.containing[new].ravel(), 1)
+
+    @profiled('wheeling.local_search')
+    def local_search(self, chosen, max_passes=5):
+        """
+        逐注尝试替换：移除一注后重新选覆盖增益最大的候选号码，
+        覆盖数增加时接受替换，直到一轮中没有改进或达到轮数上限
+        各候选的增益（包含的未覆盖子集数）只在选中/移除号码时按受影响的子集增量更新
+        """
+        chosen = list(chosen)
+        counts = np.bincount(self.covers[chosen].ravel(), minlength=self.subset_count)
+        gains = (counts == 0)[self.covers].sum(axis=1)
+        in_use = np.zeros(len(self.masks), dtype=bool)
+        in_use[chosen] = True
+        for _ in range(max_passes):
+            improved = False
+            for slot, current in enumerate(chosen):
+                self._uncover(counts, gains, current)
+                lost = int(gains[current])
+                candidate = self._pick(np.where(in_use, -1, gains))
+                if gains[candidate] > lost:
+                    in_use[current] = False
+                    in_use[candidate] = True
+                    chosen[slot] = current = candidate
+                    improved = True
+                self._cover(counts, gains, current)
+            if not improved:
+                break
+        return chosen
+
+    def solve(self, num_tickets, max_passes=5):
+        """贪心选号后做局部搜索，返回选中候选号码的下标"""
+        return self.local_search(self.greedy(num_tickets), max_passes)
+
+    def coverage(self, chosen):
+        """选中号码对池内 3、4 元子集的覆盖比例"""
+        result = {}
+        for size in GUARANTEE_SIZES:
+            ranks = _subset_ranks(self.positions[chosen], size)
+            result[size] = len(np.unique(ranks)) / comb(len(self.pool), size)
+        return result
+
+    @profiled('wheeling.guarantee')
+    def guarantee(self, chosen):
+        """
+        中奖保证：开奖红球中有 m 个落在号码池内时，在池内所有可能的 m 个号码上
+        统计选中号码的最大命中数，给出最坏情况的命中数和命中 t 个以上的比例
+        """
+        size = len(self.pool)
+        masks = self.masks[chosen]
+        result = []
+        for in_pool in range(self.t, min(6, size) + 1):
+            positions = np.array(list(itertools.combinations(range(size), in_pool)), dtype=np.intp)
+            drawn = np.bitwise_or.reduce(RED_BITS[self.pool[positions]], axis=1)
+            best = popcount(drawn[:, None] & masks[None, :]).max(axis=1)
+            result.append({
+                'in_pool': in_pool,
+                'min_hits': int(best.min()),
+                'hit_rate': float((best >= self.t).mean())
+            })
+        return result
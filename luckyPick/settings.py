@@ -129,6 +129,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 红球组合得分表（由 build_score_table 命令生成）
+SCORE_TABLE_PATH = os.path.join(BASE_DIR, 'data', 'score_table.npy')
+
+# 评分流程性能统计（调用次数、耗时、查询次数、缓存命中），默认关闭
+LUCKY_PROFILING = os.environ.get('LUCKY_PROFILING') == '1'
+
 # Logging configuration
 LOGGING = {
     'version': 1,